@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from core.benchmarks import benchmark_database, measure, median_ms
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность JSON API и HTML-страниц '
+            'для одной и той же страницы ленты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self._fill(options['posts'])
+            self._run(options['repeat'])
+
+    def _fill(self, count, batch_size=10_000):
+        self.author = User.objects.create_user(username='bench')
+        self.group = Group.objects.create(
+            title='Бенчмарк', slug='bench', description='-'
+        )
+        for start in range(0, count, batch_size):
+            Post.objects.bulk_create(
+                Post(text=f'Пост {i}', author=self.author, group=self.group)
+                for i in range(start, min(start + batch_size, count))
+            )
+
+    def _run(self, repeat):
+        # Авторизованный клиент: HTML-страницы не берутся из кэша для
+        # анонимных посетителей, и обе стороны выполняют одну работу.
+        client = Client()
+        client.force_login(self.author)
+        pairs = {
+            'feed': ('/', '/api/posts/'),
+            'group': ('/group/bench/', '/api/groups/bench/posts/'),
+            'profile': ('/profile/bench/', '/api/authors/bench/posts/'),
+        }
+
+        def fetch(url):
+            response = client.get(url)
+            if response.streaming:
+                return b''.join(response.streaming_content)
+            return response.content
+
+        self.stdout.write(
+            f'{"page":<8} {"html, ms":>10} {"html, rps":>10} '
+            f'{"api, ms":>10} {"api, rps":>10} {"html, B":>8} {"api, B":>8}'
+        )
+        for name, (html_url, api_url) in pairs.items():
+            html = median_ms(measure(lambda: fetch(html_url), repeat=repeat))
+            api = median_ms(measure(lambda: fetch(api_url), repeat=repeat))
+            self.stdout.write(
+                f'{name:<8} {html:>10.2f} {1000 / html:>10.0f} '
+                f'{api:>10.2f} {1000 / api:>10.0f} '
+                f'{len(fetch(html_url)):>8} {len(fetch(api_url)):>8}'
+            )
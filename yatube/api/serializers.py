@@ -0,0 +1,76 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+# Поле ответа -> поле выборки .values().
+FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+}
+# Без этих полей нельзя построить курсор следующей страницы.
+CURSOR_FIELDS = ('id', 'pub_date')
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def parse_fields(value):
+    """Список полей из параметра ?fields=; без него — все поля."""
+    if not value:
+        return list(FIELDS)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown or not fields:
+        raise FieldsError(
+            'Неизвестные поля: {}. Доступны: {}.'.format(
+                ', '.join(unknown) or '-', ', '.join(FIELDS)
+            )
+        )
+    return fields
+
+
+def post_values(posts, fields):
+    """Выборка словарей с полями ответа вместо объектов Post.
+    Поля курсора выбираются всегда, лишние убирает row_data.
+    """
+    names = dict.fromkeys([*CURSOR_FIELDS, *fields])
+    return posts.values(*(FIELDS[name] for name in names))
+
+
+def post_row(post):
+    """Строка как у post_values, но из объекта Post. С шардами
+    автор и группа читаются из основной базы через prefetch_related,
+    а не JOIN-ом, поэтому ответ собирается из объектов.
+    """
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'updated': post.updated,
+        'author__username': post.author.username,
+        'group__slug': post.group.slug if post.group_id else None,
+    }
+
+
+def dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def row_data(row, fields):
+    return {name: row[FIELDS[name]] for name in fields}
+
+
+def stream_page(rows, fields, links):
+    """JSON страницы по частям: строка за строкой, без сборки
+    всего ответа в памяти.
+    """
+    yield '{"results": ['
+    for index, row in enumerate(rows):
+        yield (',' if index else '') + dumps(row_data(row, fields))
+    yield '], ' + dumps(links)[1:]
@@ -0,0 +1,155 @@
+import json
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Group, Post, User
+from posts.paginators import encode_cursor
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+            for i in range(13)
+        ]
+        cls.other_post = Post.objects.create(text='Чужой', author=cls.other)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_json(self, url, data=None, status=200):
+        response = self.guest_client.get(url, data)
+        self.assertEqual(response.status_code, status)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        if response.streaming:
+            return json.loads(b''.join(response.streaming_content))
+        return json.loads(response.content)
+
+    def test_feed_page(self):
+        """Лента отдаёт 10 последних постов со всеми полями."""
+        data = self.get_json(reverse('api:feed'))
+        self.assertEqual(len(data['results']), 10)
+        first = data['results'][0]
+        self.assertEqual(first['id'], self.other_post.id)
+        self.assertEqual(first['author'], 'Other')
+        self.assertIsNone(first['group'])
+        self.assertEqual(
+            set(first), {'id', 'text', 'pub_date', 'updated', 'author',
+                         'group'}
+        )
+        self.assertIsNone(data['previous'])
+        self.assertIsNotNone(data['next'])
+
+    def test_feed_is_one_query(self):
+        """Страница ленты — один запрос, без COUNT и объектов Post."""
+        with self.assertNumQueries(1):
+            self.get_json(reverse('api:feed'))
+
+    def test_cursor_pagination(self):
+        """Ссылки next/previous проходят ленту без повторов."""
+        first = self.get_json(reverse('api:feed'), {'limit': 5})
+        second = self.get_json(first['next'])
+        third = self.get_json(second['next'])
+        ids = [
+            row['id']
+            for page in (first, second, third)
+            for row in page['results']
+        ]
+        self.assertEqual(len(ids), 14)
+        self.assertEqual(len(set(ids)), 14)
+        self.assertIsNone(third['next'])
+        back = self.get_json(third['previous'])
+        self.assertEqual(back['results'], second['results'])
+
+    def test_cursor_past_the_end(self):
+        """Курсор самого старого поста не роняет ленту: приходит
+        последняя страница, а в пустой ленте — пустой ответ.
+        """
+        oldest = self.posts[0]
+        data = self.get_json(
+            reverse('api:feed'),
+            {'limit': 5, 'after': encode_cursor(oldest, 3)},
+        )
+        self.assertEqual(data['results'][-1]['id'], oldest.id)
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+        User.objects.create_user(username='Silent')
+        data = self.get_json(
+            reverse('api:author_feed', kwargs={'username': 'Silent'}),
+            {'after': encode_cursor(oldest, 3)},
+        )
+        self.assertEqual(data['results'], [])
+        self.assertIsNone(data['previous'])
+
+    def test_fields_selection(self):
+        """?fields= ограничивает поля ответа."""
+        data = self.get_json(reverse('api:feed'), {'fields': 'id,text'})
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        data = self.get_json(
+            reverse('api:feed'), {'fields': 'text'}, status=200
+        )
+        self.assertEqual(set(data['results'][0]), {'text'})
+        self.assertIn('fields=text', data['next'])
+
+    def test_bad_parameters(self):
+        """Неизвестные поля и неверный limit — ошибка 400."""
+        for params in ({'fields': 'password'}, {'limit': 'x'},
+                       {'limit': 1000}):
+            with self.subTest(params=params):
+                data = self.get_json(reverse('api:feed'), params, 400)
+                self.assertIn('detail', data)
+
+    def test_group_and_author_feeds(self):
+        """Ленты сообщества и автора содержат только их посты."""
+        group = self.get_json(
+            reverse('api:group_feed', kwargs={'slug': 'group'}),
+            {'limit': 100},
+        )
+        self.assertEqual(len(group['results']), 13)
+        author = self.get_json(
+            reverse('api:author_feed', kwargs={'username': 'Other'})
+        )
+        self.assertEqual(
+            [row['id'] for row in author['results']], [self.other_post.id]
+        )
+
+    def test_not_found(self):
+        """Несуществующие сообщество, автор и пост — JSON с 404."""
+        urls = [
+            reverse('api:group_feed', kwargs={'slug': 'missing'}),
+            reverse('api:author_feed', kwargs={'username': 'missing'}),
+            reverse('api:post_detail', kwargs={'post_id': 10_000}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIn('detail', self.get_json(url, status=404))
+
+    def test_errors_are_not_escaped(self):
+        """Сообщения об ошибках в UTF-8, как и данные постов."""
+        response = self.client.get(
+            reverse('api:group_feed', kwargs={'slug': 'missing'})
+        )
+        self.assertIn('Сообщество не найдено.', response.content.decode())
+
+    def test_post_detail(self):
+        """Отдельный пост отдаётся с выбранными полями."""
+        post = self.posts[0]
+        data = self.get_json(
+            reverse('api:post_detail', kwargs={'post_id': post.id}),
+            {'fields': 'text,group'},
+        )
+        self.assertEqual(data, {'text': 'Пост 0', 'group': 'group'})
+
+    def test_read_only(self):
+        """API принимает только GET."""
+        response = self.guest_client.post(reverse('api:feed'))
+        self.assertEqual(response.status_code, 405)
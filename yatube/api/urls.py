@@ -0,0 +1,16 @@
+from django.urls import path
+from . import views
+
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.feed, name='feed'),
+    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('groups/<slug:slug>/posts/', views.group_feed, name='group_feed'),
+    path(
+        'authors/<str:username>/posts/',
+        views.author_feed,
+        name='author_feed',
+    ),
+]
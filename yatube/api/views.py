@@ -0,0 +1,125 @@
+from django.http import (HttpResponsePermanentRedirect, JsonResponse,
+                         StreamingHttpResponse)
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from posts import lookups, sharding
+from posts.paginators import LIMIT, CursorPaginator, encode_position
+from .serializers import (FieldsError, parse_fields, post_row, post_values,
+                          row_data, stream_page)
+
+
+MAX_LIMIT = 100
+
+
+def error(detail, status):
+    return JsonResponse(
+        {'detail': detail}, status=status,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def _rows(posts, fields):
+    """Источник строк ответа: выборка .values() с JOIN автора
+    и группы или, с шардами, посты с подгрузкой из основной базы
+    (строки из них собирает post_row).
+    """
+    if sharding.enabled():
+        return posts.for_feed()
+    return post_values(posts, fields)
+
+
+def _link(request, **params):
+    query = request.GET.copy()
+    for name in ('after', 'before'):
+        query.pop(name, None)
+    query.update(params)
+    return f'{request.path}?{query.urlencode()}'
+
+
+def _feed_response(request, posts):
+    """Страница ленты по курсору ?after= / ?before= в формате
+    {"results": [...], "next": ..., "previous": ...}.
+    """
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+        limit = int(request.GET.get('limit', LIMIT))
+    except FieldsError as exc:
+        return error(str(exc), 400)
+    except ValueError:
+        return error('limit должен быть числом.', 400)
+    if not 1 <= limit <= MAX_LIMIT:
+        return error(f'limit должен быть от 1 до {MAX_LIMIT}.', 400)
+    page = CursorPaginator(_rows(posts, fields), limit).get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    rows = page.object_list
+    if sharding.enabled():
+        rows = [post_row(post) for post in rows]
+    links = {'next': None, 'previous': None}
+    if page.has_next() and rows:
+        links['next'] = _link(request, after=encode_position(
+            rows[-1]['pub_date'], rows[-1]['id'], page.number
+        ))
+    if page.has_previous() and rows:
+        links['previous'] = _link(request, before=encode_position(
+            rows[0]['pub_date'], rows[0]['id'], page.number
+        ))
+    return StreamingHttpResponse(
+        stream_page(rows, fields, links), content_type='application/json'
+    )
+
+
+@require_GET
+def feed(request):
+    """Лента всех постов, как на главной странице."""
+    return _feed_response(request, sharding.posts())
+
+
+@require_GET
+def group_feed(request, slug):
+    """Лента постов сообщества."""
+    group = lookups.group(slug)
+    if group is None:
+        return error('Сообщество не найдено.', 404)
+    return _feed_response(
+        request, sharding.posts().filter(group_id=group.pk)
+    )
+
+
+@require_GET
+def author_feed(request, username):
+    """Лента постов автора, как в профиле."""
+    author = lookups.author(username)
+    if author is None:
+        return error('Автор не найден.', 404)
+    posts = sharding.posts(author_id=author.pk)
+    return _feed_response(request, posts.filter(author_id=author.pk))
+
+
+@require_GET
+def post_detail(request, post_id):
+    """Отдельный пост."""
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except FieldsError as exc:
+        return error(str(exc), 400)
+    posts = sharding.posts(post_id=post_id).filter(pk=post_id)
+    row = _rows(posts, fields).first()
+    if row is None:
+        moved = sharding.moved_id(post_id)
+        if moved is None:
+            return error('Пост не найден.', 404)
+        # Пост перенесён на шард командой shard_posts под новым id.
+        url = reverse('api:post_detail', kwargs={'post_id': moved})
+        query = request.GET.urlencode()
+        return HttpResponsePermanentRedirect(
+            f'{url}?{query}' if query else url
+        )
+    if sharding.enabled():
+        row = post_row(row)
+    return JsonResponse(
+        row_data(row, fields),
+        json_dumps_params={'ensure_ascii': False},
+    )
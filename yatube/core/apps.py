@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import slow_queries, sqlite
+        connection_created.connect(sqlite.on_connection_created)
+        connection_created.connect(slow_queries.on_connection_created)
@@ -0,0 +1,120 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.urls import reverse
+
+
+@contextmanager
+def benchmark_database(verbosity=0, name=None):
+    """Временная база для бенчмарков: рабочая БД не затрагивается.
+
+    name — файл базы вместо базы SQLite в памяти; нужен, когда с
+    базой одновременно работают несколько потоков.
+    """
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    if name is not None:
+        test_settings['NAME'] = name
+    try:
+        connection.creation.create_test_db(
+            verbosity=verbosity, autoclobber=True, serialize=False
+        )
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity)
+    finally:
+        test_settings['NAME'] = old_test_name
+
+
+def measure(func, repeat=10, warmup=1, setup=None):
+    """Время выполнения func в секундах для каждого из repeat запусков.
+    setup, если задан, вызывается перед каждым запуском вне замера.
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        func()
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(samples, percent):
+    """Перцентиль выборки методом ближайшего ранга."""
+    ordered = sorted(samples)
+    index = max(0, round(percent / 100 * len(ordered)) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def median_ms(samples):
+    return statistics.median(samples) * 1000
+
+
+def summarize(samples):
+    """Перцентили времени в миллисекундах."""
+    return {
+        f'p{percent}_ms': percentile(samples, percent) * 1000
+        for percent in (50, 95, 99)
+    }
+
+
+def url_cases(urlconfs, kwargs, skip=()):
+    """Пары (имя, URL) для всех маршрутов модулей urlconfs.
+
+    Параметры маршрутов берутся из kwargs по имени; маршруты из skip
+    (например, выход из аккаунта) пропускаются.
+    """
+    cases = []
+    for module in urlconfs:
+        namespace = module.app_name
+        for pattern in module.urlpatterns:
+            name = f'{namespace}:{pattern.name}'
+            if name in skip:
+                continue
+            params = {
+                param: kwargs[param]
+                for param in pattern.pattern.converters
+            }
+            cases.append((name, reverse(name, kwargs=params)))
+    return cases
+
+
+def compare(baseline, current, thresholds, noise=None):
+    """Сравнивает результаты с сохранёнными.
+
+    baseline и current — {набор: {случай: {метрика: значение}}},
+    thresholds — {метрика: допустимый относительный рост}, noise —
+    {метрика: абсолютный рост, который регрессией не считается}: доли
+    миллисекунды меняются от запуска к запуску на сотни процентов.
+    Возвращает строки (набор, случай, метрика, было, стало, рост) для
+    всех общих метрик и отдельно — те из них, что превысили порог.
+    """
+    noise = noise or {}
+    rows, regressions = [], []
+    for dataset, cases in current.items():
+        for case, metrics in cases.items():
+            saved = baseline.get(dataset, {}).get(case)
+            if saved is None:
+                continue
+            for metric, threshold in thresholds.items():
+                if metric not in saved or metric not in metrics:
+                    continue
+                before, after = saved[metric], metrics[metric]
+                change = (after - before) / before if before else (
+                    0.0 if after == before else float('inf')
+                )
+                row = (dataset, case, metric, before, after, change)
+                rows.append(row)
+                if (change > threshold
+                        and after - before > noise.get(metric, 0)):
+                    regressions.append(row)
+    return rows, regressions
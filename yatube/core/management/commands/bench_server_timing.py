@@ -0,0 +1,60 @@
+import logging
+import os
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from core.benchmarks import benchmark_database, measure, median_ms
+from posts.dataset import DatasetGenerator
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время ответа ленты posts:index с выключенным и '
+            'включённым ServerTimingMiddleware.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=400)
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            DatasetGenerator().generate(
+                users=1000, groups=100, posts=options['posts']
+            )
+            cache.clear()
+            self._run(options['repeat'], options['rounds'])
+
+    def _client(self, enabled):
+        # Цепочка middleware собирается при первом запросе клиента,
+        # поэтому на каждый режим нужен свой клиент.
+        with override_settings(SERVER_TIMING=enabled):
+            client = Client()
+            client.force_login(User.objects.order_by('pk').first())
+            client.get('/')
+        return client
+
+    def _run(self, repeat, rounds):
+        # Строка журнала тоже входит в затраты, но не в вывод команды.
+        logger = logging.getLogger('core.timing')
+        handlers, logger.handlers = logger.handlers, []
+        with open(os.devnull, 'w') as devnull:
+            logger.addHandler(logging.StreamHandler(devnull))
+            clients = {
+                False: self._client(False), True: self._client(True)
+            }
+            samples = {False: [], True: []}
+            # Режимы чередуются, чтобы фон машины влиял на оба поровну.
+            for _ in range(rounds):
+                for enabled, client in clients.items():
+                    samples[enabled] += measure(
+                        lambda: client.get('/'), repeat=repeat // rounds
+                    )
+            logger.handlers = handlers
+        off, on = median_ms(samples[False]), median_ms(samples[True])
+        self.stdout.write(f'{"mode":<10} {"median, ms":>12}')
+        self.stdout.write(f'{"off":<10} {off:>12.3f}')
+        self.stdout.write(f'{"on":<10} {on:>12.3f}')
+        self.stdout.write(f'overhead: {(on - off) / off:+.1%}')
@@ -0,0 +1,142 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.test import override_settings
+
+from core.benchmarks import benchmark_database, percentile
+from posts.dataset import DatasetGenerator
+from posts.models import Group, Post, User
+
+
+# Настройки SQLite по умолчанию: журнал отката, полная синхронизация,
+# кэш 2 МБ, без mmap; время ожидания — как у модуля sqlite3.
+DEFAULTS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'busy_timeout': 5000,
+    'cache_size': -2000,
+    'mmap_size': 0,
+    'temp_store': 'default',
+}
+
+
+class Worker(threading.Thread):
+    def __init__(self, action, deadline):
+        super().__init__()
+        self.action = action
+        self.deadline = deadline
+        self.samples = []
+        self.errors = 0
+
+    def run(self):
+        try:
+            while time.monotonic() < self.deadline:
+                start = time.perf_counter()
+                try:
+                    self.action()
+                except OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+                    self.errors += 1
+                    continue
+                self.samples.append(time.perf_counter() - start)
+        finally:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = ('Пропускная способность и доля ошибок database is locked '
+            'при N читающих ленты и M пишущих посты потоках: с настройками '
+            'SQLite по умолчанию и с SQLITE_PRAGMAS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--posts', type=int, default=20_000)
+        parser.add_argument(
+            '--busy-timeout', type=int, default=None,
+            help='busy_timeout в мс для обоих режимов.'
+        )
+
+    def handle(self, *args, **options):
+        profiles = {
+            'default': dict(DEFAULTS),
+            'tuned': dict(settings.SQLITE_PRAGMAS),
+        }
+        if options['busy_timeout'] is not None:
+            for pragmas in profiles.values():
+                pragmas['busy_timeout'] = options['busy_timeout']
+        self.stdout.write(
+            f'{"pragmas":<8} {"role":<7} {"ops":>7} {"ops/s":>8} '
+            f'{"p50, ms":>8} {"p95, ms":>8} {"locked":>7} {"rate":>7}'
+        )
+        for label, pragmas in profiles.items():
+            directory = tempfile.mkdtemp()
+            name = os.path.join(directory, 'bench.sqlite3')
+            try:
+                with override_settings(SQLITE_PRAGMAS=pragmas), \
+                        benchmark_database(name=name):
+                    DatasetGenerator().generate(
+                        users=100, groups=10, posts=options['posts']
+                    )
+                    self._run(label, options)
+            finally:
+                shutil.rmtree(directory)
+
+    def _run(self, label, options):
+        authors = list(User.objects.values_list('pk', flat=True))
+        groups = list(Group.objects.values_list('pk', flat=True))
+        # Соединения потоков открываются заново и получают прагмы
+        # режима; соединение основного потока тоже закрывается, чтобы
+        # не держать блокировок.
+        connection.close()
+
+        def read():
+            posts = Post.objects.for_feed().order_by('-pub_date', '-pk')
+            if random.random() < 0.5:
+                posts = posts.filter(group_id=random.choice(groups))
+            list(posts[:10])
+
+        def write():
+            # Как post_create: вставка и обработчики post_save,
+            # каждый запрос в своей транзакции.
+            Post.objects.create(
+                text='Новый пост',
+                author_id=random.choice(authors),
+                group_id=random.choice(groups),
+            )
+
+        deadline = time.monotonic() + options['duration']
+        workers = {
+            'read': [Worker(read, deadline)
+                     for _ in range(options['readers'])],
+            'write': [Worker(write, deadline)
+                      for _ in range(options['writers'])],
+        }
+        for group in workers.values():
+            for worker in group:
+                worker.start()
+        for group in workers.values():
+            for worker in group:
+                worker.join()
+        for role, group in workers.items():
+            samples = [sample for worker in group
+                       for sample in worker.samples]
+            errors = sum(worker.errors for worker in group)
+            attempts = len(samples) + errors
+            p50 = percentile(samples, 50) * 1000 if samples else 0
+            p95 = percentile(samples, 95) * 1000 if samples else 0
+            self.stdout.write(
+                f'{label:<8} {role:<7} {len(samples):>7} '
+                f'{len(samples) / options["duration"]:>8.0f} '
+                f'{p50:>8.2f} {p95:>8.2f} {errors:>7} '
+                f'{errors / attempts if attempts else 0:>7.1%}'
+            )
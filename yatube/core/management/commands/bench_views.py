@@ -0,0 +1,192 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+
+from about import urls as about_urls
+from core import timing
+from core.benchmarks import (benchmark_database, compare, measure,
+                             summarize, url_cases)
+from posts import cache
+from posts import urls as posts_urls
+from posts.dataset import DatasetGenerator
+from posts.models import Group, Post, User
+from users import urls as users_urls
+
+
+URLCONFS = (posts_urls, users_urls, about_urls)
+# Выход из аккаунта разлогинил бы клиента посреди замеров, а подписка
+# и отписка меняют данные между повторами.
+SKIP = {'users:logout', 'posts:profile_follow', 'posts:profile_unfollow'}
+THRESHOLDS = {
+    'p50_ms': 0.25,
+    'p95_ms': 0.5,
+    'queries': 0.0,
+    'sql_ms': 0.5,
+    'bytes': 0.1,
+}
+# Рост времени в мс, который считается шумом замера.
+NOISE_MS = {'p50_ms': 0.5, 'p95_ms': 1.0, 'sql_ms': 0.2}
+
+
+def _content(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+class Command(BaseCommand):
+    help = ('Замеряет все страницы posts, users и about на наборах данных '
+            'разного размера: перцентили времени, число и время SQL, '
+            'размер ответа. Сравнивает с эталоном (--baseline или '
+            'BENCHMARK_BASELINE) и завершается с ненулевым кодом при '
+            'регрессии или без эталона; --save записывает эталон.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1000,100000',
+            help='Число постов в наборах через запятую.'
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--baseline', help='Файл эталона; по умолчанию '
+            'BENCHMARK_BASELINE.'
+        )
+        parser.add_argument(
+            '--save', action='store_true',
+            help='Записать результаты как новые базовые.'
+        )
+        for metric, threshold in THRESHOLDS.items():
+            parser.add_argument(
+                f'--max-{metric.replace("_", "-")}', type=float,
+                default=threshold, dest=f'max_{metric}',
+                help=f'Допустимый рост {metric}, доля (по умолчанию '
+                f'{threshold}).'
+            )
+
+    def handle(self, *args, **options):
+        path = options['baseline'] or settings.BENCHMARK_BASELINE
+        if not path:
+            raise CommandError(
+                'Укажите файл эталона: --baseline или BENCHMARK_BASELINE.'
+            )
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        results = {}
+        for size in sizes:
+            self.stdout.write(f'Набор: {size} постов')
+            with benchmark_database():
+                results[str(size)] = self._run_size(
+                    size, options['seed'], options['repeat']
+                )
+        if options['save']:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w') as baseline:
+                json.dump(results, baseline, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовые результаты записаны в {path}'
+            ))
+            self._print_results(results)
+            return
+        if not os.path.exists(path):
+            self._print_results(results)
+            raise CommandError(
+                f'Нет эталона {path}: сохраните его запуском с --save.'
+            )
+        with open(path) as baseline:
+            saved = json.load(baseline)
+        thresholds = {
+            metric: options[f'max_{metric}'] for metric in THRESHOLDS
+        }
+        rows, regressions = compare(saved, results, thresholds, NOISE_MS)
+        self._print_comparison(rows, regressions)
+        if regressions:
+            raise CommandError(f'Регрессий: {len(regressions)}')
+
+    def _run_size(self, size, seed, repeat):
+        DatasetGenerator(seed=seed).generate(
+            users=max(10, size // 100),
+            groups=max(1, size // 1000),
+            posts=size,
+        )
+        caches[settings.PAGE_CACHE_ALIAS].clear()
+        author = User.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first()
+        group = Group.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first()
+        kwargs = {
+            'slug': group.slug,
+            'username': author.username,
+            'post_id': Post.objects.filter(author=author).values_list(
+                'pk', flat=True
+            ).first(),
+            'uidb64': 'MQ',
+            'token': 'set-password',
+        }
+        guest = Client()
+        logged_in = Client()
+        logged_in.force_login(author)
+        results = {}
+        for name, url in url_cases(URLCONFS, kwargs, SKIP):
+            for role, client in (('guest', guest), ('author', logged_in)):
+                results[f'{role} {name}'] = self._measure(
+                    client, url, repeat, guest=client is guest
+                )
+        return results
+
+    def _measure(self, client, url, repeat, guest=False):
+        """Гостевые страницы замеряются без кэша страниц: иначе
+        замер показал бы чтение из кэша, а не работу представления.
+        """
+        setup = None
+        if guest:
+            def setup():
+                cache.invalidate(cache.ALL_SCOPE)
+        metrics = summarize(measure(
+            lambda: _content(client.get(url)), repeat=repeat, setup=setup
+        ))
+        if setup is not None:
+            setup()
+        # Время каждого запроса по perf_counter: connection.queries
+        # округляет его до миллисекунд.
+        with timing.measure_request() as timings:
+            content = _content(client.get(url))
+        metrics['queries'] = timings.queries
+        metrics['sql_ms'] = timings.sql * 1000
+        metrics['bytes'] = len(content)
+        return metrics
+
+    def _print_results(self, results):
+        self.stdout.write(
+            f'{"size":>8} {"case":<40} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"sql":>4} {"sql ms":>8} {"bytes":>8}'
+        )
+        for size, cases in results.items():
+            for case, m in sorted(cases.items()):
+                self.stdout.write(
+                    f'{size:>8} {case:<40} {m["p50_ms"]:>8.2f} '
+                    f'{m["p95_ms"]:>8.2f} {m["p99_ms"]:>8.2f} '
+                    f'{m["queries"]:>4} {m["sql_ms"]:>8.2f} {m["bytes"]:>8}'
+                )
+
+    def _print_comparison(self, rows, regressions):
+        failed = set(regressions)
+        self.stdout.write(
+            f'{"size":>8} {"case":<40} {"metric":<8} {"before":>10} '
+            f'{"after":>10} {"change":>8}'
+        )
+        for row in rows:
+            size, case, metric, before, after, change = row
+            line = (
+                f'{size:>8} {case:<40} {metric:<8} {before:>10.2f} '
+                f'{after:>10.2f} {change:>+8.0%}'
+            )
+            if row in failed:
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.slow_queries import aggregate, read_log
+
+
+SORT_KEYS = {
+    'total': lambda group: group['total_ms'],
+    'count': lambda group: group['count'],
+    'max': lambda group: group['max_ms'],
+}
+
+
+class Command(BaseCommand):
+    help = ('Сводка журнала медленных запросов по отпечаткам запросов: '
+            'худшие по суммарному времени, числу или максимуму.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.SLOW_QUERY_LOG)
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='total'
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Показать параметры, место и план худшего запуска.'
+        )
+
+    def handle(self, *args, **options):
+        groups = sorted(
+            aggregate(read_log(options['log'])),
+            key=SORT_KEYS[options['sort']], reverse=True,
+        )
+        if not groups:
+            self.stdout.write('Медленных запросов нет.')
+            return
+        self.stdout.write(
+            f'{"count":>6} {"total, ms":>11} {"avg, ms":>9} '
+            f'{"max, ms":>9}  query'
+        )
+        for group in groups[:options['top']]:
+            self.stdout.write(
+                f'{group["count"]:>6} {group["total_ms"]:>11.1f} '
+                f'{group["total_ms"] / group["count"]:>9.1f} '
+                f'{group["max_ms"]:>9.1f}  {group["fingerprint"][:120]}'
+            )
+            if group['views']:
+                views = ', '.join(sorted(group['views']))
+                self.stdout.write(f'{"":>39}views: {views}')
+            if options['plans']:
+                worst = group['worst']
+                self.stdout.write(f'{"":>39}params: {worst["params"]}')
+                self.stdout.write(f'{"":>39}frame: {worst["frame"]}')
+                for line in worst['plan'] or ():
+                    self.stdout.write(f'{"":>39}plan: {line}')
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import sqlite
+
+
+class Command(BaseCommand):
+    help = ('Обслуживание SQLite: перенос журнала WAL в базу '
+            '(wal_checkpoint) и обновление статистики (PRAGMA optimize). '
+            'Однократно — для cron, или с --every в цикле.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--checkpoint', choices=sqlite.CHECKPOINT_MODES,
+            default='PASSIVE', type=str.upper,
+        )
+        parser.add_argument(
+            '--no-optimize', action='store_false', dest='optimize'
+        )
+        parser.add_argument(
+            '--every', type=float, default=None,
+            help='Повторять каждые N секунд до прерывания.'
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'{options["database"]} — не SQLite')
+        while True:
+            self._run(
+                connection, options['checkpoint'].upper(), options['optimize']
+            )
+            if options['every'] is None:
+                break
+            time.sleep(options['every'])
+
+    def _run(self, connection, mode, optimize):
+        start = time.perf_counter()
+        busy, log_pages, moved = sqlite.checkpoint(connection, mode)
+        if optimize:
+            sqlite.optimize(connection)
+        self.stdout.write(
+            f'wal_checkpoint({mode}): busy={busy} '
+            f'журнал={log_pages} перенесено={moved} страниц, '
+            f'{(time.perf_counter() - start) * 1000:.1f} мс'
+        )
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import replicas
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в реплику (REPLICA_ALIAS) — '
+            'замена репликации для разработки. Однократно или с --every '
+            'в цикле, что имитирует отставание реплики.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--every', type=float, default=None,
+            help='Повторять каждые N секунд до прерывания.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            try:
+                replicas.sync()
+            except ValueError as exc:
+                raise CommandError(exc)
+            self.stdout.write(
+                f'Реплика обновлена за '
+                f'{(time.perf_counter() - start) * 1000:.1f} мс'
+            )
+            if options['every'] is None:
+                break
+            time.sleep(options['every'])
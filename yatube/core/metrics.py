@@ -0,0 +1,367 @@
+import bisect
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+# Сумма снимков завершившихся процессов в METRICS_DIR.
+ARCHIVE = 'archive.json'
+
+_collectors = []
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help_text, labels, lock):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = lock
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self):
+        return {
+            'type': self.type,
+            'help': self.help,
+            'labels': list(self.labels),
+            'samples': [
+                [list(labels), value] for labels, value in self.values.items()
+            ],
+        }
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин. Для каждого
+    набора меток хранит число наблюдений по корзинам (не накопленное),
+    сумму и общее число.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help_text, labels, lock, buckets):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self._lock = lock
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self.values.get(
+                labels, ([0] * (len(self.buckets) + 1), 0.0, 0)
+            )
+            counts[index] += 1
+            self.values[labels] = (counts, total + value, count + 1)
+
+    def snapshot(self):
+        return {
+            'type': self.type,
+            'help': self.help,
+            'labels': list(self.labels),
+            'buckets': list(self.buckets),
+            'samples': [
+                [list(labels), [list(counts), total, count]]
+                for labels, (counts, total, count) in self.values.items()
+            ],
+        }
+
+
+class Registry:
+    """Метрики процесса. snapshot() сериализуется в JSON, поэтому
+    снимки нескольких процессов можно сложить через merge().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.metrics = {}
+        self._flushed = 0.0
+        self._process = None
+        self._flusher = None
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels, self._lock)
+        self.metrics[name] = metric
+        return metric
+
+    def histogram(self, name, help_text, labels=(),
+                  buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labels, self._lock, buckets)
+        self.metrics[name] = metric
+        return metric
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: metric.snapshot()
+                for name, metric in self.metrics.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+    def filename(self):
+        """<pid>-<метка>.json: метка новая у каждого процесса, поэтому
+        процесс с повторно выданным pid не перепишет чужой снимок.
+        """
+        pid = os.getpid()
+        if self._process is None or self._process[0] != pid:
+            # После fork pid меняется, и потомок получает свою метку.
+            self._process = (pid, uuid.uuid4().hex[:12])
+        return '%s-%s.json' % self._process
+
+    def flush(self, directory=None):
+        """Записывает снимок процесса в <directory>/<pid>-<метка>.json."""
+        directory = directory or settings.METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        _write(os.path.join(directory, self.filename()), self.snapshot())
+        self._flushed = time.monotonic()
+
+    def maybe_flush(self):
+        """Сбрасывает снимок в METRICS_DIR не чаще, чем раз в
+        METRICS_FLUSH_INTERVAL секунд; без METRICS_DIR ничего не делает.
+
+        Первый вызов в процессе запускает фоновый поток, который
+        обновляет снимок и без запросов: так устаревает только файл
+        завершившегося процесса (см. collect).
+        """
+        if not settings.METRICS_DIR:
+            return
+        self._start_flusher()
+        if time.monotonic() - self._flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def _start_flusher(self):
+        pid = os.getpid()
+        if self._flusher == pid:
+            return
+        # После fork потока в потомке нет: запускаем свой.
+        self._flusher = pid
+        threading.Thread(
+            target=self._flush_periodically, name='metrics-flush',
+            daemon=True,
+        ).start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            directory = settings.METRICS_DIR
+            if directory and os.path.isdir(directory):
+                self.flush(directory)
+
+
+REGISTRY = Registry()
+REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'Ответы по представлениям и статусам.',
+    ('view', 'method', 'status'),
+)
+LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Время ответа представления.',
+    ('view',),
+)
+QUERIES = REGISTRY.counter(
+    'db_queries_total', 'SQL-запросы по представлениям.', ('view',),
+)
+QUERIES_PER_REQUEST = REGISTRY.histogram(
+    'db_queries_per_request', 'Число SQL-запросов на ответ.', ('view',),
+    buckets=QUERY_BUCKETS,
+)
+SQL_TIME = REGISTRY.counter(
+    'db_query_duration_seconds_total', 'Время SQL по представлениям.',
+    ('view',),
+)
+
+
+def register_collector(collector):
+    """collector() вызывается при каждом чтении /metrics и возвращает
+    метрики в формате Registry.snapshot() — например, уже общие для
+    всех процессов данные из кэша.
+    """
+    _collectors.append(collector)
+
+
+def merge(snapshots):
+    """Складывает снимки нескольких процессов."""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, dict(metric, samples={}))
+            samples = target['samples']
+            for labels, value in metric['samples']:
+                key = tuple(labels)
+                if metric['type'] != 'histogram':
+                    samples[key] = samples.get(key, 0) + value
+                    continue
+                counts, total, count = value
+                old_counts, old_total, old_count = samples.get(
+                    key, ([0] * len(counts), 0.0, 0)
+                )
+                samples[key] = (
+                    [a + b for a, b in zip(old_counts, counts)],
+                    old_total + total,
+                    old_count + count,
+                )
+    for metric in merged.values():
+        metric['samples'] = [
+            [list(labels), value]
+            for labels, value in metric['samples'].items()
+        ]
+    return merged
+
+
+def _read(path):
+    with open(path) as snapshot:
+        return json.load(snapshot)
+
+
+def _write(path, data):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as snapshot:
+        json.dump(data, snapshot)
+    os.replace(temporary, path)
+
+
+def _cumulative(snapshot):
+    """Метрики снимка, значения которых только растут: gauge
+    завершившегося процесса уже ничего не значит.
+    """
+    return {
+        name: metric for name, metric in snapshot.items()
+        if metric['type'] != 'gauge'
+    }
+
+
+def _stale_snapshots(directory):
+    """{путь: снимок} для файлов, не обновлявшихся METRICS_STALE_AFTER
+    секунд, кроме архива.
+    """
+    stale_before = time.time() - settings.METRICS_STALE_AFTER
+    stale = {}
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not name.endswith('.json') or name == ARCHIVE:
+            continue
+        try:
+            if os.path.getmtime(path) < stale_before:
+                stale[path] = _cumulative(_read(path))
+        except (OSError, ValueError):
+            continue
+    return stale
+
+
+def archive_stale(directory):
+    """Переносит в ARCHIVE снимки процессов, не обновлявшиеся
+    METRICS_STALE_AFTER секунд: живые процессы обновляют свой файл
+    фоновым потоком, значит, эти процессы завершились. Их счётчики
+    остаются в сумме, и она не убывает между чтениями /metrics.
+    """
+    archive = os.path.join(directory, ARCHIVE)
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        # Один процесс за раз: иначе снимок попадёт в архив дважды.
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        stale = _stale_snapshots(directory)
+        if not stale:
+            return
+        try:
+            total = _read(archive)
+        except FileNotFoundError:
+            total = {}
+        _write(archive, merge([total, *stale.values()]))
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def collect():
+    """Метрики всех процессов (при заданном METRICS_DIR) или текущего,
+    вместе с метриками зарегистрированных сборщиков.
+    """
+    directory = settings.METRICS_DIR
+    if directory:
+        REGISTRY.flush()
+        archive_stale(directory)
+        snapshots = []
+        for name in os.listdir(directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                snapshots.append(_read(os.path.join(directory, name)))
+            except (OSError, ValueError):
+                # Файл процесса могли удалить или переписать между
+                # listdir и чтением.
+                continue
+    else:
+        snapshots = [REGISTRY.snapshot()]
+    snapshots += [collector() for collector in _collectors]
+    return merge(snapshots)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace(
+        '"', r'\"'
+    )
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(metrics):
+    """Метрики в текстовом формате Prometheus 0.0.4."""
+    lines = []
+    for name in sorted(metrics):
+        metric = metrics[name]
+        lines.append(f'# HELP {name} {metric["help"]}')
+        lines.append(f'# TYPE {name} {metric["type"]}')
+        names = metric['labels']
+        for labels, value in sorted(metric['samples']):
+            if metric['type'] != 'histogram':
+                lines.append(
+                    f'{name}{_labels(names, labels)} {_number(value)}'
+                )
+                continue
+            counts, total, count = value
+            cumulative = 0
+            bounds = metric['buckets'] + [float('inf')]
+            for bound, bucket in zip(bounds, counts):
+                cumulative += bucket
+                lines.append('{}_bucket{} {}'.format(
+                    name,
+                    _labels(names, labels, [('le', _number(bound))]),
+                    cumulative,
+                ))
+            lines.append(
+                f'{name}_sum{_labels(names, labels)} {_number(total)}'
+            )
+            lines.append(f'{name}_count{_labels(names, labels)} {count}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,184 @@
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics, profiling, replicas, slow_queries, timing
+
+
+logger = logging.getLogger('core.timing')
+
+
+def server_timing_header(timings):
+    return ', '.join((
+        f'sql;dur={timings.sql * 1000:.2f};desc="{timings.queries} queries"',
+        f'tpl;dur={timings.template * 1000:.2f}',
+        f'app;dur={timings.app * 1000:.2f}',
+        f'total;dur={timings.total * 1000:.2f}',
+    ))
+
+
+class ServerTimingMiddleware:
+    """Время SQL, шаблонов и ответа в заголовке Server-Timing и в
+    строке журнала core.timing на каждый запрос.
+
+    Включается настройкой SERVER_TIMING. Выключенный middleware
+    исключается из цепочки при запуске и ничего не стоит.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with timing.measure_request() as timings:
+            response = self.get_response(request)
+        response['Server-Timing'] = server_timing_header(timings)
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': timings.queries,
+            'sql_ms': round(timings.sql * 1000, 2),
+            'template_ms': round(timings.template * 1000, 2),
+            'total_ms': round(timings.total * 1000, 2),
+        }
+        logger.info(
+            ' '.join(f'{key}=%s' for key in record),
+            *record.values(),
+            extra={'timing': record},
+        )
+        return response
+
+
+class QueryOriginMiddleware:
+    """Запоминает представление текущего запроса для журнала
+    медленных запросов. Работает, только если задан SLOW_QUERY_MS.
+    """
+
+    def __init__(self, get_response):
+        if getattr(settings, 'SLOW_QUERY_MS', None) is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            slow_queries.set_view(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        slow_queries.set_view(request.resolver_match.view_name)
+
+
+class ProfilingMiddleware:
+    """Профилирование представлений.
+
+    Заголовок X-Profile: 1 или параметр ?profile=1 от сотрудника
+    запускают представление под cProfile, значение memory добавляет
+    tracemalloc; такой запрос профилируется всегда. Кроме того,
+    доля PROFILING_SAMPLE_RATE всех запросов профилируется сама.
+    Снимки сохраняются в PROFILING_DIR и видны на странице
+    core:profiles. Включается настройкой PROFILING. Должен стоять
+    после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mode = profiling.requested_mode(request)
+        explicit = mode is not None and request.user.is_staff
+        if not explicit:
+            if random.random() >= settings.PROFILING_SAMPLE_RATE:
+                return None
+            mode = 'cpu'
+
+        def run():
+            response = view_func(request, *view_args, **view_kwargs)
+            # Отложенная отрисовка TemplateResponse тоже входит в профиль.
+            if callable(getattr(response, 'render', None)):
+                response = response.render()
+            return response
+
+        response, capture = profiling.profile_call(
+            request, mode, run, sampled=not explicit
+        )
+        if explicit:
+            response['X-Profile-Capture'] = capture.name
+        return response
+
+
+class MetricsMiddleware:
+    """Число ответов, время ответа и SQL-запросы по имени
+    представления в реестре core.metrics; читаются на /metrics.
+    Выключается настройкой METRICS.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with timing.measure_request() as timings:
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.REQUESTS.inc(view, request.method, str(response.status_code))
+        metrics.LATENCY.observe(timings.total, view)
+        metrics.QUERIES.inc(view, amount=timings.queries)
+        metrics.QUERIES_PER_REQUEST.observe(timings.queries, view)
+        metrics.SQL_TIME.inc(view, amount=timings.sql)
+        metrics.REGISTRY.maybe_flush()
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Разрешает PrimaryReplicaRouter читать с реплики в GET-запросах
+    к представлениям из REPLICA_VIEWS. После записи ставит cookie,
+    по которой клиент REPLICA_STICKY_SECONDS читает основную базу.
+    Без реплики в DATABASES исключается из цепочки.
+    """
+
+    def __init__(self, get_response):
+        if replicas.replica_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.views = set(settings.REPLICA_VIEWS)
+
+    def __call__(self, request):
+        try:
+            sticky_until = float(
+                request.COOKIES.get(settings.REPLICA_STICKY_COOKIE, 0)
+            )
+        except ValueError:
+            sticky_until = 0.0
+        replicas.start_request(sticky_until)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = replicas.finish_request()
+        if wrote:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE,
+                str(time.time() + settings.REPLICA_STICKY_SECONDS),
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in ('GET', 'HEAD')
+                and request.resolver_match.view_name in self.views):
+            replicas.use_replica()
@@ -0,0 +1,156 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.utils import timezone
+
+
+SUMMARY_FUNCTIONS = 15
+ALLOCATION_LINES = 25
+_NAME = re.compile(r'^[\w.-]+$')
+
+
+def requested_mode(request):
+    """Режим профилирования, запрошенный заголовком X-Profile или
+    параметром ?profile=: 'cpu', 'memory' или None.
+    """
+    value = request.META.get('HTTP_X_PROFILE') or request.GET.get('profile')
+    if not value:
+        return None
+    if value in ('1', 'true', 'cpu'):
+        return 'cpu'
+    return 'memory' if value == 'memory' else None
+
+
+def top_functions(stats, limit=SUMMARY_FUNCTIONS):
+    """Функции с наибольшим накопленным временем: [(функция, вызовы,
+    собственное время, накопленное время)], время в миллисекундах.
+    """
+    rows = []
+    for (path, line, name), (_, calls, tottime, cumtime, _) in (
+            stats.stats.items()):
+        rows.append((f'{os.path.basename(path)}:{line}({name})',
+                     calls, round(tottime * 1000, 3),
+                     round(cumtime * 1000, 3)))
+    rows.sort(key=lambda row: row[3], reverse=True)
+    return rows[:limit]
+
+
+def allocation_report(snapshot, peak, limit=ALLOCATION_LINES):
+    lines = [f'Пик памяти: {peak / 1024:.1f} KiB', '']
+    for stat in snapshot.statistics('lineno')[:limit]:
+        lines.append(str(stat))
+    return '\n'.join(lines) + '\n'
+
+
+class Capture:
+    """Один снятый профиль: файлы <name>.pstats, <name>.json и при
+    замере памяти <name>.alloc.txt в каталоге PROFILING_DIR.
+    """
+
+    def __init__(self, directory, name):
+        self.directory = directory
+        self.name = name
+
+    def path(self, suffix):
+        return os.path.join(self.directory, self.name + suffix)
+
+
+def profile_call(request, mode, func, *args, sampled=False, **kwargs):
+    """Выполняет func под cProfile (и tracemalloc в режиме memory),
+    сохраняет снимок и возвращает (результат, Capture). Снимок
+    сохраняется и тогда, когда func завершилась исключением.
+    sampled отмечает снимок, снятый без запроса сотрудника.
+    """
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    match = request.resolver_match
+    view_name = match.view_name if match else 'unknown'
+    moment = timezone.now()
+    capture = Capture(directory, '{}-{}'.format(
+        view_name.replace(':', '.'), moment.strftime('%Y%m%dT%H%M%S%f')
+    ))
+    profiler = cProfile.Profile()
+    memory = mode == 'memory' and not tracemalloc.is_tracing()
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            return func(*args, **kwargs), capture
+        finally:
+            profiler.disable()
+    finally:
+        elapsed = time.perf_counter() - start
+        summary = {
+            'name': capture.name,
+            'view': view_name,
+            'path': request.get_full_path(),
+            'method': request.method,
+            # Автоматический снимок не загружает пользователя из сессии,
+            # чтобы не добавлять запросу SQL.
+            'user': '' if sampled else request.user.get_username(),
+            'time': moment.isoformat(),
+            'mode': mode,
+            'sampled': sampled,
+            'total_ms': round(elapsed * 1000, 3),
+        }
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(capture.path('.alloc.txt'), 'w') as report:
+                report.write(allocation_report(snapshot, peak))
+            summary['peak_kib'] = round(peak / 1024, 1)
+        profiler.dump_stats(capture.path('.pstats'))
+        summary['functions'] = top_functions(pstats.Stats(profiler))
+        with open(capture.path('.json'), 'w') as meta:
+            json.dump(summary, meta, ensure_ascii=False)
+        prune(directory, settings.PROFILING_KEEP)
+
+
+def captures(directory=None):
+    """Сводки снятых профилей, новые первыми."""
+    directory = directory or settings.PROFILING_DIR
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name)) as meta:
+                summaries.append(json.load(meta))
+    summaries.sort(key=lambda summary: summary['time'], reverse=True)
+    return summaries
+
+
+def prune(directory, keep):
+    """Удаляет файлы всех профилей, кроме keep последних."""
+    for summary in captures(directory)[keep:]:
+        capture = Capture(directory, summary['name'])
+        for suffix in ('.json', '.pstats', '.alloc.txt'):
+            if os.path.exists(capture.path(suffix)):
+                os.remove(capture.path(suffix))
+
+
+def capture_file(name, suffix):
+    """Путь к файлу профиля по имени из URL или None."""
+    if not _NAME.match(name):
+        return None
+    path = Capture(settings.PROFILING_DIR, name).path(suffix)
+    return path if os.path.exists(path) else None
+
+
+def format_stats(path, limit=40):
+    """Текстовый отчёт pstats по накопленному времени."""
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(
+        limit
+    )
+    return out.getvalue()
@@ -0,0 +1,92 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import (DEFAULT_DB_ALIAS, IntegrityError, connections,
+                       transaction)
+
+
+_local = threading.local()
+
+
+def replica_alias():
+    """Псевдоним реплики, если она описана в DATABASES, иначе None."""
+    alias = getattr(settings, 'REPLICA_ALIAS', None)
+    return alias if alias in connections.databases else None
+
+
+def start_request(sticky_until=0.0):
+    """Начинает запрос: чтение идёт с основной базы, пока
+    use_replica() не разрешит реплику. sticky_until — время (unix),
+    до которого клиент читает основную базу после своей записи.
+    """
+    _local.replica = False
+    _local.wrote = False
+    _local.sticky = sticky_until > time.time()
+
+
+def finish_request():
+    """Завершает запрос; True, если в нём была запись."""
+    wrote = getattr(_local, 'wrote', False)
+    _local.replica = _local.wrote = _local.sticky = False
+    return wrote
+
+
+def use_replica():
+    """Разрешает чтение с реплики до конца запроса, если клиент не
+    в окне после своей записи.
+    """
+    _local.replica = not getattr(_local, 'sticky', False)
+
+
+def use_primary():
+    """Запрещает чтение с реплики до конца запроса."""
+    _local.replica = False
+
+
+def create_on_primary(model, defaults, **lookup):
+    """Создаёт запись в основной базе, а если её успел создать
+    параллельный запрос — возвращает существующую.
+
+    Для данных, которые считаются лениво при чтении: база указана явно,
+    потому что запись через роутер отметила бы запрос читателя как
+    пишущий (см. core.routers), и он перестал бы читать с реплики.
+    """
+    primary = model._default_manager.using(DEFAULT_DB_ALIAS)
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            return primary.create(**lookup, **defaults)
+    except IntegrityError:
+        return primary.get(**lookup)
+
+
+def mark_written():
+    _local.wrote = True
+
+
+def reads_from_replica():
+    """Читать ли сейчас с реплики: чтение с неё разрешено, в этом
+    запросе ещё не было записи и основная база не в транзакции.
+    """
+    if not getattr(_local, 'replica', False) or _local.wrote:
+        return False
+    return not connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+def sync(source=DEFAULT_DB_ALIAS, target=None):
+    """Копирует основную базу SQLite в реплику через backup API.
+
+    Заменяет репликацию при разработке и в тестах: реплика отстаёт
+    от основной базы до следующего вызова.
+    """
+    target = target or replica_alias()
+    if target is None:
+        raise ValueError('Реплика не описана в DATABASES')
+    source_connection, target_connection = (
+        connections[source], connections[target]
+    )
+    for connection in (source_connection, target_connection):
+        if connection.vendor != 'sqlite':
+            raise ValueError(f'{connection.alias}: нужна SQLite')
+        connection.ensure_connection()
+    source_connection.connection.backup(target_connection.connection)
@@ -0,0 +1,43 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from . import replicas
+
+
+class PrimaryReplicaRouter:
+    """Чтение лент и страниц постов — с реплики, остальное — с основной
+    базы. Без реплики в DATABASES ничего не меняет.
+
+    Реплику разрешает ReplicaRoutingMiddleware для представлений из
+    REPLICA_VIEWS. После первой записи в запросе чтение до его конца
+    идёт с основной базы, а клиент ещё REPLICA_STICKY_SECONDS читает
+    с неё по cookie: так он видит свои изменения, пока реплика отстаёт.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = replicas.replica_alias()
+        if alias is None:
+            return None
+        # Явный ответ и для основной базы: иначе Django возьмёт базу,
+        # из которой загружен связанный объект, то есть реплику.
+        return alias if replicas.reads_from_replica() else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if replicas.replica_alias() is None:
+            return None
+        replicas.mark_written()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        alias = replicas.replica_alias()
+        if alias is None:
+            return None
+        same = {DEFAULT_DB_ALIAS, alias}
+        if obj1._state.db in same and obj2._state.db in same:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему реплика получает вместе с данными при синхронизации.
+        if db == replicas.replica_alias():
+            return False
+        return None
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.utils import timezone
+
+
+logger = logging.getLogger('core.slow_queries')
+_local = threading.local()
+_THIS_FILE = os.path.abspath(__file__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def set_view(view_name):
+    """Запоминает представление, из которого идут запросы потока."""
+    _local.view = view_name
+
+
+def current_view():
+    return getattr(_local, 'view', None)
+
+
+def fingerprint(sql):
+    """Текст запроса без значений: литералы заменены на ?, списки
+    IN (...) любой длины сведены к одному виду.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def _origin_frame():
+    """Ближайший к запросу кадр стека из кода проекта."""
+    for frame in reversed(traceback.extract_stack()):
+        path = os.path.abspath(frame.filename)
+        if path == _THIS_FILE or not path.startswith(settings.BASE_DIR):
+            continue
+        location = os.path.relpath(path, settings.BASE_DIR)
+        return f'{location}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def explain(connection, sql, params):
+    """План запроса на момент записи; только для чтения данных."""
+    if not sql.lstrip()[:6].upper().startswith(('SELECT', 'WITH')):
+        return None
+    prefix = ('EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite'
+              else 'EXPLAIN ')
+    # Отдельный курсор без обёрток: у исходного ещё не прочитан
+    # результат, а сам EXPLAIN не должен попасть в журнал.
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(prefix + sql, params)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    except Exception as exc:
+        return [f'EXPLAIN не удался: {exc}']
+    finally:
+        cursor.close()
+
+
+class SlowQueryRecorder:
+    """Обёртка выполнения запросов (connection.execute_wrappers),
+    которая пишет в журнал core.slow_queries запросы дольше threshold
+    миллисекунд — одной JSON-строкой с параметрами, представлением,
+    местом в коде и планом запроса.
+    """
+
+    def __init__(self, threshold_ms):
+        self.threshold = threshold_ms / 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= self.threshold:
+                self.record(sql, params, many, context, duration)
+
+    def record(self, sql, params, many, context, duration):
+        connection = context['connection']
+        entry = {
+            'time': timezone.now().isoformat(),
+            'duration_ms': round(duration * 1000, 3),
+            'alias': connection.alias,
+            'view': current_view(),
+            'frame': _origin_frame(),
+            'sql': sql,
+            'params': None if many else params,
+            'many': many,
+            'fingerprint': fingerprint(sql),
+            'plan': None if many else explain(connection, sql, params),
+        }
+        logger.warning(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def install(connection, threshold_ms=None):
+    """Подключает SlowQueryRecorder к соединению, если он ещё не
+    подключён. Порог по умолчанию — настройка SLOW_QUERY_MS.
+    """
+    if threshold_ms is None:
+        threshold_ms = settings.SLOW_QUERY_MS
+    if not any(isinstance(wrapper, SlowQueryRecorder)
+               for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(SlowQueryRecorder(threshold_ms))
+
+
+def on_connection_created(sender, connection, **kwargs):
+    if getattr(settings, 'SLOW_QUERY_MS', None) is not None:
+        # Файловый обработчик журнала открывает файл лениво и сам
+        # каталог не создаёт.
+        os.makedirs(os.path.dirname(settings.SLOW_QUERY_LOG), exist_ok=True)
+        install(connection)
+
+
+def read_log(path):
+    """Записи журнала вместе с ротированными файлами path.1, path.2..."""
+    paths = [path]
+    number = 1
+    while os.path.exists(f'{path}.{number}'):
+        paths.append(f'{path}.{number}')
+        number += 1
+    for name in reversed(paths):
+        if not os.path.exists(name):
+            continue
+        with open(name) as log:
+            for line in log:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def aggregate(entries):
+    """Сводка по отпечаткам запросов: число, суммарное и наибольшее
+    время и самая медленная запись.
+    """
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'views': set(),
+            'worst': None,
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        if entry['view']:
+            group['views'].add(entry['view'])
+        if entry['duration_ms'] >= group['max_ms']:
+            group['max_ms'] = entry['duration_ms']
+            group['worst'] = entry
+    return list(groups.values())
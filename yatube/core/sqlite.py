@@ -0,0 +1,60 @@
+from django.conf import settings
+
+
+# Прагмы, которые SQLite принимает только вне транзакции.
+OUTSIDE_TRANSACTION = {'journal_mode'}
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+
+def pragma(connection, name, value=None):
+    """Читает или устанавливает прагму, возвращает её значение."""
+    with connection.cursor() as cursor:
+        if value is None:
+            cursor.execute(f'PRAGMA {name}')
+        else:
+            cursor.execute(f'PRAGMA {name} = {value}')
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def apply_pragmas(connection, pragmas=None):
+    """Устанавливает прагмы SQLITE_PRAGMAS на соединение.
+
+    journal_mode=wal сохраняется в файле базы, остальные прагмы
+    действуют только на это соединение, поэтому применяются к каждому
+    новому.
+    """
+    if pragmas is None:
+        pragmas = settings.SQLITE_PRAGMAS
+    in_atomic = connection.in_atomic_block
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            if in_atomic and name in OUTSIDE_TRANSACTION:
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def on_connection_created(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite' and getattr(
+            settings, 'SQLITE_PRAGMAS', None):
+        apply_pragmas(connection)
+
+
+def checkpoint(connection, mode='PASSIVE'):
+    """Переносит журнал WAL в файл базы. Возвращает (busy, страниц в
+    журнале, перенесено страниц); TRUNCATE вдобавок обнуляет файл -wal.
+    """
+    mode = mode.upper()
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f'Неизвестный режим: {mode}')
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA wal_checkpoint({mode})')
+        return cursor.fetchone()
+
+
+def optimize(connection):
+    """PRAGMA optimize: обновляет статистику планировщика там, где
+    она устарела. Дёшево, если ничего не изменилось.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA optimize')
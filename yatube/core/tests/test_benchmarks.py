@@ -0,0 +1,146 @@
+import copy
+import os
+import shutil
+import tempfile
+from contextlib import nullcontext
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+
+from about import urls as about_urls
+from posts import urls as posts_urls
+from ..benchmarks import compare, measure, summarize, url_cases
+from ..management.commands import bench_views
+
+
+class SummarizeTests(SimpleTestCase):
+    def test_percentiles_in_milliseconds(self):
+        """Перцентили считаются по выборке в секундах и переводятся в мс."""
+        samples = [i / 1000 for i in range(1, 101)]
+        self.assertEqual(
+            summarize(samples),
+            {'p50_ms': 50.0, 'p95_ms': 95.0, 'p99_ms': 99.0},
+        )
+
+
+class MeasureTests(SimpleTestCase):
+    def test_setup_runs_before_every_call(self):
+        """setup вызывается перед каждым запуском, включая прогрев."""
+        calls = []
+        samples = measure(
+            lambda: calls.append('run'), repeat=2,
+            setup=lambda: calls.append('setup'),
+        )
+        self.assertEqual(len(samples), 2)
+        self.assertEqual(calls, ['setup', 'run'] * 3)
+
+
+class UrlCasesTests(SimpleTestCase):
+    def test_every_route_is_reversed(self):
+        """Каждый маршрут получает URL с параметрами из kwargs."""
+        cases = dict(url_cases(
+            (posts_urls, about_urls),
+            {'slug': 'cats', 'username': 'leo', 'post_id': 7},
+            skip={'posts:export'},
+        ))
+        self.assertEqual(cases['posts:index'], '/')
+        self.assertEqual(cases['posts:group_list'], '/group/cats/')
+        self.assertEqual(cases['posts:post_edit'], '/posts/7/edit/')
+        self.assertEqual(cases['about:tech'], '/about/tech/')
+        self.assertNotIn('posts:export', cases)
+        self.assertEqual(
+            len(cases),
+            len(posts_urls.urlpatterns) + len(about_urls.urlpatterns) - 1,
+        )
+
+
+class CompareTests(SimpleTestCase):
+    baseline = {'1000': {'guest posts:index': {
+        'p50_ms': 10.0, 'queries': 2, 'bytes': 1000,
+    }}}
+
+    def test_growth_beyond_threshold_is_regression(self):
+        """Рост выше порога попадает в регрессии, в пределах — нет."""
+        current = {'1000': {'guest posts:index': {
+            'p50_ms': 11.0, 'queries': 3, 'bytes': 1000,
+        }}}
+        rows, regressions = compare(
+            self.baseline, current, {'p50_ms': 0.2, 'queries': 0, 'bytes': 0}
+        )
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(
+            regressions, [('1000', 'guest posts:index', 'queries', 2, 3, 0.5)]
+        )
+
+    def test_new_cases_are_not_compared(self):
+        """Случаи, которых нет в сохранённых результатах, пропускаются."""
+        current = {'100000': {'guest posts:index': {'queries': 9}}}
+        self.assertEqual(
+            compare(self.baseline, current, {'queries': 0}), ([], [])
+        )
+
+    def test_growth_from_zero(self):
+        """Появление запросов там, где их не было, — регрессия."""
+        baseline = {'1000': {'guest about:tech': {'queries': 0}}}
+        current = {'1000': {'guest about:tech': {'queries': 1}}}
+        _, regressions = compare(baseline, current, {'queries': 0})
+        self.assertEqual(len(regressions), 1)
+
+    def test_growth_within_noise(self):
+        """Рост меньше шума не регрессия, даже если он в разы."""
+        baseline = {'1000': {'guest about:tech': {'sql_ms': 0.01}}}
+        current = {'1000': {'guest about:tech': {'sql_ms': 0.05}}}
+        _, regressions = compare(
+            baseline, current, {'sql_ms': 0.5}, {'sql_ms': 0.2}
+        )
+        self.assertEqual(regressions, [])
+
+
+class BenchViewsGateTests(SimpleTestCase):
+    """Проверка регрессий bench_views без самих замеров."""
+
+    RESULTS = {'guest posts:index': {
+        'p50_ms': 10.0, 'p95_ms': 12.0, 'p99_ms': 13.0,
+        'queries': 2, 'sql_ms': 1.0, 'bytes': 1000,
+    }}
+
+    def setUp(self):
+        self.results = copy.deepcopy(self.RESULTS)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'views.json')
+        for patch in (
+            mock.patch.object(
+                bench_views, 'benchmark_database', nullcontext
+            ),
+            mock.patch.object(
+                bench_views.Command, '_run_size',
+                side_effect=lambda *args: copy.deepcopy(self.results),
+            ),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def run_command(self, *args):
+        call_command(
+            'bench_views', '--sizes', '10', *args, stdout=StringIO()
+        )
+
+    def test_baseline_is_required(self):
+        """Без эталона команда завершается ошибкой, а не проходит."""
+        with self.assertRaisesMessage(CommandError, 'BENCHMARK_BASELINE'):
+            self.run_command()
+        with self.assertRaisesMessage(CommandError, '--save'):
+            self.run_command('--baseline', self.path)
+
+    def test_regression_fails_command(self):
+        """Превышение порога THRESHOLDS завершает команду ошибкой."""
+        with override_settings(BENCHMARK_BASELINE=self.path):
+            self.run_command('--save')
+            self.run_command()
+            self.results['guest posts:index']['queries'] = 3
+            with self.assertRaisesMessage(CommandError, 'Регрессий: 1'):
+                self.run_command()
@@ -0,0 +1,189 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts import lookups
+from posts.models import Group, Post, User
+from .. import metrics
+
+
+class RenderTests(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        """Корзины выводятся накопленными, с +Inf, суммой и числом."""
+        registry = metrics.Registry()
+        histogram = registry.histogram(
+            'latency', 'Время.', ('view',), buckets=(0.1, 1)
+        )
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, 'posts:index')
+        text = metrics.render(registry.snapshot())
+        self.assertIn('# TYPE latency histogram', text)
+        self.assertIn('latency_bucket{view="posts:index",le="0.1"} 2', text)
+        self.assertIn('latency_bucket{view="posts:index",le="1"} 3', text)
+        self.assertIn('latency_bucket{view="posts:index",le="+Inf"} 4', text)
+        self.assertIn('latency_sum{view="posts:index"} 3.65', text)
+        self.assertIn('latency_count{view="posts:index"} 4', text)
+
+    def test_label_values_are_escaped(self):
+        registry = metrics.Registry()
+        registry.counter('hits', 'Попадания.', ('path',)).inc('a"b\\c')
+        self.assertIn(
+            r'hits{path="a\"b\\c"} 1', metrics.render(registry.snapshot())
+        )
+
+    def test_snapshots_of_processes_are_summed(self):
+        """Снимки нескольких процессов складываются поэлементно."""
+        registry = metrics.Registry()
+        counter = registry.counter('hits', 'Попадания.', ('view',))
+        histogram = registry.histogram('latency', 'Время.', buckets=(1,))
+        counter.inc('a')
+        histogram.observe(0.5)
+        merged = metrics.merge([registry.snapshot(), registry.snapshot()])
+        self.assertEqual(merged['hits']['samples'], [[['a'], 2]])
+        self.assertEqual(
+            merged['latency']['samples'], [[[], ([2, 0], 1.0, 2)]]
+        )
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsEndpointTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='Staff', is_staff=True)
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='Текст', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+        metrics.REGISTRY.reset()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def scrape(self):
+        response = self.staff_client.get(reverse('core:metrics'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_views_are_measured(self):
+        """Ответы, время и SQL-запросы учитываются по имени представления."""
+        client = Client()
+        for _ in range(2):
+            client.get(reverse('posts:index'))
+        client.get(reverse('posts:group_list', args=['missing']))
+        text = self.scrape()
+        self.assertIn(
+            'http_requests_total{view="posts:index",method="GET",'
+            'status="200"} 2', text
+        )
+        self.assertIn(
+            'http_requests_total{view="posts:group_list",method="GET",'
+            'status="404"} 1', text
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count{view="posts:index"} 2', text
+        )
+        self.assertIn('db_queries_total{view="posts:index"}', text)
+        self.assertIn(
+            'page_cache_requests_total{view="index",outcome="hit"} 1', text
+        )
+        self.assertIn('page_cache_hit_ratio{view="index"} 0.5', text)
+
+    def test_staff_or_token_only(self):
+        """Метрики доступны сотрудникам и сборщику с токеном."""
+        url = reverse('core:metrics')
+        author_client = Client()
+        author_client.force_login(self.author)
+        self.assertEqual(Client().get(url).status_code, 403)
+        self.assertEqual(author_client.get(url).status_code, 403)
+        self.assertEqual(Client().get(
+            url, HTTP_AUTHORIZATION='Bearer wrong'
+        ).status_code, 403)
+        response = Client().get(url, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    def test_processes_are_combined_through_directory(self):
+        """С METRICS_DIR /metrics суммирует снимки всех процессов."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        other = metrics.Registry()
+        other.counter(
+            'http_requests_total', 'Ответы.', ('view', 'method', 'status')
+        ).inc('posts:index', 'GET', '200', amount=5)
+        with open(os.path.join(directory, '1-other.json'), 'w') as snapshot:
+            json.dump(other.snapshot(), snapshot)
+        with override_settings(METRICS_DIR=directory):
+            Client().get(reverse('posts:index'))
+            text = self.scrape()
+        self.assertIn(
+            'http_requests_total{view="posts:index",method="GET",'
+            'status="200"} 6', text
+        )
+        self.assertIn(metrics.REGISTRY.filename(), os.listdir(directory))
+
+    def test_exited_processes_are_archived(self):
+        """Счётчики завершившихся процессов переходят в архив, и сумма
+        не убывает; gauge таких процессов отбрасываются.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        other = metrics.Registry()
+        other.counter(
+            'http_requests_total', 'Ответы.', ('view', 'method', 'status')
+        ).inc('posts:index', 'GET', '200', amount=5)
+        snapshot = other.snapshot()
+        snapshot['dead_gauge'] = {
+            'type': 'gauge', 'help': 'Значение.', 'labels': [],
+            'samples': [[[], 3]],
+        }
+        path = os.path.join(directory, '1-dead.json')
+        with open(path, 'w') as stream:
+            json.dump(snapshot, stream)
+        moment = time.time() - 60
+        os.utime(path, (moment, moment))
+        with override_settings(METRICS_DIR=directory, METRICS_STALE_AFTER=15):
+            Client().get(reverse('posts:index'))
+            for _ in range(2):
+                text = self.scrape()
+                self.assertIn(
+                    'http_requests_total{view="posts:index",method="GET",'
+                    'status="200"} 6', text
+                )
+        self.assertNotIn('dead_gauge', text)
+        self.assertNotIn('1-dead.json', os.listdir(directory))
+        self.assertIn(metrics.ARCHIVE, os.listdir(directory))
+
+    def test_idle_process_keeps_snapshot_fresh(self):
+        """Фоновый поток обновляет снимок процесса без запросов."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        registry = metrics.Registry()
+        with override_settings(
+            METRICS_DIR=directory, METRICS_FLUSH_INTERVAL=0.05
+        ):
+            registry.maybe_flush()
+            path = os.path.join(directory, registry.filename())
+            moment = time.time() - 60
+            os.utime(path, (moment, moment))
+            time.sleep(0.3)
+            self.assertGreater(os.path.getmtime(path), moment + 30)
+
+    def test_filename_is_unique_per_process(self):
+        """Имя снимка содержит pid и метку, новую после смены pid."""
+        registry = metrics.Registry()
+        name = registry.filename()
+        self.assertTrue(name.startswith(f'{os.getpid()}-'))
+        self.assertEqual(registry.filename(), name)
+        self.assertNotEqual(metrics.Registry().filename(), name)
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            self.assertNotEqual(registry.filename(), name)
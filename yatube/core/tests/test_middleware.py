@@ -0,0 +1,79 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.template import engines
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import lookups
+from posts.models import Group, Post, User
+from .. import timing
+
+
+@override_settings(SERVER_TIMING=True)
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='Текст', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def timings(self, response):
+        return {
+            name: float(duration) for name, duration in re.findall(
+                r'(\w+);dur=([\d.]+)', response['Server-Timing']
+            )
+        }
+
+    def test_header_reports_sql_templates_and_total(self):
+        """Заголовок содержит время SQL, шаблонов, Python и ответа."""
+        with self.assertLogs('core.timing', 'INFO'), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'sql', 'tpl', 'app', 'total'})
+        self.assertGreater(timings['tpl'], 0)
+        self.assertLessEqual(
+            timings['sql'] + timings['tpl'], timings['total'] + 0.01
+        )
+        self.assertIn(
+            f'desc="{len(queries)} queries"', response['Server-Timing']
+        )
+
+    def test_request_is_logged(self):
+        """На каждый запрос пишется строка журнала с замерами."""
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(reverse('posts:group_list', args=['group']))
+        record = logs.records[0].timing
+        self.assertEqual(record['view'], 'posts:group_list')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertIn('view=posts:group_list', logs.output[0])
+
+    @override_settings(SERVER_TIMING=False)
+    def test_disabled_by_default(self):
+        """Выключенный middleware не добавляет заголовок."""
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_templates_timed_by_backend(self):
+        """Время шаблонов в Server-Timing считает движок TimedTemplates,
+        через который отрисовывается страница.
+        """
+        engine, = engines.all()
+        self.assertIsInstance(engine, timing.TimedTemplates)
+        template = engine.get_template('posts/index.html')
+        self.assertIsInstance(template, timing.TimedTemplate)
+        with self.assertLogs('core.timing', 'INFO'):
+            response = self.client.get(reverse('about:tech'))
+        self.assertTemplateUsed(response, 'about/tech.html')
+        self.assertGreater(self.timings(response)['tpl'], 0)
@@ -0,0 +1,33 @@
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase
+from ..templatetags.pagination import elided_page_range
+
+
+class PageWindowTests(SimpleTestCase):
+    def test_short_range_is_not_elided(self):
+        """Короткий список страниц выводится целиком."""
+        self.assertEqual(elided_page_range(3, 7), [1, 2, 3, 4, 5, 6, 7])
+
+    def test_long_range_is_elided(self):
+        """Длинный список сокращается до краёв и окна вокруг текущей."""
+        cases = {
+            1: [1, 2, 3, None, 100],
+            50: [1, None, 48, 49, 50, 51, 52, None, 100],
+            100: [1, None, 98, 99, 100],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(elided_page_range(number, 100), expected)
+
+    def test_paginator_renders_window_only(self):
+        """Навигация не перечисляет все страницы ленты."""
+        paginator = Paginator(range(1_000_000), 10)
+        html = render_to_string(
+            'posts/includes/paginator.html',
+            {'page_obj': paginator.page(50_000)},
+        )
+        self.assertIn('?page=50001', html)
+        self.assertIn('?page=100000', html)
+        self.assertNotIn('?page=2"', html)
+        self.assertLess(html.count('page-item'), 15)
@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from .. import profiling
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='Staff', is_staff=True)
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='Текст', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(
+            PROFILING_DIR=self.directory, PROFILING_SAMPLE_RATE=0
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_staff_request_is_profiled(self):
+        """Запрос сотрудника с ?profile=1 сохраняет профиль."""
+        response = self.staff_client.get(
+            reverse('posts:index'), {'profile': 1}
+        )
+        self.assertEqual(response.status_code, 200)
+        name = response['X-Profile-Capture']
+        self.assertTrue(name.startswith('posts.index-'))
+        capture = profiling.captures()[0]
+        self.assertEqual(capture['view'], 'posts:index')
+        self.assertEqual(capture['user'], 'Staff')
+        self.assertTrue(capture['functions'])
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory, f'{name}.pstats')
+        ))
+
+    def test_memory_mode_by_header(self):
+        """Заголовок X-Profile: memory добавляет отчёт по памяти."""
+        response = self.staff_client.get(
+            reverse('about:tech'), HTTP_X_PROFILE='memory'
+        )
+        name = response['X-Profile-Capture']
+        self.assertIn('peak_kib', profiling.captures()[0])
+        report = self.staff_client.get(
+            reverse('core:profile_report', args=[name])
+        )
+        self.assertContains(report, 'Пик памяти')
+        self.assertContains(report, 'cumulative')
+
+    def test_opt_in_only(self):
+        """Без параметра и для не-сотрудников профиль не снимается."""
+        responses = [
+            self.staff_client.get(reverse('posts:index')),
+            self.author_client.get(reverse('posts:index'), {'profile': 1}),
+            Client().get(reverse('posts:index'), {'profile': 1}),
+        ]
+        for response in responses:
+            self.assertNotIn('X-Profile-Capture', response)
+        self.assertEqual(profiling.captures(), [])
+
+    def test_explicit_request_is_not_sampled(self):
+        """Запрос сотрудника профилируется при любой доле выборки."""
+        response = self.staff_client.get(
+            reverse('posts:index'), {'profile': 1}
+        )
+        self.assertIn('X-Profile-Capture', response)
+        self.assertFalse(profiling.captures()[0]['sampled'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_profiled(self):
+        """Доля PROFILING_SAMPLE_RATE запросов профилируется сама,
+        без заголовка в ответе.
+        """
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('X-Profile-Capture', response)
+        capture = profiling.captures()[0]
+        self.assertEqual(capture['view'], 'posts:index')
+        self.assertEqual(capture['mode'], 'cpu')
+        self.assertTrue(capture['sampled'])
+        self.assertEqual(capture['user'], '')
+
+    @override_settings(PROFILING_KEEP=2)
+    def test_old_captures_are_pruned(self):
+        """Хранятся только PROFILING_KEEP последних профилей."""
+        for _ in range(3):
+            self.staff_client.get(reverse('about:tech'), {'profile': 1})
+        self.assertEqual(len(profiling.captures()), 2)
+        self.assertEqual(len(os.listdir(self.directory)), 4)
+
+    def test_staff_page_lists_captures(self):
+        """Страница профилей доступна только сотрудникам."""
+        name = self.staff_client.get(
+            reverse('posts:index'), {'profile': 1}
+        )['X-Profile-Capture']
+        response = self.staff_client.get(reverse('core:profiles'))
+        self.assertContains(response, name)
+        download = self.staff_client.get(
+            reverse('core:profile_download', args=[name])
+        )
+        self.assertEqual(download.status_code, 200)
+        for url in (reverse('core:profiles'),
+                    reverse('core:profile_report', args=[name])):
+            with self.subTest(url=url):
+                response = self.author_client.get(url)
+                self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.staff_client.get(
+            reverse('core:profile_report', args=['..%2Fsecret'])
+        ).status_code, 404)
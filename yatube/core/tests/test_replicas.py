@@ -0,0 +1,180 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts import lookups
+from posts.models import AuthorStats, Group, Post, PostCounter, User
+from .. import replicas
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Основная база — тестовая база в памяти, реплика — отдельный
+    файл SQLite, который обновляется только через sync_replica.
+    """
+
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        alias = settings.REPLICA_ALIAS
+        connections.databases[alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        }
+        connections.ensure_defaults(alias)
+        connections.prepare_test_settings(alias)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        alias = settings.REPLICA_ALIAS
+        connections[alias].close()
+        del connections[alias]
+        connections.databases.pop(alias)
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+        self.author = User.objects.create_user(username='Author')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(
+            text='Старый пост', author=self.author, group=self.group
+        )
+        self.sync()
+        # Счётчики и статистика создаются в основной базе при первом
+        # чтении страниц; реплика получает их при синхронизации.
+        for url in (reverse('posts:index'),
+                    reverse('posts:profile', args=['Author'])):
+            Client().get(url)
+        self.sync()
+        cache.clear()
+        lookups.local.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def sync(self):
+        call_command('sync_replica', stdout=StringIO())
+
+    def test_feeds_read_from_replica(self):
+        """Ленты читаются с реплики и видят новые посты после синхронизации.
+        """
+        Post.objects.create(text='Новый пост', author=self.author)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=['Author']),
+            reverse('api:feed'),
+        ]
+        # Окно после сброса кэша страниц прошло: страницы снова
+        # читаются с реплики.
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            for url in urls:
+                with self.subTest(url=url):
+                    response = Client().get(url)
+                    self.assertContains(response, 'Старый пост')
+                    self.assertNotContains(response, 'Новый пост')
+        self.sync()
+        cache.clear()
+        lookups.local.clear()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(Client().get(url), 'Новый пост')
+
+    def test_invalidated_pages_are_rendered_from_primary(self):
+        """Страница, кэш которой сброшен записью, в пределах окна
+        строится по основной базе: отставшая реплика не попадёт в кэш.
+        """
+        Post.objects.create(text='Новый пост', author=self.author)
+        url = reverse('posts:index')
+        self.assertContains(Client().get(url), 'Новый пост')
+        self.assertIsNone(Client().get(url).context)
+
+    def test_lazy_counters_do_not_make_readers_sticky(self):
+        """Создание счётчиков и статистики при чтении не считается
+        записью клиента: cookie основной базы не ставится.
+        """
+        PostCounter.objects.all().delete()
+        AuthorStats.objects.all().delete()
+        self.sync()
+        cache.clear()
+        lookups.local.clear()
+        for url in (reverse('posts:index'),
+                    reverse('posts:profile', args=['Author'])):
+            with self.subTest(url=url):
+                response = Client().get(url)
+                self.assertContains(response, 'Старый пост')
+                self.assertNotIn(
+                    settings.REPLICA_STICKY_COOKIE, response.cookies
+                )
+        self.assertTrue(PostCounter.objects.exists())
+        self.assertTrue(AuthorStats.objects.exists())
+
+    def test_new_group_and_author_are_found_before_sync(self):
+        """Группа и автор ищутся в основной базе: отставшая реплика
+        не закэширует для них «не найдено».
+        """
+        Group.objects.create(title='Новая', slug='new')
+        User.objects.create_user(username='Newcomer')
+        for url in (reverse('posts:group_list', args=['new']),
+                    reverse('posts:profile', args=['Newcomer'])):
+            with self.subTest(url=url):
+                self.assertEqual(Client().get(url).status_code, 200)
+
+    def test_author_reads_own_writes(self):
+        """После записи клиент читает основную базу до конца окна."""
+        response = self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Мой новый пост'}
+        )
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+        profile = self.author_client.get(
+            reverse('posts:profile', args=['Author'])
+        )
+        self.assertContains(profile, 'Мой новый пост')
+        self.assertNotContains(
+            Client().get(reverse('api:feed')), 'Мой новый пост'
+        )
+
+    def test_other_views_read_primary(self):
+        """Страницы вне REPLICA_VIEWS читают основную базу."""
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        response = self.author_client.get(
+            reverse('posts:post_edit', args=[post.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            Client().get(
+                reverse('posts:post_detail', args=[post.pk])
+            ).status_code,
+            404,
+        )
+
+    def test_outside_requests_use_primary(self):
+        """Вне запроса (команды, shell) чтение идёт с основной базы."""
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Post.objects.using('replica').count(), 1)
+
+
+class CreateOnPrimaryTests(TestCase):
+    def test_existing_row_is_returned(self):
+        """Если запись уже создана параллельно, возвращается она."""
+        created = replicas.create_on_primary(
+            PostCounter, {'value': 3}, key='posts'
+        )
+        found = replicas.create_on_primary(
+            PostCounter, {'value': 5}, key='posts'
+        )
+        self.assertEqual(found.pk, created.pk)
+        self.assertEqual(found.value, 3)
+        self.assertEqual(PostCounter.objects.filter(key='posts').count(), 1)
@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts import lookups
+from posts.models import Group, Post, User
+from ..slow_queries import SlowQueryRecorder, aggregate, fingerprint
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_values_and_in_lists_are_normalized(self):
+        """Запросы, различающиеся значениями, дают один отпечаток."""
+        first = fingerprint(
+            'SELECT * FROM t WHERE id IN (%s, %s) AND  x = \'a\' LIMIT 10'
+        )
+        second = fingerprint(
+            'SELECT * FROM t WHERE id IN (%s) AND x = \'b\'\nLIMIT 20'
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(
+            first, 'SELECT * FROM t WHERE id IN (...) AND x = ? LIMIT ?'
+        )
+
+
+class SlowQueryRecorderTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='Текст', author=cls.author, group=cls.group)
+
+    def record(self, func):
+        with self.assertLogs('core.slow_queries', 'WARNING') as logs, \
+                connection.execute_wrapper(SlowQueryRecorder(0)):
+            func()
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_entry_has_params_frame_and_plan(self):
+        """В записи есть параметры, место вызова и план запроса."""
+        entries = self.record(
+            lambda: list(Post.objects.filter(group__slug='group'))
+        )
+        entry = entries[0]
+        self.assertIn('posts_post', entry['sql'])
+        self.assertEqual(entry['params'], ['group'])
+        self.assertIn('core/tests/test_slow_queries.py', entry['frame'])
+        self.assertTrue(entry['plan'])
+        self.assertGreaterEqual(entry['duration_ms'], 0)
+
+    def test_writes_are_not_explained(self):
+        """План строится только для чтения."""
+        entries = self.record(
+            lambda: Group.objects.filter(slug='group').update(title='Новое')
+        )
+        self.assertIsNone(entries[0]['plan'])
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_view_is_recorded(self):
+        """Запросы из представления помечаются его именем."""
+        cache.clear()
+        lookups.local.clear()
+        entries = self.record(lambda: Client().get(reverse('posts:index')))
+        views = {entry['view'] for entry in entries}
+        self.assertIn('posts:index', views)
+
+    def test_fast_queries_are_skipped(self):
+        """Запросы быстрее порога не записываются."""
+        with self.assertRaises(AssertionError), \
+                self.assertLogs('core.slow_queries', 'WARNING'), \
+                connection.execute_wrapper(SlowQueryRecorder(60_000)):
+            list(Post.objects.all())
+
+
+class SlowQueriesCommandTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log = os.path.join(self.directory, 'slow.log')
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def entry(self, sql, duration, view='posts:index'):
+        return {
+            'sql': sql, 'fingerprint': fingerprint(sql), 'view': view,
+            'duration_ms': duration, 'params': [], 'frame': 'x.py:1 in f',
+            'plan': ['SCAN posts_post'],
+        }
+
+    def test_groups_by_fingerprint(self):
+        """Записи с одним отпечатком складываются."""
+        groups = aggregate([
+            self.entry('SELECT 1 FROM t LIMIT 10', 5),
+            self.entry('SELECT 1 FROM t LIMIT 20', 7, 'posts:profile'),
+        ])
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0]['count'], 2)
+        self.assertEqual(groups[0]['total_ms'], 12)
+        self.assertEqual(groups[0]['worst']['duration_ms'], 7)
+        self.assertEqual(groups[0]['views'], {'posts:index', 'posts:profile'})
+
+    def test_command_reads_rotated_files(self):
+        """Команда учитывает ротированные файлы и сортирует худшие выше."""
+        with open(self.log, 'w') as log:
+            log.write(json.dumps(self.entry('SELECT a FROM t', 1)) + '\n')
+        with open(f'{self.log}.1', 'w') as log:
+            log.write(json.dumps(self.entry('SELECT b FROM t', 50)) + '\n')
+        out = StringIO()
+        call_command('slow_queries', log=self.log, plans=True, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertIn('SELECT b FROM t', lines[1])
+        self.assertIn('plan: SCAN posts_post', out.getvalue())
+        self.assertIn('SELECT a FROM t', out.getvalue())
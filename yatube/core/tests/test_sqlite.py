@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase
+
+from .. import sqlite
+
+
+@skipUnless(connection.vendor == 'sqlite', 'прагмы SQLite')
+class SqlitePragmaTests(TestCase):
+    def new_connection(self):
+        """Отдельное соединение с файлом базы: в памяти WAL невозможен."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_dict = dict(
+            connection.settings_dict,
+            NAME=os.path.join(directory, 'db.sqlite3'),
+        )
+        wrapper = connections['default'].__class__(
+            settings_dict, alias='pragmas'
+        )
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_pragmas_applied_to_new_connections(self):
+        """Новое соединение получает прагмы из SQLITE_PRAGMAS."""
+        wrapper = self.new_connection()
+        self.assertEqual(sqlite.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(sqlite.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(sqlite.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(sqlite.pragma(wrapper, 'temp_store'), 2)
+        self.assertEqual(sqlite.pragma(wrapper, 'cache_size'), -64 * 1024)
+
+    def test_checkpoint_empties_wal(self):
+        """wal_checkpoint(TRUNCATE) переносит журнал в базу целиком."""
+        wrapper = self.new_connection()
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (x integer)')
+            cursor.execute('INSERT INTO t VALUES (1)')
+        busy, log_pages, moved = sqlite.checkpoint(wrapper, 'TRUNCATE')
+        self.assertEqual(busy, 0)
+        self.assertEqual(log_pages, moved)
+        self.assertEqual(
+            os.path.getsize(wrapper.settings_dict['NAME'] + '-wal'), 0
+        )
+
+    def test_unknown_checkpoint_mode(self):
+        with self.assertRaises(ValueError):
+            sqlite.checkpoint(connection, 'NOW')
+
+    def test_maintenance_command(self):
+        connections['pragmas'] = self.new_connection()
+        self.addCleanup(connections.__delitem__, 'pragmas')
+        out = StringIO()
+        call_command(
+            'sqlite_maintenance', database='pragmas', checkpoint='truncate',
+            stdout=out,
+        )
+        self.assertIn('wal_checkpoint(TRUNCATE): busy=0', out.getvalue())
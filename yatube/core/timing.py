@@ -0,0 +1,104 @@
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template.backends.django import (
+    DjangoTemplates, Template, reraise,
+)
+from django.template.exceptions import TemplateDoesNotExist
+
+
+_local = threading.local()
+
+
+class RequestTimings:
+    """Число и время SQL-запросов и время отрисовки шаблонов за запрос.
+
+    Время шаблонов не включает запросы, выполненные во время
+    отрисовки (например, ленивыми выборками): они учтены в sql.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.total = 0.0
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - start
+            self.queries += 1
+
+    @property
+    def app(self):
+        """Время вне SQL и шаблонов."""
+        return max(0.0, self.total - self.sql - self.template)
+
+
+def active():
+    """Замеры, открытые в этом потоке, от внешнего к внутреннему."""
+    return getattr(_local, 'stack', ())
+
+
+class TimedTemplate(Template):
+    """Шаблон, время отрисовки которого попадает в открытые замеры."""
+
+    def render(self, context=None, request=None):
+        stack = active()
+        if not stack or getattr(_local, 'rendering', False):
+            # Вложенные render_to_string уже учтены внешним шаблоном.
+            return super().render(context, request)
+        _local.rendering = True
+        sql_before = [timings.sql for timings in stack]
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            elapsed = time.perf_counter() - start
+            for timings, sql in zip(stack, sql_before):
+                timings.template += elapsed - (timings.sql - sql)
+            _local.rendering = False
+
+
+class TimedTemplates(DjangoTemplates):
+    """Движок шаблонов Django, учитывающий время отрисовки в
+    measure_request. Вне замеров отрисовка не меняется.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name), self
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+@contextmanager
+def measure_request():
+    """Собирает RequestTimings для всех запросов к базам и шаблонов
+    внутри блока в текущем потоке. Блоки можно вкладывать: запросы
+    и шаблоны учитываются в каждом из открытых.
+    """
+    timings = RequestTimings()
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    _local.stack.append(timings)
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(timings.execute)
+                )
+            yield timings
+    finally:
+        timings.total = time.perf_counter() - start
+        _local.stack.remove(timings)
@@ -0,0 +1,20 @@
+from django.urls import path
+from . import views
+
+
+app_name = 'core'
+
+urlpatterns = [
+    path('metrics', views.metrics, name='metrics'),
+    path('staff/profiles/', views.profiles, name='profiles'),
+    path(
+        'staff/profiles/<str:name>/',
+        views.profile_report,
+        name='profile_report',
+    ),
+    path(
+        'staff/profiles/<str:name>/pstats/',
+        views.profile_download,
+        name='profile_download',
+    ),
+]
@@ -0,0 +1,64 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseForbidden)
+from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from . import metrics as registry, profiling
+
+
+@staff_member_required
+def profiles(request):
+    """Список снятых профилей со сводкой по накопленному времени."""
+    context = {
+        'captures': profiling.captures(),
+    }
+    return render(request, 'core/profiles.html', context)
+
+
+@staff_member_required
+def profile_report(request, name):
+    """Текстовый отчёт pstats и, если есть, отчёт по памяти."""
+    path = profiling.capture_file(name, '.pstats')
+    if path is None:
+        raise Http404
+    report = profiling.format_stats(path)
+    allocations = profiling.capture_file(name, '.alloc.txt')
+    if allocations is not None:
+        with open(allocations) as allocation_report:
+            report += '\n' + allocation_report.read()
+    return HttpResponse(report, content_type='text/plain; charset=utf-8')
+
+
+@staff_member_required
+def profile_download(request, name):
+    """Файл .pstats для snakeviz, pstats и подобных инструментов."""
+    path = profiling.capture_file(name, '.pstats')
+    if path is None:
+        raise Http404
+    return FileResponse(
+        open(path, 'rb'), as_attachment=True, filename=f'{name}.pstats'
+    )
+
+
+def _may_scrape(request):
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and constant_time_compare(header, f'Bearer {token}'):
+        return True
+    return request.user.is_active and request.user.is_staff
+
+
+@require_GET
+def metrics(request):
+    """Метрики в формате Prometheus для сотрудников или сборщика
+    с токеном METRICS_TOKEN в заголовке Authorization: Bearer.
+    """
+    if not _may_scrape(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -1,9 +1,94 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from . import counters, search, sharding
 from .models import Post, Group
+from .paginators import CountedPaginator
+
+
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """Автокомплит, который берёт подпись выбранного значения из уже
+    загруженного объекта, а не запросом к базе на каждую строку.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.labels = {}
+
+    def __deepcopy__(self, memo):
+        # Каждая форма получает копию виджета: подписи одной формы
+        # не должны попадать в другие.
+        obj = super().__deepcopy__(memo)
+        obj.labels = self.labels.copy()
+        return obj
+
+    def optgroups(self, name, value, attr=None):
+        field = self.choices.field
+        selected = [str(v) for v in value if str(v) not in field.empty_values]
+        if any(pk not in self.labels for pk in selected):
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        for pk in selected:
+            options.append(self.create_option(
+                name, pk, self.labels[pk], True, len(options)
+            ))
+        return [(None, options, 0)]
+
+
+class PostAdminForm(forms.ModelForm):
+    """Передаёт виджетам автокомплита подписи связанных объектов,
+    загруженных вместе с постом через select_related.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if not isinstance(widget, LoadedAutocompleteSelect):
+                continue
+            cache = Post._meta.get_field(name)
+            if cache.is_cached(self.instance):
+                related = cache.get_cached_value(self.instance)
+                if related is not None:
+                    widget.labels[str(related.pk)] = (
+                        field.label_from_instance(related)
+                    )
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """Шард, посты которого показывает список. Список читает одну
+    базу, поэтому варианта «Все» нет: по умолчанию — первый шард.
+    """
+    title = 'шард'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in sharding.shards()]
+
+    def _alias(self):
+        if self.value() in sharding.shards():
+            return self.value()
+        return sharding.shards()[0]
+
+    def choices(self, changelist):
+        for alias, title in self.lookup_choices:
+            yield {
+                'selected': alias == self._alias(),
+                'query_string': changelist.get_query_string(
+                    {self.parameter_name: alias}
+                ),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        return queryset.using(self._alias())
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
+    form = PostAdminForm
     list_display = (
         'pk',
         'text',
@@ -12,10 +97,90 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    # Полный COUNT(*) по таблице для «Показать все» не нужен.
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if sharding.enabled():
+            # На шардах нет таблиц авторов и групп: они подгружаются
+            # из основной базы отдельными запросами, см. роутер.
+            queryset = queryset.prefetch_related('author', 'group')
+        return queryset
+
+    def get_list_select_related(self, request):
+        if sharding.enabled():
+            # Пустой кортеж, а не False: с False список всё равно
+            # делает select_related() по полям из list_display.
+            return ()
+        return super().get_list_select_related(request)
+
+    def get_list_filter(self, request):
+        if sharding.enabled():
+            return (ShardListFilter, *super().get_list_filter(request))
+        return super().get_list_filter(request)
+
+    def get_readonly_fields(self, request, obj=None):
+        """С шардами автор существующего поста не меняется: id поста
+        несёт корзину автора, и пост остался бы не на своём шарде.
+        """
+        fields = super().get_readonly_fields(request, obj)
+        if sharding.enabled() and obj is not None:
+            return (*fields, 'author')
+        return fields
+
+    def get_object(self, request, object_id, from_field=None):
+        """С шардами пост читается с шарда, на который указывает id."""
+        if not sharding.enabled() or from_field is not None:
+            return super().get_object(request, object_id, from_field)
+        try:
+            alias = sharding.shard_for_post(object_id)
+        except ValueError:
+            return None
+        return self.get_queryset(request).using(alias).filter(
+            pk=object_id
+        ).first()
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs['widget'] = LoadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', PostAdminForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        """Без фильтров число постов берётся из хранилища счётчиков,
+        как в ленте; с фильтрами или поиском считается COUNT(*).
+        """
+        count_key = None
+        # Счётчик общий для всех шардов, а список показывает один.
+        if not sharding.enabled() and not queryset.query.has_filters():
+            count_key = counters.GLOBAL_KEY
+        return CountedPaginator(
+            queryset, per_page, orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            count_key=count_key,
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту идёт через полнотекстовый индекс,
+        а не через LIKE '%...%' по всей таблице.
+        """
+        if not search.is_supported() or not search.match_query(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        return search.filter_posts(queryset, search_term), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -26,4 +191,6 @@ class GroupAdmin(admin.ModelAdmin):
     )
     search_fields = ('title',)
     list_filter = ('title',)
+    # Автокомплит групп в PostAdmin постранично выдаёт эту выборку.
+    ordering = ('title',)
     empty_value_display = '-пусто-'
@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(using, **kwargs):
+    from . import search
+    search.install(connections[using])
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from core import metrics
+        from . import cache, sharding, signals  # noqa: F401
+        metrics.register_collector(cache.page_cache_metrics)
+        connection_created.connect(sharding.on_connection_created)
+        post_migrate.connect(install_search_index, sender=self)
@@ -0,0 +1,166 @@
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core import replicas
+
+
+FEED_SCOPE = 'feed'
+# Область, от которой зависят все страницы: invalidate(ALL_SCOPE)
+# сбрасывает кэш страниц целиком, не трогая остальной кэш.
+ALL_SCOPE = 'all'
+VERSION_KEY = 'pagecache:version:{}'
+STATS_KEY = 'pagecache:stats:{}:{}'
+PAGE_KEY = 'pagecache:page:{}:{}'
+
+# Имена представлений, страницы которых кэшируются.
+CACHED_VIEWS = []
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def get_cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def _new_version(moment=0.0):
+    """Версия области: случайная часть и время сброса (unix)."""
+    return f'{uuid.uuid4().hex}:{moment}'
+
+
+def _version_time(version):
+    try:
+        return float(version.rpartition(':')[2])
+    except ValueError:
+        return 0.0
+
+
+def _scope_versions(cache, scopes):
+    """Текущие версии областей; недостающие заводятся заново."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _invalidated_recently(versions):
+    """Сброшена ли какая-то из областей меньше REPLICA_STICKY_SECONDS
+    назад: реплика могла ещё не получить изменение, из-за которого
+    кэш сброшен.
+    """
+    since = time.time() - settings.REPLICA_STICKY_SECONDS
+    return any(_version_time(version) > since for version in versions)
+
+
+def invalidate(*scopes):
+    """Делает недоступными все закэшированные страницы областей."""
+    cache = get_cache()
+    now = time.time()
+    cache.set_many(
+        {VERSION_KEY.format(scope): _new_version(now) for scope in scopes},
+        None,
+    )
+
+
+def _record(cache, view_name, outcome):
+    key = STATS_KEY.format(view_name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def page_cache_stats(view_names=None):
+    """Попадания и промахи кэша страниц по каждому представлению."""
+    cache = get_cache()
+    stats = {}
+    for view_name in view_names or CACHED_VIEWS:
+        hits = cache.get(STATS_KEY.format(view_name, 'hit'), 0)
+        misses = cache.get(STATS_KEY.format(view_name, 'miss'), 0)
+        total = hits + misses
+        stats[view_name] = {
+            'hits': hits,
+            'misses': misses,
+            'ratio': hits / total if total else 0.0,
+        }
+    return stats
+
+
+def page_cache_metrics():
+    """page_cache_stats() в формате core.metrics для /metrics."""
+    stats = page_cache_stats()
+    return {
+        'page_cache_requests_total': {
+            'type': 'counter',
+            'help': 'Обращения к кэшу страниц лент.',
+            'labels': ['view', 'outcome'],
+            'samples': [
+                [[view_name, outcome], view_stats[key]]
+                for view_name, view_stats in stats.items()
+                for outcome, key in (('hit', 'hits'), ('miss', 'misses'))
+            ],
+        },
+        'page_cache_hit_ratio': {
+            'type': 'gauge',
+            'help': 'Доля попаданий в кэш страниц лент.',
+            'labels': ['view'],
+            'samples': [
+                [[view_name], view_stats['ratio']]
+                for view_name, view_stats in stats.items()
+            ],
+        },
+    }
+
+
+def cache_anonymous_page(scopes):
+    """Кэширует страницу для анонимных посетителей.
+
+    scopes получает аргументы представления и возвращает области,
+    от которых зависит страница. Ключ страницы включает версии этих
+    областей, имя представления, путь и параметры запроса, поэтому
+    invalidate() по области сбрасывает все её страницы разом.
+    """
+    def decorator(view):
+        CACHED_VIEWS.append(view.__name__)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            cache = get_cache()
+            versions = _scope_versions(
+                cache, [ALL_SCOPE, *scopes(*args, **kwargs)]
+            )
+            digest = hashlib.md5(
+                '|'.join(versions + [request.get_full_path()]).encode()
+            ).hexdigest()
+            key = PAGE_KEY.format(view.__name__, digest)
+            response = cache.get(key)
+            if response is not None:
+                _record(cache, view.__name__, 'hit')
+                return response
+            _record(cache, view.__name__, 'miss')
+            if _invalidated_recently(versions):
+                # Иначе отстающая реплика отдала бы страницу до
+                # изменения, и она попала бы в кэш под новой версией.
+                replicas.use_primary()
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies:
+                cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
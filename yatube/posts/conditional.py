@@ -0,0 +1,133 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+from django.views.decorators.http import condition
+
+from . import counters, lookups, sharding, stats
+from .models import AuthorStats, Post, PostCounter
+
+
+def _counter_key(prefix, field='pk'):
+    return Concat(Value(prefix), Cast(field, CharField()))
+
+
+def _scope_state(key, recount):
+    """Число постов и время изменения области одним запросом по
+    уникальному ключу счётчика. Если счётчика ещё нет, он создаётся
+    через recount(); None — области не существует.
+    """
+    states = PostCounter.objects.filter(key=key).values_list(
+        'value', 'modified'
+    )
+    state = states.first()
+    if state is None and recount():
+        # Только что созданного счётчика на реплике ещё нет.
+        state = states.using(DEFAULT_DB_ALIAS).first()
+    return state
+
+
+def feed_state():
+    def recount():
+        counters.get_count(counters.GLOBAL_KEY, sharding.posts())
+        return True
+
+    return _scope_state(counters.GLOBAL_KEY, recount)
+
+
+def group_state(slug):
+    group = lookups.group(slug)
+    if group is None:
+        return None
+    key = counters.group_key(group.pk)
+
+    def recount():
+        counters.get_count(key, sharding.posts().filter(group=group))
+        return True
+
+    return _scope_state(key, recount)
+
+
+def author_state(username):
+    author = lookups.author(username)
+    if author is None:
+        return None
+    states = AuthorStats.objects.filter(author_id=author.pk).values_list(
+        'post_count', 'modified'
+    )
+    state = states.first()
+    if state is None:
+        stats.for_author_id(author.pk)
+        state = states.using(DEFAULT_DB_ALIAS).first()
+    return state
+
+
+def post_state(post_id):
+    """Время изменения поста и областей, видимых на его странице
+    (число постов и имя автора, slug группы).
+    """
+    if sharding.enabled():
+        return _sharded_post_state(post_id)
+    group_modified = Subquery(PostCounter.objects.filter(
+        key=_counter_key('group:', OuterRef('group_id'))
+    ).values('modified')[:1])
+    state = Post.objects.filter(pk=post_id).annotate(
+        author_modified=stats.modified_subquery(),
+        group_modified=group_modified,
+    ).values_list('updated', 'author_modified', 'group_modified').first()
+    if state is None:
+        return None
+    return None, max(moment for moment in state if moment is not None)
+
+
+def _sharded_post_state(post_id):
+    """post_state для поста на шарде: счётчики и статистика авторов
+    лежат в основной базе, поэтому читаются отдельными запросами.
+    """
+    post = sharding.posts(post_id=post_id).filter(pk=post_id).values_list(
+        'updated', 'author_id', 'group_id'
+    ).first()
+    if post is None:
+        return None
+    updated, author_id, group_id = post
+    moments = [updated, AuthorStats.objects.filter(
+        author_id=author_id
+    ).values_list('modified', flat=True).first()]
+    if group_id is not None:
+        moments.append(PostCounter.objects.filter(
+            key=counters.group_key(group_id)
+        ).values_list('modified', flat=True).first())
+    return None, max(moment for moment in moments if moment is not None)
+
+
+def _validators(request, state_func, kwargs):
+    """ETag и Last-Modified страницы; считаются один раз на запрос."""
+    if not hasattr(request, '_page_validators'):
+        state = state_func(**kwargs)
+        request._page_validators = (None, None)
+        if state is not None:
+            count, modified = state
+            etag = '{}-{}-{}-{}'.format(
+                request.resolver_match.view_name,
+                count,
+                modified.timestamp(),
+                request.user.pk or 0,
+            )
+            request._page_validators = (etag, modified)
+    return request._page_validators
+
+
+def conditional_page(state_func):
+    """Отвечает 304 Not Modified, не выполняя представление, если
+    состояние страницы не изменилось с прошлого запроса клиента.
+
+    state_func получает аргументы представления и возвращает
+    (число постов, время изменения) или None.
+    """
+    return condition(
+        etag_func=lambda request, **kwargs: _validators(
+            request, state_func, kwargs
+        )[0],
+        last_modified_func=lambda request, **kwargs: _validators(
+            request, state_func, kwargs
+        )[1],
+    )
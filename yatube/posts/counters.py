@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from core import replicas
+from . import sharding
+from .models import PostCounter
+
+
+GLOBAL_KEY = 'posts'
+
+
+def group_key(group_id):
+    return f'group:{group_id}'
+
+
+def post_keys(group_id=None):
+    """Ключи счётчиков, в которые входит пост.
+    Посты автора считает его статистика, см. stats.
+    """
+    keys = [GLOBAL_KEY]
+    if group_id is not None:
+        keys.append(group_key(group_id))
+    return keys
+
+
+def author_group_ids(author_id):
+    """Группы, в которых есть посты автора."""
+    return set(sharding.posts(author_id=author_id).filter(
+        author_id=author_id, group__isnull=False
+    ).values_list('group_id', flat=True).distinct())
+
+
+def change(keys, delta):
+    """Атомарно сдвигает существующие счётчики на delta.
+
+    Отсутствующие счётчики не создаются: их посчитает get_count
+    при первом чтении.
+    """
+    PostCounter.objects.filter(key__in=keys).update(
+        value=F('value') + delta, modified=timezone.now()
+    )
+
+
+def touch(keys):
+    """Отмечает изменение в областях без изменения числа постов."""
+    PostCounter.objects.filter(key__in=keys).update(modified=timezone.now())
+
+
+def get_count(key, posts):
+    """Число постов по ключу; при первом обращении считается
+    по выборке posts и сохраняется.
+    """
+    value = PostCounter.objects.filter(key=key).values_list(
+        'value', flat=True
+    ).first()
+    if value is not None:
+        return value
+    counter = replicas.create_on_primary(
+        PostCounter, {'value': posts.order_by().count()}, key=key
+    )
+    return counter.value
+
+
+@transaction.atomic
+def recount():
+    """Пересчитывает все счётчики с нуля. Возвращает их число.
+    Статистику авторов проверяет stats.find_inconsistent.
+    """
+    values = {GLOBAL_KEY: 0}
+    for posts in sharding.each_shard():
+        values[GLOBAL_KEY] += posts.count()
+        by_group = posts.filter(group__isnull=False).values(
+            'group'
+        ).annotate(total=Count('id')).order_by()
+        for row in by_group:
+            key = group_key(row['group'])
+            values[key] = values.get(key, 0) + row['total']
+    PostCounter.objects.all().delete()
+    PostCounter.objects.bulk_create(
+        PostCounter(key=key, value=value) for key, value in values.items()
+    )
+    return len(values)
@@ -0,0 +1,149 @@
+import datetime
+import itertools
+import math
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from . import bulk
+from .models import Group, User
+
+
+WORDS = (
+    'день город время дом работа друг утро вечер дорога море лес река '
+    'книга письмо песня музыка окно улица парк мост поезд вокзал чай '
+    'кофе хлеб сад дождь снег солнце ветер небо звезда луна гора поле '
+    'школа урок учитель ученик семья мама папа брат сестра собака кот '
+    'птица цветок дерево лист осень зима весна лето праздник подарок '
+    'встреча разговор вопрос ответ мысль идея план проект задача код '
+    'сегодня вчера завтра снова очень долго быстро тихо громко рядом '
+    'далеко красивый новый старый большой маленький тёплый холодный '
+    'хороший интересный важный простой сложный первый последний '
+    'читать писать думать смотреть слушать ходить ехать жить любить'
+).split()
+POOL_WORDS = 200_000
+POST_FIELDS = ('text', 'pub_date', 'updated', 'author', 'group')
+# Дата по умолчанию фиксирована, чтобы набор зависел только от seed.
+DEFAULT_END = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def zipf_cum_weights(count, skew):
+    """Накопленные веса рангов 1..count по закону Ципфа."""
+    return list(itertools.accumulate(
+        1 / rank ** skew for rank in range(1, count + 1)
+    ))
+
+
+class DatasetGenerator:
+    """Синтетические пользователи, группы и посты для бенчмарков.
+
+    Число постов на автора и на группу распределено по Ципфу с
+    показателями author_skew и group_skew, длина текста — логнормально
+    с медианой text_median символов, даты публикации равномерно
+    растут вместе с id за days дней до end. При одном seed набор
+    один и тот же.
+    """
+
+    def __init__(self, seed=0, prefix='bench', author_skew=1.1,
+                 group_skew=1.1, no_group_ratio=0.2, text_median=200,
+                 days=3 * 365, end=DEFAULT_END):
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.author_skew = author_skew
+        self.group_skew = group_skew
+        self.no_group_ratio = no_group_ratio
+        self.text_median = text_median
+        self.days = days
+        self.end = end
+        self.pool = ' '.join(self.rng.choices(WORDS, k=POOL_WORDS))
+
+    def _new_ids(self, model, create):
+        last = model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        create()
+        return list(model.objects.filter(pk__gt=last).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+
+    def create_users(self, count, batch_size=500):
+        password = make_password(None)
+        return self._new_ids(User, lambda: User.objects.bulk_create(
+            (User(username=f'{self.prefix}{i}', password=password)
+             for i in range(count)),
+            batch_size=batch_size,
+        ))
+
+    def create_groups(self, count, batch_size=500):
+        return self._new_ids(Group, lambda: Group.objects.bulk_create(
+            (Group(title=f'Группа {i}', slug=f'{self.prefix}-{i}',
+                   description=self._text(self.text_median))
+             for i in range(count)),
+            batch_size=batch_size,
+        ))
+
+    def _text(self, median):
+        length = int(self.rng.lognormvariate(math.log(median), 0.9))
+        length = min(max(length, 10), 5000)
+        start = self.pool.find(' ', self.rng.randrange(len(self.pool))) + 1
+        text = self.pool[start:start + length]
+        while len(text) < length:
+            text += ' ' + self.pool[:length - len(text)]
+        return text.strip().capitalize()
+
+    def post_rows(self, count, author_ids, group_ids):
+        """Кортежи значений POST_FIELDS для count постов; даты
+        наивные, в UTC.
+        """
+        authors = list(author_ids)
+        groups = list(group_ids)
+        # Популярность не должна совпадать с порядком создания.
+        self.rng.shuffle(authors)
+        self.rng.shuffle(groups)
+        author_weights = zipf_cum_weights(len(authors), self.author_skew)
+        group_weights = zipf_cum_weights(len(groups), self.group_skew)
+        span = datetime.timedelta(days=self.days).total_seconds()
+        # Наивные даты в UTC вставляются без перевода поясов
+        # на каждом значении: это заметная доля времени генерации.
+        start = (self.end - datetime.timedelta(days=self.days)).astimezone(
+            datetime.timezone.utc
+        ).replace(tzinfo=None)
+        choices = self.rng.choices
+        for i in range(count):
+            pub_date = start + datetime.timedelta(
+                seconds=span * (i + self.rng.random()) / count
+            )
+            updated = pub_date
+            if self.rng.random() < 0.05:
+                updated += datetime.timedelta(
+                    seconds=self.rng.randrange(30 * 24 * 3600)
+                )
+            group = None
+            if groups and self.rng.random() >= self.no_group_ratio:
+                group = choices(groups, cum_weights=group_weights)[0]
+            yield (
+                self._text(self.text_median),
+                pub_date,
+                updated,
+                choices(authors, cum_weights=author_weights)[0],
+                group,
+            )
+
+    def create_posts(self, count, author_ids, group_ids, batch_size=10_000):
+        rows = self.post_rows(count, author_ids, group_ids)
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                bulk.insert_posts(POST_FIELDS, batch, batch_size)
+
+    def generate(self, users, groups, posts, batch_size=10_000):
+        """Создаёт набор данных. Индексы постов, полнотекстовый индекс
+        и счётчики перестраиваются один раз в конце.
+        """
+        author_ids = self.create_users(users)
+        group_ids = self.create_groups(groups)
+        with bulk.deferred_maintenance():
+            self.create_posts(posts, author_ids, group_ids, batch_size)
@@ -0,0 +1,132 @@
+import csv
+import datetime
+import heapq
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import sharding
+from .models import Group, Post, User
+
+
+# Колонка выгрузки -> поле выборки .values_list().
+COLUMNS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+}
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+# На шардах нет авторов и групп: их имена подставляются отдельно.
+SHARD_COLUMNS = ('id', 'text', 'pub_date', 'updated', 'author_id',
+                 'group_id')
+CHUNK_SIZE = 2000
+
+
+def parse_since(value):
+    """Дата или дата-время ISO 8601; без пояса — в поясе проекта."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Неверная дата: {value}')
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _ordered(posts, since, since_id):
+    posts = posts.order_by('pub_date', 'id')
+    if since is None:
+        return posts
+    if since_id is None:
+        return posts.filter(pub_date__gte=since)
+    return posts.filter(
+        Q(pub_date__gt=since) | Q(pub_date=since, id__gt=since_id)
+    )
+
+
+def export_rows(since=None, since_id=None, chunk_size=CHUNK_SIZE):
+    """Посты по возрастанию (pub_date, id) кортежами значений COLUMNS.
+
+    Строки читаются из курсора порциями по chunk_size, объекты Post
+    не создаются. since (и since_id для постов с той же датой) задают
+    позицию, после которой продолжается инкрементальная выгрузка.
+    """
+    if sharding.enabled():
+        return _sharded_rows(since, since_id, chunk_size)
+    return _ordered(Post.objects.all(), since, since_id).values_list(
+        *COLUMNS.values()
+    ).iterator(chunk_size=chunk_size)
+
+
+def _sharded_rows(since, since_id, chunk_size):
+    """export_rows с шардов: потоки шардов сливаются по (pub_date, id),
+    имена авторов и slug групп читаются из основной базы на каждую
+    порцию из chunk_size строк.
+    """
+    streams = [
+        _ordered(posts, since, since_id).values_list(
+            *SHARD_COLUMNS
+        ).iterator(chunk_size=chunk_size)
+        for posts in sharding.each_shard()
+    ]
+    merged = heapq.merge(*streams, key=lambda row: (row[2], row[0]))
+    while True:
+        chunk = list(islice(merged, chunk_size))
+        if not chunk:
+            return
+        authors = User.objects.only('username').in_bulk(
+            {row[4] for row in chunk}
+        )
+        groups = Group.objects.only('slug').in_bulk(
+            {row[5] for row in chunk if row[5] is not None}
+        )
+        for pk, text, pub_date, updated, author_id, group_id in chunk:
+            yield (
+                pk, text, pub_date, updated, authors[author_id].username,
+                groups[group_id].slug if group_id is not None else None,
+            )
+
+
+class _Echo:
+    """Файлоподобный объект для csv.writer: строка возвращается
+    вызывающему, а не накапливается в буфере.
+    """
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render_ndjson(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(COLUMNS, row))) + '\n'
+
+
+RENDERERS = {
+    'csv': render_csv,
+    'ndjson': render_ndjson,
+}
+
+
+def render(rows, export_format):
+    """Выгрузка построчно в формате csv или ndjson."""
+    return RENDERERS[export_format](rows)
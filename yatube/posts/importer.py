@@ -0,0 +1,193 @@
+import csv
+import json
+import os
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import bulk, cache, lookups, timeline
+from .export import parse_since
+from .models import Follow, Group, Post, User
+
+
+FORMATS = ('csv', 'ndjson')
+BATCH_SIZE = 1000
+POST_FIELDS = ('text', 'pub_date', 'updated', 'author', 'group')
+# Ограничение SQLite на число параметров запроса.
+LOOKUP_CHUNK = 500
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(stream, import_format):
+    """Строки выгрузки словарями: колонки как у export_posts."""
+    if import_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            raise RowError(f'Строка {number}: {exc}')
+
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _parse_moment(value, default):
+    if not value:
+        return default
+    return parse_since(value)
+
+
+class Checkpoint:
+    """Число уже импортированных строк входного потока в файле.
+
+    Файл переписывается после фиксации каждой пачки, поэтому после
+    сбоя импорт продолжается со следующей за ней строки.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as checkpoint:
+            return json.load(checkpoint)['rows']
+
+    def save(self, rows):
+        if not self.path:
+            return
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as checkpoint:
+            json.dump({'rows': rows}, checkpoint)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class PostImporter:
+    """Вставляет посты пачками через bulk.insert_posts.
+
+    Авторы и группы ищутся по словарям username -> id и slug -> id,
+    которые пополняются по мере чтения; недостающие создаются одним
+    bulk_create на пачку. count_posts=False отключает поддержку
+    счётчиков на каждой пачке (см. bulk.deferred_maintenance).
+    """
+
+    def __init__(self, count_posts=True):
+        self.count_posts = count_posts
+        self.users = {}
+        self.groups = {}
+        self.touched_users = set()
+        self.touched_groups = set()
+
+    def _resolve(self, names, lookup, model, field, build, kind):
+        missing = sorted(set(names) - lookup.keys())
+        for start in range(0, len(missing), LOOKUP_CHUNK):
+            chunk = missing[start:start + LOOKUP_CHUNK]
+            found = model.objects.filter(**{f'{field}__in': chunk})
+            lookup.update(found.values_list(field, 'pk'))
+            new = [name for name in chunk if name not in lookup]
+            if new:
+                model.objects.bulk_create(
+                    (build(name) for name in new), batch_size=LOOKUP_CHUNK
+                )
+                found = model.objects.filter(**{f'{field}__in': new})
+                lookup.update(found.values_list(field, 'pk'))
+                # Раньше эти имена могли попасть в кэш как «не найдено».
+                lookups.invalidate(kind, *new)
+
+    def _resolve_users(self, usernames):
+        self._resolve(
+            usernames, self.users, User, 'username',
+            lambda name: User(username=name, password=make_password(None)),
+            'author',
+        )
+
+    def _resolve_groups(self, slugs):
+        self._resolve(
+            slugs, self.groups, Group, 'slug',
+            lambda slug: Group(title=slug, slug=slug, description=''),
+            'group',
+        )
+
+    def _build(self, row, now):
+        author = row.get('author')
+        if not row.get('text') or not author:
+            raise RowError('у поста нет текста или автора')
+        pub_date = _parse_moment(row.get('pub_date'), now)
+        group = row.get('group') or None
+        return Post(
+            text=row['text'],
+            pub_date=pub_date,
+            updated=_parse_moment(row.get('updated'), pub_date),
+            author_id=self.users[author],
+            group_id=self.groups[group] if group else None,
+        )
+
+    @transaction.atomic
+    def import_batch(self, rows, first_row=0):
+        """Импортирует пачку строк в одной транзакции.
+        Возвращает число созданных постов. first_row — номер первой
+        строки пачки во входном потоке, для сообщений об ошибках.
+        """
+        usernames = {row['author'] for row in rows if row.get('author')}
+        slugs = {row['group'] for row in rows if row.get('group')}
+        self._resolve_users(usernames)
+        self._resolve_groups(slugs)
+        self.touched_users |= usernames
+        self.touched_groups |= slugs
+        now = timezone.now()
+        posts = []
+        for number, row in enumerate(rows, first_row + 1):
+            try:
+                posts.append(self._build(row, now))
+            except ValueError as exc:
+                raise RowError(f'Строка {number}: {exc}')
+        # Не bulk_create: auto_now_add и auto_now заменили бы исходные
+        # даты текущим временем.
+        bulk.insert_posts(POST_FIELDS, (
+            (post.text, post.pub_date, post.updated, post.author_id,
+             post.group_id)
+            for post in posts
+        ), batch_size=LOOKUP_CHUNK)
+        if self.count_posts:
+            bulk.count_created(posts)
+        self._fan_out({post.author_id for post in posts})
+        return len(posts)
+
+    def _fan_out(self, author_ids):
+        """Ставит посты пачки в очередь раскладки по лентам: insert_rows
+        не отправляет post_save, где это делается для новых постов.
+        Авторам без подписчиков раскладывать некуда.
+        """
+        followed = Follow.objects.filter(
+            author_id__in=author_ids
+        ).values_list('author_id', flat=True).distinct()
+        for author_id in followed:
+            timeline.refill(author_id)
+
+    def invalidate_pages(self):
+        """Сбрасывает кэш страниц, на которых появились посты."""
+        cache.invalidate(
+            cache.FEED_SCOPE,
+            *(cache.group_scope(slug) for slug in self.touched_groups),
+            *(cache.author_scope(name) for name in self.touched_users),
+        )
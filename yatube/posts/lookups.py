@@ -0,0 +1,138 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from core import metrics
+from .models import Group, User
+
+
+KEY = 'lookup:{}:{}'
+# Отметка «не найдено» для отрицательного кэша: перебор несуществующих
+# slug и имён не доходит до базы.
+NOT_FOUND = 'lookup:not-found'
+
+LOOKUPS = metrics.REGISTRY.counter(
+    'lookup_cache_requests_total',
+    'Поиск групп по slug и авторов по имени: local и shared — '
+    'попадания в кэш процесса и общий кэш, miss — запрос к базе.',
+    ('kind', 'outcome'),
+)
+
+
+class LocalCache:
+    """LRU в памяти процесса со временем жизни записей."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout, size):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + timeout)
+            self._items.move_to_end(key)
+            while len(self._items) > size:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+local = LocalCache()
+
+
+def get_cache():
+    return caches[settings.LOOKUP_CACHE_ALIAS]
+
+
+def _lookup(kind, key, load):
+    """Объект из кэша процесса, общего кэша или базы (load()).
+
+    Изменения в этом процессе сбрасывают оба кэша сразу, в других
+    процессах кэш процесса отстаёт не дольше LOOKUP_LOCAL_TIMEOUT.
+    load() читает основную базу, а не реплику: иначе отставшая реплика
+    закэшировала бы «не найдено» для только что созданного объекта.
+    """
+    cache_key = KEY.format(kind, key)
+    outcome = 'local'
+    value = local.get(cache_key)
+    if value is not None:
+        value = pickle.loads(value)
+    else:
+        shared = get_cache()
+        outcome = 'shared'
+        value = shared.get(cache_key)
+        if value is None:
+            outcome = 'miss'
+            value = load()
+            timeout = settings.LOOKUP_CACHE_TIMEOUT
+            if value is None:
+                value = NOT_FOUND
+                timeout = settings.LOOKUP_NEGATIVE_TIMEOUT
+            shared.set(cache_key, value, timeout)
+        timeout = settings.LOOKUP_LOCAL_TIMEOUT
+        if value == NOT_FOUND:
+            timeout = min(timeout, settings.LOOKUP_NEGATIVE_TIMEOUT)
+        # Процесс хранит копию в pickle: каждый вызов получает свой
+        # объект, и закэшированные на нём связи (author.post_stats)
+        # не переживают запрос.
+        local.set(
+            cache_key, pickle.dumps(value), timeout,
+            settings.LOOKUP_LOCAL_SIZE,
+        )
+    LOOKUPS.inc(kind, outcome)
+    return None if value == NOT_FOUND else value
+
+
+def group(slug):
+    """Группа по slug или None."""
+    return _lookup('group', slug, lambda: Group.objects.using(
+        DEFAULT_DB_ALIAS
+    ).filter(slug=slug).first())
+
+
+def author(username):
+    """Пользователь по имени или None. Загружаются только поля,
+    которые видны на страницах: хеш пароля в кэш не попадает.
+    """
+    return _lookup('author', username, lambda: User.objects.using(
+        DEFAULT_DB_ALIAS
+    ).only('username', 'first_name', 'last_name').filter(
+        username=username
+    ).first())
+
+
+def invalidate(kind, *keys):
+    cache_keys = [KEY.format(kind, key) for key in keys]
+    for cache_key in cache_keys:
+        local.delete(cache_key)
+    get_cache().delete_many(cache_keys)
+
+
+def stats():
+    """Обращения по видам и исходам в этом процессе."""
+    result = {}
+    for (kind, outcome), count in LOOKUPS.values.items():
+        result.setdefault(kind, {})[outcome] = count
+    return result
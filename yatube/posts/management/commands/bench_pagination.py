@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from core.benchmarks import benchmark_database, measure, median_ms
+from posts.models import Post, User
+from posts.paginators import LIMIT, CursorPaginator, encode_cursor
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время ответа ленты на разной глубине страниц: '
+            '?page=N (LIMIT/OFFSET) против ?after= (курсор).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument(
+            '--depths', default='1,10,100,1000,5000',
+            help='Номера страниц через запятую.'
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        depths = [int(depth) for depth in options['depths'].split(',')]
+        with benchmark_database():
+            self._fill(options['posts'])
+            self._run(depths, options['repeat'])
+
+    def _fill(self, count, batch_size=10_000):
+        author = User.objects.create_user(username='bench')
+        for start in range(0, count, batch_size):
+            Post.objects.bulk_create(
+                Post(text=f'Пост {i}', author=author)
+                for i in range(start, min(start + batch_size, count))
+            )
+
+    def _run(self, depths, repeat):
+        client = Client()
+        paginator = CursorPaginator(Post.objects.all(), LIMIT)
+        self.stdout.write(
+            f'{"page":>8} {"offset, ms":>12} {"cursor, ms":>12}'
+        )
+        for depth in depths:
+            if depth > paginator.num_pages:
+                continue
+            offset_url = f'/?page={depth}'
+            cursor_url = '/'
+            if depth > 1:
+                previous = paginator.page(depth - 1)
+                cursor_url = (
+                    f'/?after={encode_cursor(previous[-1], depth - 1)}'
+                )
+            offset = median_ms(measure(
+                lambda: client.get(offset_url), repeat=repeat
+            ))
+            cursor = median_ms(measure(
+                lambda: client.get(cursor_url), repeat=repeat
+            ))
+            self.stdout.write(f'{depth:>8} {offset:>12.2f} {cursor:>12.2f}')
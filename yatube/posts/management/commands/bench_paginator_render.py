@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import Context, Template
+from django.template.loader import get_template
+
+from core.benchmarks import measure, median_ms
+from posts.paginators import LIMIT
+
+
+# Навигация до перехода на page_window: ссылка на каждую страницу.
+FULL_RANGE_TEMPLATE = '''
+{% for i in page_obj.paginator.page_range %}
+    {% if page_obj.number == i %}
+      <li class="page-item active">
+        <span class="page-link">{{ i }}</span>
+      </li>
+    {% else %}
+      <li class="page-item">
+        <a class="page-link" href="?page={{ i }}">{{ i }}</a>
+      </li>
+    {% endif %}
+{% endfor %}
+'''
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает размер и время рендеринга навигации по страницам: '
+            'полный page_range против окна page_window.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--page', type=int, default=None)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Пагинатору нужна только длина выборки, поэтому миллион постов
+        # заменяет последовательность той же длины, без базы данных.
+        paginator = Paginator(range(options['posts']), LIMIT)
+        page_obj = paginator.page(
+            options['page'] or paginator.num_pages // 2
+        )
+        renderers = {
+            'page_range': lambda: Template(FULL_RANGE_TEMPLATE).render(
+                Context({'page_obj': page_obj})
+            ),
+            'page_window': lambda: get_template(
+                'posts/includes/paginator.html'
+            ).render({'page_obj': page_obj}),
+        }
+        self.stdout.write(f'{"navigation":<12} {"bytes":>12} {"ms":>10}')
+        for name, render in renderers.items():
+            size = len(render().encode())
+            elapsed = median_ms(measure(render, repeat=options['repeat']))
+            self.stdout.write(f'{name:<12} {size:>12} {elapsed:>10.2f}')
@@ -0,0 +1,49 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.template.loader import get_template
+
+from core.benchmarks import benchmark_database, measure, median_ms
+from posts.models import Group, Post, User
+from posts.paginators import LIMIT, CursorPaginator
+
+
+class Command(BaseCommand):
+    help = ('Время рендеринга страницы ленты с холодным и тёплым '
+            'кэшем фрагментов карточек постов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            author = User.objects.create_user(
+                username='bench', first_name='Имя', last_name='Фамилия'
+            )
+            group = Group.objects.create(title='Bench', slug='bench')
+            Post.objects.bulk_create(
+                Post(text='Текст поста ' * 50, author=author, group=group)
+                for _ in range(LIMIT)
+            )
+            page_obj = CursorPaginator(
+                Post.objects.for_feed(), LIMIT
+            ).get_cursor_page()
+            # Страница загружена заранее: измеряется только рендеринг.
+            list(page_obj)
+            self._run(page_obj, options['repeat'])
+
+    def _run(self, page_obj, repeat):
+        template = get_template('posts/index.html')
+        fragments = caches['default']
+
+        def render():
+            template.render({'page_obj': page_obj})
+
+        def render_cold():
+            fragments.clear()
+            render()
+
+        self.stdout.write(f'{"fragment cache":<16} {"ms per page":>12}')
+        cold = median_ms(measure(render_cold, repeat=repeat))
+        self.stdout.write(f'{"cold":<16} {cold:>12.3f}')
+        warm = median_ms(measure(render, repeat=repeat))
+        self.stdout.write(f'{"warm":<16} {warm:>12.3f}')
@@ -0,0 +1,77 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import benchmark_database, measure, median_ms
+from posts import search
+from posts.models import Post, User
+from posts.paginators import LIMIT
+
+
+# Частые слова встречаются почти в каждом посте, редкие — в единицах.
+COMMON_WORDS = ['день', 'город', 'время', 'дом', 'работа', 'друг', 'утро']
+RARE_WORDS = ['аметист', 'бергамот', 'виолончель', 'гиацинт', 'дирижабль']
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск по тексту постов: полнотекстовый индекс '
+            'FTS5 против icontains (LIKE \'%...%\') на сгенерированном '
+            'корпусе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stderr.write(
+                'Полнотекстовый индекс доступен только в SQLite.'
+            )
+            return
+        with benchmark_database():
+            self._fill(options['posts'], random.Random(options['seed']))
+            self._run(options['repeat'])
+
+    def _fill(self, count, rng, batch_size=10_000):
+        author = User.objects.create_user(username='bench')
+        words = COMMON_WORDS * 50 + [f'слово{i}' for i in range(5000)]
+        for start in range(0, count, batch_size):
+            posts = []
+            for i in range(start, min(start + batch_size, count)):
+                text = rng.choices(words, k=20)
+                if i % 10_000 == 0:
+                    text.append(RARE_WORDS[i // 10_000 % len(RARE_WORDS)])
+                posts.append(Post(text=' '.join(text), author=author))
+            # Индекс заполняют триггеры на вставку.
+            Post.objects.bulk_create(posts)
+
+    def _run(self, repeat):
+        queries = {
+            'частое слово': COMMON_WORDS[0],
+            'редкое слово': RARE_WORDS[0],
+            'два слова': f'{COMMON_WORDS[1]} {COMMON_WORDS[2]}',
+            'нет совпадений': 'отсутствует',
+        }
+        self.stdout.write(
+            f'{"query":<16} {"found":>8} {"fts, ms":>10} {"like, ms":>10}'
+        )
+        for name, query in queries.items():
+            like_posts = Post.objects.all()
+            for word in query.split():
+                like_posts = like_posts.filter(text__icontains=word)
+            fts_posts = search.filter_posts(Post.objects.all(), query)
+            # Как в списке админки: число найденных и первая страница.
+            found = fts_posts.count()
+            fts = median_ms(measure(
+                lambda: (fts_posts.count(),
+                         search.search_posts(query, per_page=LIMIT)),
+                repeat=repeat,
+            ))
+            like = median_ms(measure(
+                lambda: (like_posts.count(), list(like_posts[:LIMIT])),
+                repeat=repeat,
+            ))
+            self.stdout.write(
+                f'{name:<16} {found:>8} {fts:>10.2f} {like:>10.2f}'
+            )
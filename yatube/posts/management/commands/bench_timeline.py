@@ -0,0 +1,93 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.benchmarks import benchmark_database, measure, summarize
+from posts import bulk, timeline
+from posts.dataset import DatasetGenerator
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.paginators import LIMIT, encode_position
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает чтение ленты подписок: готовая лента '
+            '(TimelineEntry) против запроса author IN (подписки) '
+            'с сортировкой по дате, на первой и дальней странице. '
+            'Заодно замеряет раскладку поста по подписчикам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=10_000)
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--page', type=int, default=50,
+                            help='Номер дальней страницы.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            reader = self._fill(options)
+            self._run(reader, options)
+
+    def _fill(self, options):
+        generator = DatasetGenerator(seed=options['seed'])
+        author_ids = generator.create_users(options['authors'])
+        reader = User.objects.create_user(username='reader')
+        with bulk.deferred_maintenance():
+            generator.create_posts(options['posts'], author_ids, [])
+        # Читатель подписан на всех авторов, а все авторы — на него:
+        # на его посте замеряется раскладка.
+        Follow.objects.bulk_create(
+            [Follow(user=reader, author_id=pk) for pk in author_ids]
+            + [Follow(user_id=pk, author=reader) for pk in author_ids]
+        )
+        posts = Post.objects.values_list('pk', 'author_id', 'pub_date')
+        bulk.insert_rows(
+            TimelineEntry, ('user', 'post_id', 'author', 'pub_date'),
+            ((reader.pk, pk, author_id, pub_date)
+             for pk, author_id, pub_date in posts.iterator()),
+        )
+        return reader
+
+    def _run(self, reader, options):
+        repeat = options['repeat']
+        followed = Follow.objects.filter(user=reader).values('author')
+        naive = Post.objects.for_feed().filter(
+            author__in=followed
+        ).order_by('-pub_date', '-pk')
+        skip = (options['page'] - 1) * LIMIT
+        pub_date, pk = TimelineEntry.objects.filter(user=reader).order_by(
+            '-pub_date', '-post_id'
+        ).values_list('pub_date', 'post_id')[skip - 1]
+        token = encode_position(pub_date, pk, options['page'] - 1)
+        deep = naive.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+        )
+        cases = {
+            'IN, страница 1': lambda: list(naive[:LIMIT + 1]),
+            f'IN, страница {options["page"]}':
+                lambda: list(deep[:LIMIT + 1]),
+            'лента, страница 1': lambda: timeline.page(reader),
+            f'лента, страница {options["page"]}':
+                lambda: timeline.page(reader, after=token),
+        }
+        self.stdout.write(
+            f'Подписок: {options["authors"]}, постов: {options["posts"]}'
+        )
+        self.stdout.write(
+            f'{"case":<22} {"p50, ms":>10} {"p95, ms":>10}'
+        )
+        for name, func in cases.items():
+            result = summarize(measure(func, repeat=repeat))
+            self.stdout.write(
+                f'{name:<22} {result["p50_ms"]:>10.2f}'
+                f' {result["p95_ms"]:>10.2f}'
+            )
+        post = Post.objects.create(text='Новый пост', author=reader)
+        start = time.perf_counter()
+        delivered = timeline.deliver(post.pk, reader.pk, post.pub_date)
+        self.stdout.write(
+            f'Раскладка поста по {delivered} подписчикам: '
+            f'{(time.perf_counter() - start) * 1000:.1f} мс'
+        )
+        post.delete()
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import find_inconsistent
+
+
+class Command(BaseCommand):
+    help = ('Сверяет статистику авторов (число постов, дата последнего '
+            'поста) с постами в базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Исправить найденные расхождения.'
+        )
+
+    def handle(self, *args, **options):
+        problems = find_inconsistent(fix=options['fix'])
+        for author_id, saved, actual in problems:
+            self.stdout.write(
+                f'Автор {author_id}: сохранено {saved}, в базе {actual}'
+            )
+        if not problems:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+        elif options['fix']:
+            self.stdout.write(
+                self.style.SUCCESS(f'Исправлено: {len(problems)}')
+            )
+        else:
+            self.stderr.write(
+                f'Расхождений: {len(problems)}; запустите с --fix'
+            )
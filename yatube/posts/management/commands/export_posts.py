@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = ('Выгружает все посты с автором и группой в CSV или NDJSON, '
+            'читая базу порциями. С --since выгружает только посты '
+            'после указанной позиции.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=export.FORMATS, default='csv',
+            dest='export_format',
+        )
+        parser.add_argument(
+            '--output', help='Файл выгрузки; по умолчанию stdout.'
+        )
+        parser.add_argument(
+            '--since', help='Дата публикации (ISO 8601), с которой '
+            'начинается выгрузка.'
+        )
+        parser.add_argument(
+            '--since-id', type=int, help='id последнего выгруженного '
+            'поста с датой --since: выгрузка начнётся после него.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=export.CHUNK_SIZE
+        )
+
+    def _since(self, options):
+        if options['since']:
+            try:
+                return export.parse_since(options['since'])
+            except ValueError as exc:
+                raise CommandError(exc)
+        if options['since_id'] is not None:
+            raise CommandError('--since-id задаётся вместе с --since.')
+        return None
+
+    def handle(self, *args, **options):
+        rows = export.export_rows(
+            self._since(options), options['since_id'], options['chunk_size']
+        )
+        last = {}
+
+        def remember(rows):
+            for row in rows:
+                last['row'] = row
+                yield row
+
+        chunks = export.render(remember(rows), options['export_format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='',
+                      encoding='utf-8') as stream:
+                stream.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+        if 'row' in last:
+            row = dict(zip(export.COLUMNS, last['row']))
+            # Позиция для следующей инкрементальной выгрузки.
+            self.stderr.write(
+                f'--since {row["pub_date"].isoformat()} '
+                f'--since-id {row["id"]}'
+            )
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = ('Раскладывает новые посты из очереди по лентам подписок '
+            'подписчиков. Однократно до пустой очереди или с --every '
+            'в цикле.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--every', type=float, default=None,
+            help='Проверять очередь каждые N секунд до прерывания.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Подписчиков в одной вставке (TIMELINE_FANOUT_BATCH).'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            posts = delivered = 0
+            while True:
+                done, count = timeline.process(
+                    batch_size=options['batch_size']
+                )
+                posts += done
+                delivered += count
+                if done < timeline.TASKS_PER_RUN:
+                    break
+            if posts or options['every'] is None:
+                self.stdout.write(
+                    f'Постов: {posts}, доставок в ленты: {delivered} '
+                    f'за {(time.perf_counter() - start) * 1000:.1f} мс'
+                )
+            if options['every'] is None:
+                break
+            time.sleep(options['every'])
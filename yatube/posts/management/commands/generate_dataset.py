@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.dataset import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = ('Создаёт синтетический набор данных для бенчмарков: '
+            'пользователей, группы и посты с распределением по Ципфу. '
+            'При одном --seed набор воспроизводится.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default='bench',
+            help='Префикс имён пользователей и slug групп.'
+        )
+        parser.add_argument(
+            '--author-skew', type=float, default=1.1,
+            help='Показатель Ципфа для числа постов на автора.'
+        )
+        parser.add_argument(
+            '--group-skew', type=float, default=1.1,
+            help='Показатель Ципфа для числа постов в группе.'
+        )
+        parser.add_argument(
+            '--no-group-ratio', type=float, default=0.2,
+            help='Доля постов без группы.'
+        )
+        parser.add_argument(
+            '--text-median', type=int, default=200,
+            help='Медианная длина текста поста в символах.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=3 * 365,
+            help='За сколько дней распределены даты публикации.'
+        )
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        generator = DatasetGenerator(
+            seed=options['seed'],
+            prefix=options['prefix'],
+            author_skew=options['author_skew'],
+            group_skew=options['group_skew'],
+            no_group_ratio=options['no_group_ratio'],
+            text_median=options['text_median'],
+            days=options['days'],
+        )
+        started = time.perf_counter()
+        generator.generate(
+            options['users'], options['groups'], options['posts'],
+            options['batch_size'],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {options["users"]}, групп: '
+            f'{options["groups"]}, постов: {options["posts"]} '
+            f'за {elapsed:.1f} с ({options["posts"] / elapsed:.0f} постов/с)'
+        ))
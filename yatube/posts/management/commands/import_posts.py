@@ -0,0 +1,83 @@
+import sys
+import time
+from contextlib import nullcontext
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk, importer
+
+
+class Command(BaseCommand):
+    help = ('Импортирует посты из CSV или NDJSON (колонки как у '
+            'export_posts) пачками через bulk.insert_posts, создавая '
+            'недостающих авторов и группы. Последние посты авторов '
+            'ставятся в очередь раскладки по лентам подписчиков.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки или - для stdin.')
+        parser.add_argument(
+            '--format', choices=importer.FORMATS, dest='import_format',
+            help='По умолчанию определяется по расширению файла.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=importer.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--checkpoint', help='Файл с позицией импорта: после сбоя '
+            'повторный запуск продолжит со следующей пачки.'
+        )
+        parser.add_argument(
+            '--defer-maintenance', action='store_true',
+            help='Удалить индексы постов на время импорта и пересчитать '
+            'счётчики один раз в конце.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        import_format = options['import_format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        checkpoint = importer.Checkpoint(options['checkpoint'])
+        done = checkpoint.load()
+        if done:
+            self.stdout.write(f'Продолжение с строки {done + 1}')
+        defer = options['defer_maintenance']
+        post_importer = importer.PostImporter(count_posts=not defer)
+        stream = (
+            nullcontext(sys.stdin) if path == '-'
+            else open(path, newline='', encoding='utf-8')
+        )
+        imported = 0
+        started = time.perf_counter()
+        try:
+            with stream as rows, (
+                bulk.deferred_maintenance() if defer else nullcontext()
+            ):
+                rows = islice(importer.read_rows(rows, import_format),
+                              done, None)
+                for number, batch in enumerate(
+                    importer.batches(rows, options['batch_size']), 1
+                ):
+                    imported += post_importer.import_batch(batch, done)
+                    done += len(batch)
+                    checkpoint.save(done)
+                    if number % 100 == 0:
+                        self._report(imported, started)
+        except importer.RowError as exc:
+            raise CommandError(f'{exc}. Импорт остановлен после строки '
+                               f'{done}.')
+        finally:
+            post_importer.invalidate_pages()
+        checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {self._report_line(imported, started)}'
+        ))
+
+    def _report_line(self, imported, started):
+        elapsed = time.perf_counter() - started
+        rate = imported / elapsed if elapsed else 0
+        return f'{imported} за {elapsed:.1f} с ({rate:.0f} строк/с)'
+
+    def _report(self, imported, started):
+        self.stdout.write(self._report_line(imported, started))
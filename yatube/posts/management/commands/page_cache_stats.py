@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import views  # noqa: F401 регистрирует кэшируемые представления
+from posts.cache import page_cache_stats
+
+
+class Command(BaseCommand):
+    help = ('Попадания и промахи кэша страниц лент для анонимных '
+            'посетителей (для общего кэша: файлового, memcached и т.п.).')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"view":<16} {"hits":>10} {"misses":>10} {"ratio":>8}'
+        )
+        for view_name, stats in page_cache_stats().items():
+            self.stdout.write(
+                f'{view_name:<16} {stats["hits"]:>10} '
+                f'{stats["misses"]:>10} {stats["ratio"]:>8.1%}'
+            )
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from posts import rebalance, sharding
+
+
+class Command(BaseCommand):
+    help = ('Перераспределяет посты при смене списка шардов в два шага. '
+            'Сначала --to a,b,c копирует корзины, меняющие владельца, '
+            'на новые шарды (их нужно заранее мигрировать); копирование '
+            'можно повторить перед переключением. После выкладки нового '
+            'POST_SHARDS --cleanup удаляет с шардов чужие посты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--to', default=None,
+            help='Новый список шардов через запятую.'
+        )
+        parser.add_argument(
+            '--cleanup', action='store_true',
+            help='Удалить посты корзин, не принадлежащих шарду '
+                 'по текущему POST_SHARDS.'
+        )
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError('POST_SHARDS пуст: шардирование выключено.')
+        if options['cleanup']:
+            for alias, removed in rebalance.remove_misplaced().items():
+                self.stdout.write(f'{alias:<16}удалено {removed:>9}')
+            return
+        if not options['to']:
+            raise CommandError('Укажите --to или --cleanup.')
+        new = [alias.strip() for alias in options['to'].split(',')]
+        unknown = [alias for alias in new
+                   if alias not in connections.databases]
+        if unknown:
+            raise CommandError(
+                f'Нет в DATABASES: {", ".join(unknown)}'
+            )
+        moves = rebalance.plan(sharding.shards(), new)
+        self.stdout.write(f'{"откуда":<16}{"куда":<16}{"корзин":>8}'
+                          f'{"постов":>10}')
+        for (source, target), buckets in sorted(moves.items()):
+            copied = rebalance.copy_buckets(source, target, buckets)
+            self.stdout.write(f'{source:<16}{target:<16}{len(buckets):>8}'
+                              f'{copied:>10}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Переносится корзин: {sum(map(len, moves.values()))} '
+            f'из {sharding.BUCKETS}. Выложите POST_SHARDS = {new} и '
+            f'запустите rebalance_shards --cleanup.'
+        ))
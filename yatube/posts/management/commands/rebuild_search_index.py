@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import search, sharding
+
+
+class Command(BaseCommand):
+    help = ('Заново строит полнотекстовый индекс постов и восстанавливает '
+            'триггеры, которые держат его в актуальном состоянии. '
+            'С шардами индекс строится на каждом шарде.')
+
+    def handle(self, *args, **options):
+        for alias in sharding.databases():
+            using = connections[alias]
+            if not search.is_supported(using):
+                self.stdout.write(
+                    f'{alias}: полнотекстовый индекс доступен только '
+                    f'в SQLite.'
+                )
+                continue
+            search.rebuild(using)
+            self.stdout.write(
+                self.style.SUCCESS(f'{alias}: индекс поиска перестроен')
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает с нуля счётчики постов (всего, по группам, '
+            'по авторам), исправляя накопившееся расхождение.')
+
+    def handle(self, *args, **options):
+        total = counters.recount()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано счётчиков: {total}')
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import rebalance, sharding
+
+
+class Command(BaseCommand):
+    help = ('Переносит посты из основной базы на шарды. Запускается '
+            'сразу после включения POST_SHARDS (шарды нужно заранее '
+            'мигрировать); повторный запуск переносит посты, созданные '
+            'в основной базе до выкладки. Посты получают новые id, '
+            'старые адреса перенаправляются на новые.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=rebalance.CHUNK,
+            help='Постов в одной пачке.'
+        )
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError('POST_SHARDS пуст: шардирование выключено.')
+        moved = rebalance.shard_default(options['batch_size'])
+        for alias in sharding.shards():
+            count = moved.get(alias, 0)
+            self.stdout.write(f'{alias:<16}перенесено {count:>9}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено постов: {sum(moved.values())}.'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postcounter',
+            name='modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
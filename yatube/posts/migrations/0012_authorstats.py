@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max
+
+
+def fill_author_stats(apps, schema_editor):
+    """Статистика для уже существующих пользователей; счётчики
+    авторов в PostCounter ею заменяются.
+    """
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    PostCounter = apps.get_model('posts', 'PostCounter')
+    users = User.objects.annotate(
+        total=Count('posts'), last=Max('posts__pub_date')
+    ).values_list('pk', 'total', 'last')
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=pk, post_count=total, last_post_date=last)
+        for pk, total, last in users.iterator()
+    )
+    PostCounter.objects.filter(key__startswith='author:').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0011_postcounter_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='post_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('post_count', models.IntegerField(default=0, verbose_name='Число постов')),
+                ('last_post_date', models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего поста')),
+                ('modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
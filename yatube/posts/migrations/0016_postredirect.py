@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_search_index_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRedirect',
+            fields=[
+                ('old_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('new_id', models.IntegerField(unique=True)),
+            ],
+        ),
+    ]
@@ -1,10 +1,60 @@
-from django.db import models
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models, router, transaction
 from django.contrib.auth import get_user_model
 
 
 User = get_user_model()
 
 
+FEED_FIELDS = (
+    'text',
+    'pub_date',
+    'updated',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__slug',
+)
+# На шардах нет таблиц авторов и групп: JOIN заменяется отдельными
+# запросами к основной базе.
+SHARDED_FEED_FIELDS = ('text', 'pub_date', 'updated', 'author', 'group')
+
+
+class PostQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        """С шардами база нового поста выбирается по его автору,
+        а не по выборке, у которой автора нет.
+        """
+        if not settings.POST_SHARDS or self._db is not None:
+            return super().create(**kwargs)
+        post = self.model(**kwargs)
+        post.save(force_insert=True)
+        return post
+
+    def for_feed(self):
+        """Посты для лент: автор и группа в одном JOIN,
+        без колонок, которые шаблоны не читают.
+        """
+        if settings.POST_SHARDS:
+            return self.only(*SHARDED_FEED_FIELDS).prefetch_related(
+                models.Prefetch('author', User.objects.only(
+                    'username', 'first_name', 'last_name'
+                )),
+                models.Prefetch('group', Group.objects.only('slug')),
+            )
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def for_detail(self):
+        """Пост для отдельной страницы вместе со статистикой автора."""
+        if settings.POST_SHARDS:
+            return self.prefetch_related('author__post_stats', 'group')
+        return self.select_related(
+            'author__post_stats', 'group'
+        ).only(*FEED_FIELDS, 'author__post_stats__post_count')
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -14,6 +64,10 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -30,12 +84,48 @@ class Post(models.Model):
         help_text='Выберите группу'
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', 'pub_date', 'id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @contextmanager
+    def _atomic(self, using):
+        """Транзакция, в которой обработчики сигналов поста обновляют
+        счётчики и статистику автора вместе с самим постом. Счётчики
+        живут в основной базе, пост может быть на шарде: тогда
+        открываются транзакции в обеих базах.
+        """
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            with transaction.atomic(using=using, savepoint=False):
+                yield
+
+    def save(self, *args, **kwargs):
+        with self._atomic(kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        with self._atomic(using):
+            return super().delete(using, keep_parents)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -44,3 +134,166 @@ class Group(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class PostCounter(models.Model):
+    """Денормализованное число постов: всего, в группе, у автора.
+
+    modified — время последнего изменения постов в этой области,
+    по нему страницы отвечают на условные GET-запросы.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    value = models.IntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.key}={self.value}'
+
+
+class AuthorStats(models.Model):
+    """Денормализованная статистика постов автора.
+
+    modified — время последнего изменения постов или имени автора,
+    по нему профиль отвечает на условные GET-запросы.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_stats',
+        verbose_name='Автор'
+    )
+    post_count = models.IntegerField('Число постов', default=0)
+    last_post_date = models.DateTimeField(
+        'Дата последнего поста',
+        blank=True,
+        null=True
+    )
+    follower_count = models.IntegerField('Число подписчиков', default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.author_id}: {self.post_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='follow_unique'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='follow_not_self',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['author', 'user'], name='follow_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.author_id}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя.
+
+    Ссылка на пост — просто id: с шардированием посты лежат в других
+    базах. pub_date скопирована из поста, чтобы лента читалась по
+    индексу (user, pub_date, post_id) без обращения к постам.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    post_id = models.IntegerField()
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post_id'], name='timeline_unique_post'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post_id'],
+                name='timeline_user_pub_date_idx',
+            ),
+            models.Index(fields=['post_id'], name='timeline_post_idx'),
+        ]
+
+
+class FanoutTask(models.Model):
+    """Новый пост, который ещё не разложен по лентам подписчиков,
+    см. posts.timeline.
+    """
+    post_id = models.IntegerField(unique=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+
+class PostRedirect(models.Model):
+    """Прежний id поста, перенесённого из основной базы на шард
+    командой shard_posts: id на шарде несёт корзину автора, поэтому
+    пост получает новый, а старые ссылки перенаправляются по этой
+    таблице.
+    """
+    old_id = models.IntegerField(primary_key=True)
+    new_id = models.IntegerField(unique=True)
+
+    def __str__(self):
+        return f'{self.old_id} -> {self.new_id}'
+
+
+class FullTextField(models.TextField):
+    """Скрытый столбец таблицы FTS5, названный как сама таблица:
+    левая часть условия MATCH.
+    """
+
+
+@FullTextField.register_lookup
+class Matches(models.Lookup):
+    """document__matches=<запрос>: строки, найденные индексом FTS5."""
+    lookup_name = 'matches'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class PostSearchIndex(models.Model):
+    """Полнотекстовый индекс постов (FTS5, см. posts.search): строка
+    индекса хранит id поста в rowid. Таблицу и триггеры создаёт
+    миграция 0013, поэтому модель неуправляемая.
+    """
+    post_id = models.IntegerField(primary_key=True, db_column='rowid')
+    document = FullTextField(db_column='posts_post_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
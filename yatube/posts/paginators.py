@@ -0,0 +1,210 @@
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from . import counters
+
+
+LIMIT = 10
+
+
+def pack_token(*parts):
+    """Упаковывает части позиции в непрозрачный токен для URL."""
+    raw = '|'.join(str(part) for part in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def unpack_token(token, size):
+    """Части позиции из токена или None, если токен битый."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        parts = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+    except (binascii.Error, UnicodeError):
+        return None
+    if len(parts) != size:
+        return None
+    return parts
+
+
+def encode_cursor(post, number):
+    """Упаковывает позицию поста (pub_date, id) и номер страницы
+    в непрозрачный токен для параметров ?after= / ?before=.
+    """
+    return encode_position(post.pub_date, post.pk, number)
+
+
+def encode_position(pub_date, pk, number):
+    """То же, что encode_cursor, для строк .values() без объекта."""
+    return pack_token(number, pub_date.isoformat(), pk)
+
+
+def decode_cursor(token):
+    """Возвращает (number, pub_date, id) или None для битого токена."""
+    parts = unpack_token(token, 3)
+    if parts is None:
+        return None
+    number, pub_date, pk = parts
+    try:
+        pub_date = parse_datetime(pub_date)
+        number, pk = int(number), int(pk)
+    except ValueError:
+        return None
+    if pub_date is None or number < 1:
+        return None
+    return number, pub_date, pk
+
+
+class CursorPage(Page):
+    """Страница ленты с токенами соседних страниц.
+
+    Для страниц, полученных по курсору, о соседях известно из самой
+    выборки, без COUNT(*) по всей таблице.
+    """
+
+    def __init__(self, object_list, number, paginator,
+                 has_next=None, has_previous=None):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        if self._has_next is None:
+            return super().has_next()
+        return self._has_next
+
+    def has_previous(self):
+        if self._has_previous is None:
+            return super().has_previous()
+        return self._has_previous
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    @property
+    def next_cursor(self):
+        if not self.has_next() or not self.object_list:
+            return None
+        return encode_cursor(self[-1], self.number)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return encode_cursor(self[0], self.number)
+
+
+class CountedPaginator(Paginator):
+    """Пагинатор, берущий число объектов из хранилища счётчиков
+    (или уже известное count) вместо SELECT COUNT(*) на каждый запрос.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, count=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        if count is not None:
+            self.count = count
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        return counters.get_count(self.count_key, self.object_list)
+
+
+class CursorPaginator(CountedPaginator):
+    """Пагинатор по ключу (pub_date, id).
+
+    Страницы, полученные по токенам ?after= / ?before=, стоят столько же,
+    сколько первая: вместо OFFSET используется условие по ключу.
+    Обычный ?page=N по-прежнему работает через LIMIT/OFFSET.
+    """
+
+    def __init__(self, object_list, per_page=LIMIT, **kwargs):
+        super().__init__(
+            object_list.order_by('-pub_date', '-pk'), per_page, **kwargs
+        )
+
+    def _get_page(self, *args, **kwargs):
+        return CursorPage(*args, **kwargs)
+
+    def get_cursor_page(self, after=None, before=None):
+        """Страница после (или до) позиции, закодированной в токене.
+        Без токена возвращается первая страница.
+        """
+        if after:
+            return self._page_after(decode_cursor(after))
+        if before:
+            return self._page_before(decode_cursor(before))
+        return self._page_after(None)
+
+    def _page_after(self, cursor):
+        posts = self.object_list
+        number = 1
+        if cursor is not None:
+            number, pub_date, pk = cursor
+            number += 1
+            posts = posts.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        rows = list(posts[:self.per_page + 1])
+        if cursor is not None and not rows:
+            # Курсор указывает на последний пост ленты: вместо пустой
+            # страницы отдаём последнюю, как для ?page=<последняя>.
+            return self._last_page()
+        return CursorPage(
+            rows[:self.per_page], number, self,
+            has_next=len(rows) > self.per_page,
+            has_previous=number > 1,
+        )
+
+    def _last_page(self):
+        number = self.num_pages
+        tail = self.count - (number - 1) * self.per_page
+        rows = list(self.object_list.order_by('pub_date', 'pk')[:tail])
+        return CursorPage(
+            rows[::-1], number, self,
+            has_next=False, has_previous=number > 1,
+        )
+
+    def _page_before(self, cursor):
+        if cursor is None:
+            return self._page_after(None)
+        number, pub_date, pk = cursor
+        posts = self.object_list.filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+        ).order_by('pub_date', 'pk')
+        rows = list(posts[:self.per_page + 1])
+        if number <= 2 or len(rows) <= self.per_page:
+            # Дошли до начала ленты: отдаём настоящую первую страницу.
+            return self._page_after(None)
+        rows = rows[:self.per_page][::-1]
+        return CursorPage(
+            rows, number - 1, self, has_next=True, has_previous=True
+        )
+
+
+def get_page(request, posts, count_key=None, count=None, per_page=LIMIT):
+    """Страница ленты для запроса: по курсору, если передан ?after= или
+    ?before=, по номеру — если ?page=, иначе первая.
+    """
+    paginator = CursorPaginator(
+        posts, per_page, count_key=count_key, count=count
+    )
+    page_number = request.GET.get('page')
+    if page_number and not (request.GET.get('after')
+                            or request.GET.get('before')):
+        return paginator.get_page(page_number)
+    return paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
@@ -0,0 +1,163 @@
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F, Max
+
+from . import bulk, cache, sharding
+from .models import FanoutTask, Post, PostRedirect, TimelineEntry
+
+
+COPY_FIELDS = ('id', 'text', 'pub_date', 'updated', 'author_id', 'group_id')
+# Корзин в одном запросе: меньше лимита параметров SQLite.
+CHUNK = 500
+
+
+def plan(old, new):
+    """Корзины, у которых при переходе от шардов old к new меняется
+    владелец: {(откуда, куда): [корзины]}.
+    """
+    moves = {}
+    for bucket in range(sharding.BUCKETS):
+        source = sharding.shard_for_bucket(bucket, old)
+        target = sharding.shard_for_bucket(bucket, new)
+        if source != target:
+            moves.setdefault((source, target), []).append(bucket)
+    return moves
+
+
+def _delete(alias, where, params):
+    """DELETE без сигналов: перенос постов не меняет их число,
+    поэтому счётчики и статистика авторов трогать нельзя.
+    """
+    connection = connections[alias]
+    table = connection.ops.quote_name(Post._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {where}', params)
+        return cursor.rowcount
+
+
+def _chunks(buckets):
+    for start in range(0, len(buckets), CHUNK):
+        yield buckets[start:start + CHUNK]
+
+
+def copy_buckets(source, target, buckets):
+    """Копирует посты корзин buckets с шарда source на target
+    с теми же id и датами; возвращает число скопированных постов.
+
+    Копии на target от прошлого запуска сначала удаляются, поэтому
+    копирование можно повторять, чтобы перенести посты, созданные
+    и изменённые после первого прохода.
+    """
+    # Новый шард ещё не входит в POST_SHARDS.
+    sharding.disable_foreign_keys(connections[target])
+    copied = 0
+    with transaction.atomic(using=target):
+        for part in _chunks(buckets):
+            placeholders = ', '.join(['%s'] * len(part))
+            _delete(
+                target, f'(id %% %s) IN ({placeholders})',
+                [sharding.BUCKETS, *part],
+            )
+            posts = Post.objects.using(source).annotate(
+                bucket=F('pk') % sharding.BUCKETS
+            ).filter(bucket__in=part).order_by()
+            copied += posts.count()
+            bulk.insert_rows(
+                Post, COPY_FIELDS,
+                posts.values_list(*COPY_FIELDS).iterator(), using=target,
+            )
+    return copied
+
+
+def remove_misplaced():
+    """Удаляет с шардов посты корзин, которыми они по текущему
+    POST_SHARDS не владеют; возвращает {шард: число удалённых}.
+    """
+    aliases = sharding.shards()
+    removed = {}
+    for index, alias in enumerate(aliases):
+        # То же условие, что в sharding.shard_for_bucket.
+        removed[alias] = _delete(
+            alias, '((id %% %s) %% %s) != %s',
+            [sharding.BUCKETS, len(aliases), index],
+        )
+    return removed
+
+
+def _new_ids(rows):
+    """{старый id: новый} для строк COPY_FIELDS. Новые id выдаются
+    один раз и сразу сохраняются в PostRedirect, поэтому повторный
+    запуск после сбоя переносит пост под тем же id.
+    """
+    old_ids = [row[0] for row in rows]
+    mapping = dict(PostRedirect.objects.using(DEFAULT_DB_ALIAS).filter(
+        old_id__in=old_ids
+    ).values_list('old_id', 'new_id'))
+    missing = [row for row in rows if row[0] not in mapping]
+    if missing:
+        new_ids = sharding.allocate_ids([row[4] for row in missing])
+        redirects = [
+            PostRedirect(old_id=row[0], new_id=new_id)
+            for row, new_id in zip(missing, new_ids)
+        ]
+        PostRedirect.objects.using(DEFAULT_DB_ALIAS).bulk_create(redirects)
+        mapping.update((r.old_id, r.new_id) for r in redirects)
+    return mapping
+
+
+def _repoint(mapping):
+    """Переводит ленты на новые id и удаляет перенесённые посты из
+    основной базы — одной транзакцией.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    pairs = [(new_id, old_id) for old_id, new_id in mapping.items()]
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        with connection.cursor() as cursor:
+            for model in (TimelineEntry, FanoutTask):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.executemany(
+                    f'UPDATE {table} SET post_id = %s WHERE post_id = %s',
+                    pairs,
+                )
+        placeholders = ', '.join(['%s'] * len(mapping))
+        _delete(DEFAULT_DB_ALIAS, f'id IN ({placeholders})', list(mapping))
+
+
+def shard_default(batch_size=CHUNK):
+    """Переносит посты из основной базы на шарды POST_SHARDS;
+    возвращает {шард: число перенесённых постов}.
+
+    Пост получает новый id с корзиной автора (по нему шард находится
+    без справочника), старый id остаётся в PostRedirect для
+    перенаправления ссылок. Каждая пачка сначала записывается на шард,
+    и только потом удаляется из основной базы, поэтому прерванный
+    перенос можно просто запустить снова.
+    """
+    legacy = Post.objects.using(DEFAULT_DB_ALIAS).order_by('pk')
+    top = legacy.aggregate(top=Max('pk'))['top']
+    if top is None:
+        return {}
+    # Новые id должны быть больше старых, иначе ссылка на старый id
+    # попадёт не на тот пост.
+    sharding.skip_past(top)
+    moved = {}
+    while True:
+        rows = list(legacy.values_list(*COPY_FIELDS)[:batch_size])
+        if not rows:
+            break
+        mapping = _new_ids(rows)
+        by_shard = {}
+        for old_id, *values in rows:
+            new_id = mapping[old_id]
+            by_shard.setdefault(sharding.shard_for_post(new_id), []).append(
+                (new_id, *values)
+            )
+        for alias, part in by_shard.items():
+            placeholders = ', '.join(['%s'] * len(part))
+            with transaction.atomic(using=alias):
+                _delete(alias, f'id IN ({placeholders})',
+                        [row[0] for row in part])
+                bulk.insert_rows(Post, COPY_FIELDS, part, using=alias)
+            moved[alias] = moved.get(alias, 0) + len(part)
+        _repoint(mapping)
+    cache.invalidate(cache.ALL_SCOPE)
+    return moved
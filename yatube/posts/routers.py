@@ -0,0 +1,47 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from . import sharding
+from .models import Post, User
+
+
+class PostShardRouter:
+    """Посты — на шарде автора, всё остальное — в основной базе.
+    Без POST_SHARDS ничего не меняет.
+
+    Ленты выбирают шарды сами через sharding.posts(); роутер отвечает
+    за сохранение и удаление постов, за посты автора (user.posts) и за
+    связанные объекты постов с шардов: их читаем из основной базы,
+    а не из базы, откуда загружен пост.
+    """
+
+    def _post_shard(self, model, hints):
+        instance = hints.get('instance')
+        if model is not Post or instance is None:
+            return None
+        if isinstance(instance, User):
+            return sharding.shard_for_author(instance.pk)
+        if isinstance(instance, Post):
+            if instance.pk is not None:
+                return sharding.shard_for_post(instance.pk)
+            return sharding.shard_for_author(instance.author_id)
+        return None
+
+    def _from_shard(self, hints):
+        instance = hints.get('instance')
+        return (instance is not None
+                and instance._state.db in sharding.shards())
+
+    def db_for_read(self, model, **hints):
+        if not sharding.enabled():
+            return None
+        if model is Post:
+            return self._post_shard(model, hints)
+        return DEFAULT_DB_ALIAS if self._from_shard(hints) else None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = sharding.shards()
+        if obj1._state.db in aliases or obj2._state.db in aliases:
+            return True
+        return None
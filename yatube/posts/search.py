@@ -0,0 +1,210 @@
+import heapq
+import re
+from collections import namedtuple
+from itertools import islice
+
+from django.db import connection, connections
+
+from . import sharding
+from .models import Post, PostSearchIndex
+from .paginators import LIMIT, pack_token, unpack_token
+
+
+FTS_TABLE = 'posts_post_fts'
+TOKEN_RE = re.compile(r'\w+')
+
+# Индекс хранит только словарь: текст берётся из posts_post
+# (external content), поэтому синхронность поддерживают триггеры.
+# Они срабатывают и на bulk_create / update(), минуя сигналы Django.
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+]
+DROP_TRIGGERS_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+]
+DROP_SQL = DROP_TRIGGERS_SQL + [f'DROP TABLE IF EXISTS {FTS_TABLE}']
+
+SearchPage = namedtuple('SearchPage', 'object_list number next_cursor')
+
+
+def is_supported(using=None):
+    """Полнотекстовый индекс есть только в SQLite (FTS5)."""
+    return (using or connection).vendor == 'sqlite'
+
+
+def install(using=None):
+    """Создаёт индекс и триггеры, если их нет.
+
+    SQLite пересоздаёт таблицу при изменении её схемы миграцией, и
+    триггеры posts_post при этом пропадают, поэтому install()
+    повторяется после каждого migrate (см. PostsConfig.ready).
+    """
+    using = using or connection
+    if not is_supported(using):
+        return
+    with using.cursor() as cursor:
+        for sql in CREATE_SQL:
+            cursor.execute(sql)
+
+
+def uninstall(using=None, keep_table=False):
+    """Удаляет триггеры и индекс. С keep_table=True индекс остаётся,
+    но перестаёт обновляться: так массовая вставка идёт быстрее,
+    а после неё индекс строится заново через rebuild().
+    """
+    using = using or connection
+    if not is_supported(using):
+        return
+    with using.cursor() as cursor:
+        for sql in DROP_TRIGGERS_SQL if keep_table else DROP_SQL:
+            cursor.execute(sql)
+
+
+def rebuild(using=None):
+    """Заново строит индекс по всем постам."""
+    using = using or connection
+    install(using)
+    if not is_supported(using):
+        return
+    with using.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+
+def match_query(query):
+    """Запрос MATCH из пользовательской строки: все слова обязательны,
+    операторы FTS5 экранируются. None, если слов нет.
+    """
+    words = TOKEN_RE.findall(query or '')
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def filter_posts(queryset, query):
+    """Сужает выборку постов до найденных по индексу."""
+    match = match_query(query)
+    if match is None:
+        return queryset.none()
+    if not is_supported(connections[queryset.db]):
+        for word in TOKEN_RE.findall(query):
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+    # Подзапрос выборкой, а не RawSQL: RawSQL в pk__in оборачивается
+    # в лишние скобки, и SQLite сравнивает id только с первой строкой.
+    return queryset.filter(pk__in=PostSearchIndex.objects.filter(
+        document__matches=match
+    ).values('post_id'))
+
+
+def encode_cursor(rank, pk, number):
+    return pack_token(number, repr(rank), pk)
+
+
+def decode_cursor(token):
+    """Возвращает (number, rank, id) или None для битого токена."""
+    parts = unpack_token(token, 3)
+    if parts is None:
+        return None
+    try:
+        number, rank, pk = int(parts[0]), float(parts[1]), int(parts[2])
+    except ValueError:
+        return None
+    if number < 1:
+        return None
+    return number, rank, pk
+
+
+def _ranked_ids(match, cursor, limit, using=None):
+    """Пары (id, rank) в порядке релевантности bm25, затем id."""
+    sql = [f'SELECT rowid, rank FROM {FTS_TABLE} '
+           f'WHERE {FTS_TABLE} MATCH %s']
+    params = [match]
+    if cursor is not None:
+        _, rank, pk = cursor
+        sql.append('AND (rank > %s OR (rank = %s AND rowid > %s))')
+        params += [rank, rank, pk]
+    sql.append('ORDER BY rank, rowid LIMIT %s')
+    params.append(limit)
+    with (using or connection).cursor() as db:
+        db.execute(' '.join(sql), params)
+        return db.fetchall()
+
+
+def _fallback_ids(query, cursor, limit, posts=None):
+    """Без FTS5: поиск по LIKE, все результаты равны по релевантности."""
+    if posts is None:
+        posts = Post.objects.all()
+    posts = filter_posts(posts, query).order_by('pk')
+    if cursor is not None:
+        posts = posts.filter(pk__gt=cursor[2])
+    return [(pk, 0.0) for pk in posts.values_list('pk', flat=True)[:limit]]
+
+
+def _sharded_ids(query, match, cursor, limit):
+    """То же по всем шардам: у каждого шарда свой индекс, потоки
+    сливаются по (rank, id). bm25 считается по словарю шарда, так что
+    ранги разных шардов сравнимы лишь приблизительно.
+    """
+    streams = []
+    for alias in sharding.shards():
+        using = connections[alias]
+        if is_supported(using):
+            streams.append(_ranked_ids(match, cursor, limit, using))
+        else:
+            streams.append(_fallback_ids(
+                query, cursor, limit, Post.objects.using(alias)
+            ))
+    return list(islice(
+        heapq.merge(*streams, key=lambda row: (row[1], row[0])), limit
+    ))
+
+
+def search_posts(query, after=None, per_page=LIMIT):
+    """Страница результатов поиска по релевантности.
+
+    Следующая страница запрашивается токеном next_cursor в ?after=:
+    условие по ключу (rank, id) вместо OFFSET.
+    """
+    match = match_query(query)
+    if match is None:
+        return SearchPage([], 1, None)
+    cursor = decode_cursor(after)
+    number = cursor[0] + 1 if cursor is not None else 1
+    if sharding.enabled():
+        rows = _sharded_ids(query, match, cursor, per_page + 1)
+    elif is_supported():
+        rows = _ranked_ids(match, cursor, per_page + 1)
+    else:
+        rows = _fallback_ids(query, cursor, per_page + 1)
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    posts = sharding.in_bulk([pk for pk, _ in rows])
+    next_cursor = None
+    if has_next:
+        pk, rank = rows[-1]
+        next_cursor = encode_cursor(rank, pk, number)
+    return SearchPage(
+        [posts[pk] for pk, _ in rows if pk in posts], number, next_cursor
+    )
@@ -0,0 +1,243 @@
+import heapq
+import zlib
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F, Max, prefetch_related_objects
+
+from .models import Post, PostCounter, PostRedirect
+
+
+# Посты автора лежат в одной из BUCKETS корзин, корзина — на одном из
+# шардов POST_SHARDS. Номер корзины зашит в id поста (id % BUCKETS),
+# поэтому шард поста находится по его id без справочника.
+BUCKETS = 1024
+SEQUENCE_KEY = 'post:id-seq'
+
+
+def enabled():
+    return bool(settings.POST_SHARDS)
+
+
+def shards():
+    return list(settings.POST_SHARDS)
+
+
+def databases():
+    """Базы, где лежат посты: шарды или одна основная база."""
+    return shards() or [DEFAULT_DB_ALIAS]
+
+
+def bucket_for_author(author_id):
+    return zlib.crc32(str(author_id).encode()) % BUCKETS
+
+
+def bucket_for_post(post_id):
+    return int(post_id) % BUCKETS
+
+
+def shard_for_bucket(bucket, aliases=None):
+    aliases = aliases or settings.POST_SHARDS
+    return aliases[bucket % len(aliases)]
+
+
+def shard_for_author(author_id):
+    """Шард с постами автора или None без шардирования."""
+    if not enabled():
+        return None
+    return shard_for_bucket(bucket_for_author(author_id))
+
+
+def shard_for_post(post_id):
+    if not enabled():
+        return None
+    return shard_for_bucket(bucket_for_post(post_id))
+
+
+def _last_sequence():
+    """Наибольший занятый номер последовательности. Учитываются и id
+    основной базы: посты, перенесённые оттуда shard_posts, получают
+    номера после них, и старый id не совпадёт ни с одним новым.
+    """
+    top = [
+        Post.objects.using(alias).aggregate(top=Max('pk'))['top'] or 0
+        for alias in [DEFAULT_DB_ALIAS, *shards()]
+    ]
+    top.append(PostRedirect.objects.using(DEFAULT_DB_ALIAS).aggregate(
+        top=Max('old_id')
+    )['top'] or 0)
+    return max(top) // BUCKETS
+
+
+def _reserve(count):
+    """Занимает count номеров общей последовательности (счётчик в
+    основной базе); возвращает первый из них.
+    """
+    sequence = PostCounter.objects.using(DEFAULT_DB_ALIAS).filter(
+        key=SEQUENCE_KEY
+    )
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        if not sequence.update(value=F('value') + count):
+            try:
+                with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                    PostCounter.objects.using(DEFAULT_DB_ALIAS).create(
+                        key=SEQUENCE_KEY, value=_last_sequence() + count
+                    )
+            except IntegrityError:
+                # Счётчик успел создать параллельный запрос.
+                sequence.update(value=F('value') + count)
+        last = sequence.values_list('value', flat=True).get()
+    return last - count + 1
+
+
+def allocate_ids(author_ids):
+    """id новых постов авторов author_ids: следующие номера общей
+    последовательности, умноженные на BUCKETS, плюс корзина автора.
+    Если счётчика нет, он продолжает наибольший занятый id.
+    """
+    first = _reserve(len(author_ids))
+    return [
+        (first + offset) * BUCKETS + bucket_for_author(author_id)
+        for offset, author_id in enumerate(author_ids)
+    ]
+
+
+def allocate_id(author_id):
+    return allocate_ids([author_id])[0]
+
+
+def skip_past(post_id):
+    """Сдвигает последовательность так, чтобы новые id были больше
+    post_id: счётчик мог появиться до переноса основной базы.
+    """
+    number = int(post_id) // BUCKETS
+    _reserve(0)
+    PostCounter.objects.using(DEFAULT_DB_ALIAS).filter(
+        key=SEQUENCE_KEY, value__lt=number
+    ).update(value=number)
+
+
+def moved_id(post_id):
+    """Новый id поста, перенесённого shard_posts, или None."""
+    if not enabled():
+        return None
+    return PostRedirect.objects.using(DEFAULT_DB_ALIAS).filter(
+        old_id=post_id
+    ).values_list('new_id', flat=True).first()
+
+
+def _position(post):
+    return post.pub_date, post.pk
+
+
+class MergedPosts:
+    """Посты со всех шардов как одна выборка, упорядоченная по
+    (pub_date, id). Поддерживает то, что нужно пагинаторам и счётчикам:
+    filter(), order_by() по этому ключу, count() и срезы.
+
+    Срез [start:stop] читает с каждого шарда первые stop строк и сливает
+    потоки через heapq.merge; prefetch_related выполняется один раз
+    для итоговых строк, а не для каждого шарда.
+    """
+
+    ordered = True
+
+    def __init__(self, querysets, descending=True):
+        self.querysets = querysets
+        self.descending = descending
+
+    def _map(self, method, *args, **kwargs):
+        return MergedPosts(
+            [getattr(qs, method)(*args, **kwargs) for qs in self.querysets],
+            self.descending,
+        )
+
+    def filter(self, *args, **kwargs):
+        return self._map('filter', *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self._map('exclude', *args, **kwargs)
+
+    def for_feed(self):
+        return self._map('for_feed')
+
+    def order_by(self, *fields):
+        merged = self._map('order_by', *fields)
+        if fields:
+            merged.descending = fields[0].startswith('-')
+        return merged
+
+    def count(self):
+        return sum(qs.count() for qs in self.querysets)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError('MergedPosts поддерживает только срезы.')
+        start, stop = key.start or 0, key.stop
+        lookups = self.querysets[0]._prefetch_related_lookups
+        streams = [
+            qs.prefetch_related(None)[:stop] for qs in self.querysets
+        ]
+        rows = list(islice(
+            heapq.merge(*streams, key=_position, reverse=self.descending),
+            start, stop,
+        ))
+        prefetch_related_objects(rows, *lookups)
+        return rows
+
+
+def posts(author_id=None, post_id=None):
+    """Выборка постов. Без шардирования — Post.objects.all(). С ним —
+    QuerySet шарда-владельца, если известен автор или id поста,
+    иначе MergedPosts по всем шардам.
+    """
+    if not enabled():
+        return Post.objects.all()
+    if author_id is not None:
+        return Post.objects.using(shard_for_author(author_id))
+    if post_id is not None:
+        return Post.objects.using(shard_for_post(post_id))
+    return MergedPosts([Post.objects.using(alias) for alias in shards()])
+
+
+def each_shard():
+    """Выборки постов по отдельности на каждом шарде; без
+    шардирования — одна выборка основной базы.
+    """
+    if not enabled():
+        return [Post.objects.all()]
+    return [Post.objects.using(alias) for alias in shards()]
+
+
+def in_bulk(ids):
+    """Посты для лент по id: {id: пост}. С шардами — по одному
+    запросу на каждый шард, где есть нужные посты.
+    """
+    if not enabled():
+        return Post.objects.for_feed().in_bulk(ids)
+    by_shard = {}
+    for pk in ids:
+        by_shard.setdefault(shard_for_post(pk), []).append(pk)
+    found = {}
+    for alias, part in by_shard.items():
+        found.update(Post.objects.using(alias).for_feed().in_bulk(part))
+    return found
+
+
+def disable_foreign_keys(connection):
+    """Пользователи и группы живут только в основной базе, поэтому
+    внешние ключи на шардах не проверяются. Вне транзакции.
+    """
+    if (connection.alias != DEFAULT_DB_ALIAS
+            and connection.vendor == 'sqlite'):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA foreign_keys = OFF')
+
+
+def on_connection_created(sender, connection, **kwargs):
+    if connection.alias in settings.POST_SHARDS:
+        disable_foreign_keys(connection)
@@ -0,0 +1,203 @@
+from django.db.models import DEFERRED
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import cache, counters, lookups, sharding, stats, timeline
+from .models import (FanoutTask, Follow, Group, Post, PostCounter,
+                     TimelineEntry, User)
+
+
+# Поля, прежние значения которых нужны обработчикам post_save:
+# смена группы поста, slug группы или имени пользователя.
+TRACKED_FIELDS = {Post: 'group_id', Group: 'slug', User: 'username'}
+
+
+def _is_login(update_fields):
+    """Вход пользователя меняет только last_login, невидимый на страницах."""
+    return update_fields is not None and set(update_fields) == {'last_login'}
+
+
+def _author_scopes(author_ids, batch_size=500):
+    author_ids = list(author_ids)
+    for start in range(0, len(author_ids), batch_size):
+        usernames = User.objects.filter(
+            pk__in=author_ids[start:start + batch_size]
+        ).values_list('username', flat=True)
+        yield from map(cache.author_scope, usernames)
+
+
+def _group_authors_changed(group_id):
+    """Группа видна в профилях авторов её постов: их статистика
+    (ETag профиля) и кэш страниц профилей сбрасываются.
+    """
+    author_ids = stats.group_author_ids(group_id)
+    stats.touch_many(author_ids)
+    cache.invalidate(*_author_scopes(author_ids))
+
+
+@receiver(post_init, sender=Post)
+@receiver(post_init, sender=Group)
+@receiver(post_init, sender=User)
+def remember_initial(sender, instance, **kwargs):
+    field = TRACKED_FIELDS[sender]
+    setattr(
+        instance, f'_initial_{field}', instance.__dict__.get(field, DEFERRED)
+    )
+
+
+@receiver(pre_save, sender=Post)
+def allocate_sharded_id(sender, instance, raw=False, **kwargs):
+    """На шардах id нового поста несёт корзину автора, см. sharding."""
+    if instance.pk is None and not raw and sharding.enabled():
+        instance.pk = sharding.allocate_id(instance.author_id)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_posts(sender, instance, **kwargs):
+    """Каскад Django собирает посты только в основной базе: посты
+    автора на шарде удаляются здесь, с сигналами постов, которые
+    сдвигают счётчики и чистят ленты.
+    """
+    if sharding.enabled():
+        sharding.posts(author_id=instance.pk).filter(
+            author_id=instance.pk
+        ).delete()
+
+
+@receiver(pre_delete, sender=Group)
+def touch_group_authors(sender, instance, **kwargs):
+    """Посты удаляемой группы останутся без неё. Авторов ещё можно
+    найти по group_id, поэтому до удаления и до unlink_sharded_posts.
+    """
+    _group_authors_changed(instance.pk)
+
+
+@receiver(pre_delete, sender=Group)
+def unlink_sharded_posts(sender, instance, **kwargs):
+    """SET_NULL для постов группы на шардах."""
+    for alias in sharding.shards():
+        Post.objects.using(alias).filter(group_id=instance.pk).update(
+            group=None
+        )
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change(counters.post_keys(instance.group_id), 1)
+        stats.post_created(instance)
+        timeline.enqueue(instance)
+        return
+    if instance._initial_group_id not in (DEFERRED, instance.group_id):
+        if instance._initial_group_id is not None:
+            counters.change(
+                [counters.group_key(instance._initial_group_id)], -1
+            )
+        if instance.group_id is not None:
+            counters.change([counters.group_key(instance.group_id)], 1)
+    counters.touch(counters.post_keys(instance.group_id))
+    stats.touch(instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change(counters.post_keys(instance.group_id), -1)
+    stats.post_deleted(instance)
+    FanoutTask.objects.filter(post_id=instance.pk).delete()
+    TimelineEntry.objects.filter(post_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Follow)
+def count_follower(sender, instance, created, **kwargs):
+    if created:
+        stats.follower_changed(instance.author_id, 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    followers = stats.follower_changed(instance.author_id, -1)
+    timeline.forget(instance.user_id, instance.author_id)
+    timeline.unfollowed(instance.author_id, followers)
+
+
+@receiver(post_save, sender=Group)
+def touch_group_counters(sender, instance, created, **kwargs):
+    """Название и slug группы видны в её ленте, в общей и в профилях
+    авторов её постов.
+    """
+    counters.touch([counters.GLOBAL_KEY, counters.group_key(instance.pk)])
+    if not created:
+        _group_authors_changed(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def touch_author_counters(sender, instance, created, update_fields=None,
+                          **kwargs):
+    """Имя автора видно в его профиле, в общей ленте и в лентах групп
+    с его постами.
+    """
+    if created or _is_login(update_fields):
+        return
+    group_ids = counters.author_group_ids(instance.pk)
+    counters.touch(
+        [counters.GLOBAL_KEY, *map(counters.group_key, group_ids)]
+    )
+    stats.touch(instance.pk)
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True
+    )
+    cache.invalidate(*map(cache.group_scope, slugs))
+
+
+@receiver(post_delete, sender=Group)
+def drop_group_counter(sender, instance, **kwargs):
+    PostCounter.objects.filter(key=counters.group_key(instance.pk)).delete()
+
+
+def _post_scopes(post):
+    scopes = [cache.FEED_SCOPE, cache.author_scope(post.author.username)]
+    group_ids = {post.group_id, post._initial_group_id} - {None, DEFERRED}
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True
+    )
+    return scopes + [cache.group_scope(slug) for slug in slugs]
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    cache.invalidate(*_post_scopes(instance))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    slugs = {instance.slug, instance._initial_slug} - {DEFERRED}
+    cache.invalidate(
+        cache.FEED_SCOPE, *(cache.group_scope(slug) for slug in slugs)
+    )
+    lookups.invalidate('group', *slugs)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author_pages(sender, instance, update_fields=None, **kwargs):
+    if _is_login(update_fields):
+        return
+    usernames = {instance.username, instance._initial_username} - {DEFERRED}
+    cache.invalidate(
+        cache.FEED_SCOPE, *(cache.author_scope(name) for name in usernames)
+    )
+    lookups.invalidate('author', *usernames)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+def forget_initial(sender, instance, **kwargs):
+    """Сохранённые значения становятся исходными для следующего save().
+    Подключён последним, поэтому остальные обработчики видят прежние.
+    """
+    remember_initial(sender, instance)
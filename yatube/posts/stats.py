@@ -0,0 +1,211 @@
+from django.db import connection, transaction
+from django.db.models import (Count, DateTimeField, F, Max, OuterRef,
+                              Subquery, Value)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from core import replicas
+from . import sharding
+from .models import AuthorStats, Follow
+
+
+def _last_post_date(author_id):
+    dates = sharding.posts(author_id=author_id).filter(
+        author_id=author_id
+    ).order_by('-pub_date')
+    if sharding.enabled():
+        # Посты на шарде: подзапрос в основную базу не встроить.
+        return Value(
+            dates.values_list('pub_date', flat=True).first(),
+            output_field=DateTimeField(),
+        )
+    return Subquery(dates.values('pub_date')[:1])
+
+
+def _compute(author_id):
+    values = sharding.posts(author_id=author_id).filter(
+        author_id=author_id
+    ).aggregate(
+        post_count=Count('id'), last_post_date=Max('pub_date')
+    )
+    values['follower_count'] = Follow.objects.filter(
+        author_id=author_id
+    ).count()
+    return values
+
+
+def _follower_counts(author_ids):
+    return dict(Follow.objects.filter(author_id__in=author_ids).values(
+        'author'
+    ).annotate(total=Count('id')).values_list('author', 'total'))
+
+
+def post_created(post):
+    """Учитывает новый пост. Отсутствующая статистика не создаётся:
+    её посчитает for_author_id при первом чтении.
+    """
+    posts_created({post.author_id: (1, post.pub_date)})
+
+
+@transaction.atomic
+def posts_created(changes):
+    """Учитывает новые посты нескольких авторов (например, после
+    bulk_create). changes: author_id -> (число новых постов, дата
+    последнего из них).
+    """
+    if len(changes) == 1:
+        (author_id, (count, last)), = changes.items()
+        AuthorStats.objects.filter(author_id=author_id).update(
+            post_count=F('post_count') + count,
+            last_post_date=Greatest(
+                Coalesce('last_post_date', Value(last)), Value(last)
+            ),
+            modified=timezone.now(),
+        )
+        return
+    # Один подготовленный UPDATE на всех авторов через executemany:
+    # сборка такого запроса в ORM для каждого автора обходится дороже
+    # самой вставки постов.
+    table = connection.ops.quote_name(AuthorStats._meta.db_table)
+    adapt = connection.ops.adapt_datetimefield_value
+    now = adapt(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {table} SET post_count = post_count + %s, '
+            f'last_post_date = CASE WHEN last_post_date IS NULL '
+            f'OR last_post_date < %s THEN %s ELSE last_post_date END, '
+            f'modified = %s WHERE author_id = %s',
+            [
+                (count, adapt(last), adapt(last), now, author_id)
+                for author_id, (count, last) in changes.items()
+            ],
+        )
+
+
+@transaction.atomic
+def post_deleted(post):
+    AuthorStats.objects.filter(author_id=post.author_id).update(
+        post_count=F('post_count') - 1,
+        last_post_date=_last_post_date(post.author_id),
+        modified=timezone.now(),
+    )
+
+
+@transaction.atomic
+def follower_changed(author_id, delta):
+    """Сдвигает число подписчиков; меняет и modified, потому что
+    кнопка подписки видна в профиле. Возвращает новое число (в той же
+    транзакции, поэтому без гонки с другими подписками) или None, если
+    статистики ещё нет.
+    """
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    stats.update(
+        follower_count=F('follower_count') + delta,
+        modified=timezone.now(),
+    )
+    return stats.values_list('follower_count', flat=True).first()
+
+
+def touch(author_id):
+    """Отмечает изменение, видимое в профиле, без смены счётчиков."""
+    AuthorStats.objects.filter(author_id=author_id).update(
+        modified=timezone.now()
+    )
+
+
+def group_author_ids(group_id):
+    """Авторы постов группы: по запросу на каждый шард."""
+    return {
+        author_id
+        for posts in sharding.each_shard()
+        for author_id in posts.filter(group_id=group_id).values_list(
+            'author_id', flat=True
+        ).distinct()
+    }
+
+
+def touch_many(author_ids, batch_size=500):
+    """touch() для нескольких авторов, пачками по batch_size."""
+    author_ids = list(author_ids)
+    now = timezone.now()
+    for start in range(0, len(author_ids), batch_size):
+        AuthorStats.objects.filter(
+            author_id__in=author_ids[start:start + batch_size]
+        ).update(modified=now)
+
+
+def for_author_id(author_id):
+    """Статистика автора; отсутствующая считается с нуля и сохраняется."""
+    stats = AuthorStats.objects.filter(author_id=author_id).first()
+    if stats is not None:
+        return stats
+    return replicas.create_on_primary(
+        AuthorStats, _compute(author_id), author_id=author_id
+    )
+
+
+def for_author(author):
+    """Статистика автора, загруженного с select_related('post_stats')."""
+    try:
+        return author.post_stats
+    except AuthorStats.DoesNotExist:
+        return for_author_id(author.pk)
+
+
+def find_inconsistent(fix=False):
+    """Авторы, чья статистика расходится с постами в базе.
+
+    Сверяются существующие записи статистики и авторы, у которых есть
+    посты, а записи нет. Записи создаются лениво (см. for_author_id),
+    поэтому её отсутствие у автора без постов расхождением не считается.
+
+    Возвращает список (author_id, сохранённое, фактическое), где
+    значения — пары (post_count, last_post_date); None означает, что
+    записи статистики нет. С fix=True статистика исправляется.
+    """
+    actual = {}
+    for posts in sharding.each_shard():
+        rows = posts.values('author').annotate(
+            total=Count('id'), last=Max('pub_date')
+        ).values_list('author', 'total', 'last').order_by()
+        for author_id, total, last in rows.iterator():
+            count, latest = actual.get(author_id, (0, last))
+            actual[author_id] = (count + total, max(latest, last))
+    stored = {
+        stats.author_id: (stats.post_count, stats.last_post_date)
+        for stats in AuthorStats.objects.iterator()
+    }
+    problems = []
+    for author_id in sorted(stored.keys() | actual.keys()):
+        saved = stored.get(author_id)
+        found = actual.get(author_id, (0, None))
+        if saved != found:
+            problems.append((author_id, saved, found))
+    if fix:
+        _replace(problems)
+    return problems
+
+
+@transaction.atomic
+def _replace(problems, batch_size=500):
+    """Перезаписывает статистику пачками: после массовой вставки
+    расходиться могут сотни тысяч авторов.
+    """
+    for start in range(0, len(problems), batch_size):
+        batch = problems[start:start + batch_size]
+        author_ids = [author_id for author_id, _, _ in batch]
+        followers = _follower_counts(author_ids)
+        AuthorStats.objects.filter(author_id__in=author_ids).delete()
+        AuthorStats.objects.bulk_create(
+            AuthorStats(author_id=author_id, post_count=total,
+                        last_post_date=last,
+                        follower_count=followers.get(author_id, 0))
+            for author_id, _, (total, last) in batch
+        )
+
+
+def modified_subquery(author_field='author_id'):
+    """Время изменения статистики автора для аннотации запроса."""
+    return Subquery(AuthorStats.objects.filter(
+        author_id=OuterRef(author_field)
+    ).values('modified')[:1])
@@ -0,0 +1,126 @@
+import copy
+
+from django.contrib import admin
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .. import counters
+from ..admin import LoadedAutocompleteSelect
+from ..models import Group, Post, User
+
+
+class PostAdminScaleTests(TestCase):
+    """Список постов в админке на 100 000 постов и 5 000 групп."""
+
+    POSTS = 100_000
+    GROUPS = 5_000
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        User.objects.bulk_create(
+            User(username=f'author{i}') for i in range(100)
+        )
+        Group.objects.bulk_create((
+            Group(title=f'Группа {i}', slug=f'group-{i}', description='-')
+            for i in range(cls.GROUPS)
+        ), batch_size=500)
+        authors = list(User.objects.filter(username__startswith='author'))
+        groups = list(Group.objects.all())
+        Post.objects.bulk_create(
+            (
+                Post(
+                    text=f'Пост {i}',
+                    author=authors[i % len(authors)],
+                    group=groups[i % len(groups)],
+                )
+                for i in range(cls.POSTS)
+            ),
+            batch_size=500,
+        )
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        counters.recount()
+        # Форма поста читает тип содержимого, если его кэш пуст:
+        # число запросов не должно зависеть от порядка тестов.
+        ContentType.objects.clear_cache()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_changelist_query_count(self):
+        """Число запросов списка не зависит от числа строк и групп,
+        а без фильтров не выполняется COUNT(*).
+        """
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, self.POSTS)
+        self.assertEqual(len(response.context['cl'].result_list), 100)
+        # Сессия, пользователь, счётчик постов и сама страница.
+        self.assertEqual(len(queries), 4)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+
+    def test_changelist_response_size(self):
+        """Строки не содержат списков всех групп: с обычным <select>
+        каждая из 100 строк весила бы больше 200 КБ.
+        """
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertLess(len(response.content), 300_000)
+        self.assertContains(
+            response, f'<option value="{self.post.group_id}" selected>'
+        )
+
+    def test_filtered_changelist_counts_exactly(self):
+        """С фильтром или поиском число результатов точное."""
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'Пост 1234'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_change_form_size(self):
+        """Форма поста не загружает всех авторов и все группы."""
+        url = reverse('admin:posts_post_change', args=[self.post.pk])
+        with self.assertNumQueries(8):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(response.content), 50_000)
+
+    def test_list_editable_save(self):
+        """Смена группы из списка сохраняется."""
+        group = Group.objects.get(slug='group-1')
+        posts = list(Post.objects.order_by('-pub_date', '-id')[:100])
+        data = {
+            'form-TOTAL_FORMS': len(posts),
+            'form-INITIAL_FORMS': len(posts),
+            '_save': 'Сохранить',
+        }
+        for i, post in enumerate(posts):
+            data[f'form-{i}-id'] = post.pk
+            data[f'form-{i}-group'] = group.pk if i == 0 else post.group_id
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'), data
+        )
+        self.assertEqual(response.status_code, 302)
+        posts[0].refresh_from_db()
+        self.assertEqual(posts[0].group, group)
+
+
+class LoadedAutocompleteSelectTests(SimpleTestCase):
+    def test_copies_do_not_share_labels(self):
+        """Подписи, переданные одной копии виджета, не видны в других."""
+        widget = LoadedAutocompleteSelect(
+            Post._meta.get_field('group').remote_field, admin.site
+        )
+        first, second = copy.deepcopy(widget), copy.deepcopy(widget)
+        first.labels['1'] = 'Группа'
+        self.assertEqual(second.labels, {})
+        self.assertEqual(widget.labels, {})
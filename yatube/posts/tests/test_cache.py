@@ -0,0 +1,185 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from .. import cache as page_cache
+from .. import lookups
+from ..cache import page_cache_stats
+from ..models import Group, Post, User
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(title='First', slug='first')
+        cls.group_2 = Group.objects.create(title='Second', slug='second')
+        cls.post = Post.objects.create(
+            text='Текст', author=cls.author, group=cls.group
+        )
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', kwargs={'slug': 'first'}),
+            'group_2': reverse('posts:group_list', kwargs={'slug': 'second'}),
+            'profile': reverse('posts:profile', kwargs={'username': 'Author'}),
+            'other': reverse('posts:profile', kwargs={'username': 'Other'}),
+        }
+
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+        # Тесты меняют и удаляют пост и группу: каждому — свои копии,
+        # а не общие объекты класса.
+        self.post = Post.objects.get(pk=self.post.pk)
+        self.group = Group.objects.get(pk=self.group.pk)
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def warm_up(self):
+        for url in self.urls.values():
+            self.guest_client.get(url)
+
+    def is_cached(self, url):
+        return self.guest_client.get(url).context is None
+
+    def test_guest_pages_served_from_cache(self):
+        """Повторный запрос гостя обращается к базе только
+        за состоянием страницы для ETag.
+        """
+        self.warm_up()
+        for url in self.urls.values():
+            with self.subTest(url=url), self.assertNumQueries(1):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_authorized_pages_not_cached(self):
+        """Страницы для авторизованных пользователей не кэшируются."""
+        self.author_client.get(self.urls['index'])
+        response = self.author_client.get(self.urls['index'])
+        self.assertIsNotNone(response.context)
+
+    def test_cursor_and_page_have_own_entries(self):
+        """Разные страницы ленты кэшируются под разными ключами."""
+        self.guest_client.get(self.urls['index'])
+        response = self.guest_client.get(self.urls['index'] + '?page=2')
+        self.assertIsNotNone(response.context)
+
+    def test_new_post_invalidates_only_affected_pages(self):
+        """Новый пост сбрасывает ленту, свою группу и автора."""
+        self.warm_up()
+        Post.objects.create(text='Новый', author=self.author, group=self.group)
+        expected = {
+            'index': False,
+            'group': False,
+            'profile': False,
+            'group_2': True,
+            'other': True,
+        }
+        for name, cached in expected.items():
+            with self.subTest(page=name):
+                self.assertEqual(self.is_cached(self.urls[name]), cached)
+        response = self.guest_client.get(self.urls['index'])
+        self.assertContains(response, 'Новый')
+
+    def test_post_moved_to_other_group_invalidates_both_groups(self):
+        """Перенос поста в другую группу сбрасывает обе группы."""
+        self.warm_up()
+        self.post.group = self.group_2
+        self.post.save()
+        self.assertFalse(self.is_cached(self.urls['group']))
+        self.assertFalse(self.is_cached(self.urls['group_2']))
+
+    def test_group_change_invalidates_group_and_feed(self):
+        """Изменение группы сбрасывает её страницу и общую ленту."""
+        self.warm_up()
+        self.group.description = 'Новое описание'
+        self.group.save()
+        self.assertFalse(self.is_cached(self.urls['index']))
+        self.assertFalse(self.is_cached(self.urls['group']))
+        self.assertTrue(self.is_cached(self.urls['group_2']))
+
+    def test_post_delete_invalidates_pages(self):
+        """Удаление поста сбрасывает страницы, где он был виден."""
+        self.warm_up()
+        self.post.delete()
+        self.assertFalse(self.is_cached(self.urls['group']))
+        self.assertFalse(self.is_cached(self.urls['profile']))
+
+    def test_all_scope_drops_every_page(self):
+        """invalidate(ALL_SCOPE) сбрасывает все страницы."""
+        self.warm_up()
+        page_cache.invalidate(page_cache.ALL_SCOPE)
+        for url in self.urls.values():
+            with self.subTest(url=url):
+                self.assertFalse(self.is_cached(url))
+
+    def test_stats_count_hits_and_misses(self):
+        """Статистика кэша учитывает попадания и промахи."""
+        self.guest_client.get(self.urls['index'])
+        self.guest_client.get(self.urls['index'])
+        self.guest_client.get(self.urls['index'])
+        stats = page_cache_stats()['index']
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+
+
+class FileBasedPageCacheTests(AnonymousPageCacheTests):
+    """Те же проверки с файловым бэкендом кэша."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.cache_settings = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': cls.cache_dir,
+            }
+        })
+        cls.cache_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.cache_settings.disable()
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(text='Исходный', author=cls.author)
+        cls.other = Post.objects.create(text='Другой', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+        self.post = Post.objects.get(pk=self.post.pk)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_card_rendered_from_fragment_cache(self):
+        """Карточка без изменений берётся из кэша фрагментов."""
+        self.author_client.get(reverse('posts:index'))
+        # update() не меняет отметку updated: фрагмент остаётся прежним.
+        Post.objects.filter(pk=self.post.pk).update(text='Без отметки')
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Исходный')
+
+    def test_edited_post_invalidates_only_own_card(self):
+        """Правка поста обновляет только его карточку."""
+        self.author_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.other.pk).update(text='Без отметки')
+        self.post.text = 'Исправленный'
+        self.post.save()
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Исправленный')
+        self.assertContains(response, 'Другой')
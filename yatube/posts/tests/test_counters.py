@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .. import counters
+from ..models import Group, Post, PostCounter, User
+
+
+class PostCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(title='First', slug='first')
+        cls.group_2 = Group.objects.create(title='Second', slug='second')
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=cls.author, group=cls.group)
+            for i in range(3)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        counters.recount()
+
+    def value(self, key):
+        return PostCounter.objects.get(key=key).value
+
+    def test_create_and_delete_update_counters(self):
+        """Создание и удаление поста меняют все его счётчики."""
+        keys = [
+            counters.GLOBAL_KEY,
+            counters.group_key(self.group.id),
+        ]
+        post = Post.objects.create(
+            text='Новый', author=self.author, group=self.group
+        )
+        for key in keys:
+            with self.subTest(key=key):
+                self.assertEqual(self.value(key), 4)
+        post.delete()
+        for key in keys:
+            with self.subTest(key=key):
+                self.assertEqual(self.value(key), 3)
+
+    def test_post_edit_moves_post_between_group_counters(self):
+        """Смена группы в post_edit переносит пост между счётчиками."""
+        post = Post.objects.filter(author=self.author).first()
+        # Счётчик пустой группы создаётся при первом чтении.
+        counters.get_count(
+            counters.group_key(self.group_2.id), self.group_2.posts.all()
+        )
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': post.text, 'group': self.group_2.id},
+        )
+        self.assertEqual(self.value(counters.group_key(self.group.id)), 2)
+        self.assertEqual(self.value(counters.group_key(self.group_2.id)), 1)
+        self.assertEqual(self.value(counters.GLOBAL_KEY), 3)
+
+    def test_paginator_reads_count_from_store(self):
+        """Пагинатор ленты не выполняет COUNT(*) по постам."""
+        PostCounter.objects.filter(key=counters.GLOBAL_KEY).update(value=42)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(reverse('posts:index'))
+            count = response.context['page_obj'].paginator.count
+        self.assertEqual(count, 42)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_missing_counter_is_computed_on_read(self):
+        """Отсутствующий счётчик вычисляется и сохраняется при чтении."""
+        PostCounter.objects.all().delete()
+        response = self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
+        self.assertEqual(self.value(counters.group_key(self.group.id)), 3)
+
+    def test_recount_command_repairs_drift(self):
+        """Команда recount_posts исправляет разошедшиеся счётчики."""
+        PostCounter.objects.update(value=100)
+        call_command('recount_posts', stdout=StringIO())
+        self.assertEqual(self.value(counters.GLOBAL_KEY), 3)
+        self.assertFalse(PostCounter.objects.filter(
+            key=counters.group_key(self.group_2.id)
+        ).exists())
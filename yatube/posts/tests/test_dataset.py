@@ -0,0 +1,54 @@
+import io
+from collections import Counter
+
+from django.core.management import call_command
+from django.test import TestCase
+from .. import counters, search, stats
+from ..dataset import DatasetGenerator
+from ..models import Group, Post, PostCounter, User
+
+
+class DatasetGeneratorTests(TestCase):
+    def rows(self, seed):
+        generator = DatasetGenerator(seed=seed)
+        return list(generator.post_rows(500, range(1, 51), range(1, 11)))
+
+    def test_same_seed_same_rows(self):
+        """Набор зависит только от seed."""
+        self.assertEqual(self.rows(1), self.rows(1))
+        self.assertNotEqual(self.rows(1), self.rows(2))
+
+    def test_distributions(self):
+        """Авторы распределены по Ципфу, даты растут вместе с id."""
+        rows = self.rows(0)
+        by_author = Counter(row[3] for row in rows).most_common()
+        # При равномерном распределении у каждого было бы по 10 постов.
+        self.assertGreater(by_author[0][1], 50)
+        self.assertLess(by_author[-1][1], 10)
+        dates = [row[1] for row in rows]
+        self.assertEqual(dates, sorted(dates))
+        self.assertTrue(all(row[2] >= row[1] for row in rows))
+        lengths = sorted(len(row[0]) for row in rows)
+        self.assertLess(lengths[0], lengths[len(lengths) // 2])
+        without_group = sum(row[4] is None for row in rows)
+        self.assertTrue(50 <= without_group <= 150)
+
+    def test_command(self):
+        """Команда создаёт набор, индексы и счётчики согласованы."""
+        stdout = io.StringIO()
+        call_command(
+            'generate_dataset', '--users', '20', '--groups', '5',
+            '--posts', '1000', '--batch-size', '300', stdout=stdout,
+        )
+        self.assertIn('постов/с', stdout.getvalue())
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 1000)
+        self.assertEqual(
+            PostCounter.objects.get(key=counters.GLOBAL_KEY).value, 1000
+        )
+        self.assertEqual(stats.find_inconsistent(), [])
+        post = Post.objects.first()
+        self.assertIn(
+            post, search.filter_posts(Post.objects.all(), post.text)
+        )
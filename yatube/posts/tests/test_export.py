@@ -0,0 +1,138 @@
+import csv
+import io
+import json
+import tracemalloc
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from ..models import Group, Post, User
+
+
+class NullStream(io.TextIOBase):
+    """Поток, который ничего не хранит: в пике памяти остаётся только
+    сама выгрузка.
+    """
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, value):
+        self.size += len(value)
+        return len(value)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.staff = User.objects.create_user(username='Staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.first = Post.objects.create(
+            text='Первый, с "кавычками"', author=cls.author, group=cls.group
+        )
+        cls.second = Post.objects.create(text='Второй', author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def export(self, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('export_posts', *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv(self):
+        """CSV содержит заголовок и посты в порядке публикации."""
+        output, _ = self.export()
+        rows = list(csv.reader(io.StringIO(output)))
+        self.assertEqual(
+            rows[0], ['id', 'text', 'pub_date', 'updated', 'author', 'group']
+        )
+        self.assertEqual(rows[1][1], 'Первый, с "кавычками"')
+        self.assertEqual(rows[1][4:], ['Author', 'group'])
+        self.assertEqual(rows[2][5], '')
+        self.assertEqual(len(rows), 3)
+
+    def test_ndjson_and_incremental(self):
+        """Позиция из stderr продолжает выгрузку с места остановки."""
+        output, position = self.export('--format', 'ndjson')
+        rows = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         [self.first.id, self.second.id])
+        self.assertIsNone(rows[1]['group'])
+        third = Post.objects.create(text='Третий', author=self.author)
+        output, _ = self.export('--format', 'ndjson', *position.split())
+        rows = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [third.id])
+
+    def test_view_is_staff_only(self):
+        """Выгрузка доступна только сотрудникам."""
+        url = reverse('posts:export')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, 302)
+        response = self.staff_client.get(url, {'format': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+
+    def test_view_since(self):
+        """Параметры since и since_id отбирают посты после позиции."""
+        response = self.staff_client.get(reverse('posts:export'), {
+            'format': 'ndjson',
+            'since': self.first.pub_date.isoformat(),
+            'since_id': self.first.id,
+        })
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(json.loads(lines[0])['id'], self.second.id)
+        self.assertEqual(len(lines), 1)
+        response = self.staff_client.get(
+            reverse('posts:export'), {'since': 'вчера'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportMemoryTests(TestCase):
+    """Память выгрузки не растёт вместе с таблицей."""
+
+    POSTS = 20_000
+    CHUNK_SIZE = 500
+    # Пик памяти зависит от размера порции, а не от числа постов.
+    CEILING = 2 * 1024 * 1024
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='Author')
+        Post.objects.bulk_create(
+            (Post(text=f'Пост номер {i} ' * 20, author=author)
+             for i in range(cls.POSTS)),
+            batch_size=500,
+        )
+
+    def measure_peak(self, export_format):
+        stream = NullStream()
+        tracemalloc.start()
+        try:
+            call_command(
+                'export_posts', '--format', export_format,
+                '--chunk-size', self.CHUNK_SIZE,
+                stdout=stream, stderr=io.StringIO(),
+            )
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return stream.size, peak
+
+    def test_export_memory_ceiling(self):
+        """Пик памяти намного меньше объёма выгрузки."""
+        for export_format in ('csv', 'ndjson'):
+            with self.subTest(export_format=export_format):
+                size, peak = self.measure_peak(export_format)
+                self.assertGreater(size, 3 * self.CEILING)
+                self.assertLess(peak, self.CEILING)
@@ -0,0 +1,171 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from .. import counters, lookups, search, stats
+from ..models import FanoutTask, Follow, Group, Post, PostCounter, User
+
+
+class ImportPostsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+        self.author = User.objects.create_user(username='Existing')
+        self.group = Group.objects.create(
+            title='Группа', slug='existing', description='-'
+        )
+        # Счётчик группы заводится, только когда в ней есть посты.
+        Post.objects.create(text='Старый', author=self.author,
+                            group=self.group)
+        counters.recount()
+        stats.find_inconsistent(fix=True)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, rows):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.writelines(rows)
+        return path
+
+    def ndjson(self, name, count, start=0):
+        return self.write(name, (
+            json.dumps({
+                'text': f'Импортированный пост {i}',
+                'pub_date': f'2020-01-01T00:{i // 60 % 60:02}:{i % 60:02}',
+                'author': f'user{i % 3}' if i % 2 else 'Existing',
+                'group': 'existing' if i % 3 else f'new{i % 2}',
+            }) + '\n'
+            for i in range(start, start + count)
+        ))
+
+    def run_import(self, *args):
+        stdout = io.StringIO()
+        call_command('import_posts', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def assert_consistent(self):
+        total = PostCounter.objects.get(key=counters.GLOBAL_KEY).value
+        self.assertEqual(total, Post.objects.count())
+        group_total = PostCounter.objects.get(
+            key=counters.group_key(self.group.pk)
+        ).value
+        self.assertEqual(group_total, self.group.posts.count())
+        # Статистика новых авторов создаётся при первом чтении.
+        problems = [
+            problem for problem in stats.find_inconsistent()
+            if problem[1] is not None
+        ]
+        self.assertEqual(problems, [])
+
+    def test_import_ndjson(self):
+        """Посты, авторы и группы создаются; даты и счётчики верны."""
+        output = self.run_import(
+            self.ndjson('posts.ndjson', 250), '--batch-size', '100'
+        )
+        self.assertIn('строк/с', output)
+        self.assertEqual(Post.objects.count(), 251)
+        self.assertEqual(
+            set(User.objects.values_list('username', flat=True)),
+            {'Existing', 'user0', 'user1', 'user2'},
+        )
+        self.assertTrue(Group.objects.filter(slug='new1').exists())
+        first = Post.objects.get(text='Импортированный пост 0')
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertEqual(first.author, self.author)
+        self.assert_consistent()
+        found = search.filter_posts(Post.objects.all(), 'пост 125')
+        self.assertEqual(found.count(), 1)
+
+    def test_import_csv(self):
+        """CSV из export_posts импортируется обратно."""
+        Post.objects.update(text='Исходный')
+        exported = io.StringIO()
+        call_command('export_posts', stdout=exported, stderr=io.StringIO())
+        Post.objects.all().delete()
+        path = self.write('posts.csv', [exported.getvalue()])
+        self.run_import(path)
+        post = Post.objects.get()
+        self.assertEqual(post.text, 'Исходный')
+        self.assertEqual(post.group, self.group)
+
+    def test_deferred_maintenance(self):
+        """С отложенным обслуживанием индексы возвращаются,
+        а счётчики пересчитываются в конце.
+        """
+        self.run_import(
+            self.ndjson('posts.ndjson', 120), '--defer-maintenance',
+            '--batch-size', '50',
+        )
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+        for index in Post._meta.indexes:
+            self.assertIn(index.name, indexes)
+        self.assert_consistent()
+        found = search.filter_posts(Post.objects.all(), 'пост 7')
+        self.assertEqual(found.count(), 1)
+
+    def test_resume_from_checkpoint(self):
+        """После ошибки импорт продолжается с последней пачки."""
+        checkpoint = os.path.join(self.directory.name, 'checkpoint.json')
+        good = self.ndjson('good.ndjson', 100)
+        with open(good, encoding='utf-8') as stream:
+            lines = stream.readlines()
+        broken = self.write(
+            'posts.ndjson', lines[:75] + ['{"text": "без автора"}\n']
+            + lines[75:]
+        )
+        with self.assertRaisesMessage(CommandError, 'Строка 76'):
+            self.run_import(
+                broken, '--batch-size', '25', '--checkpoint', checkpoint
+            )
+        self.assertEqual(Post.objects.count(), 76)
+        with open(checkpoint) as stream:
+            self.assertEqual(json.load(stream), {'rows': 75})
+        fixed = self.write('posts.ndjson', lines)
+        output = self.run_import(
+            fixed, '--batch-size', '25', '--checkpoint', checkpoint
+        )
+        self.assertIn('строки 76', output)
+        self.assertEqual(Post.objects.count(), 101)
+        self.assertFalse(os.path.exists(checkpoint))
+        self.assert_consistent()
+
+    @override_settings(TIMELINE_BACKFILL=5)
+    def test_followed_authors_are_fanned_out(self):
+        """Последние посты авторов с подписчиками ставятся в очередь
+        раскладки; посты авторов без подписчиков — нет.
+        """
+        reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=reader, author=self.author)
+        FanoutTask.objects.all().delete()
+        self.run_import(self.ndjson('posts.ndjson', 20))
+        tasks = FanoutTask.objects.all()
+        self.assertEqual(tasks.count(), 5)
+        self.assertEqual(
+            set(tasks.values_list('author_id', flat=True)), {self.author.pk}
+        )
+        latest = Post.objects.filter(author=self.author).order_by(
+            '-pub_date', '-pk'
+        ).values_list('pk', flat=True)[:5]
+        self.assertEqual(
+            set(tasks.values_list('post_id', flat=True)), set(latest)
+        )
+
+    def test_new_authors_and_groups_drop_negative_cache(self):
+        """Созданные импортом авторы и группы находятся сразу, даже если
+        раньше их искали и не нашли.
+        """
+        self.assertIsNone(lookups.author('user1'))
+        self.assertIsNone(lookups.group('new0'))
+        self.run_import(self.ndjson('posts.ndjson', 10))
+        self.assertIsNotNone(lookups.author('user1'))
+        self.assertIsNotNone(lookups.group('new0'))
@@ -0,0 +1,107 @@
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core import metrics
+from .. import lookups
+from ..models import Group, Post, User
+
+
+class LocalCacheTests(SimpleTestCase):
+    def test_least_recently_used_is_evicted(self):
+        local = lookups.LocalCache()
+        local.set('a', 1, 60, size=2)
+        local.set('b', 2, 60, size=2)
+        local.get('a')
+        local.set('c', 3, 60, size=2)
+        self.assertEqual(local.get('a'), 1)
+        self.assertIsNone(local.get('b'))
+        self.assertEqual(local.get('c'), 3)
+
+    def test_expired_entries_are_dropped(self):
+        local = lookups.LocalCache()
+        local.set('a', 1, 0, size=2)
+        self.assertIsNone(local.get('a'))
+
+
+class LookupCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+        metrics.REGISTRY.reset()
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def test_read_through_levels(self):
+        """Промах идёт в базу, дальше — кэш процесса, затем общий кэш."""
+        with self.assertNumQueries(1):
+            self.assertEqual(lookups.group('group'), self.group)
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.group('group'), self.group)
+        lookups.local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.group('group'), self.group)
+        self.assertEqual(
+            lookups.stats(),
+            {'group': {'miss': 1, 'local': 1, 'shared': 1}},
+        )
+
+    def test_missing_slugs_are_cached(self):
+        """404 по несуществующему slug кэшируется до создания группы."""
+        url = reverse('posts:group_list', args=['new'])
+        self.assertEqual(Client().get(url).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertIsNone(lookups.group('new'))
+        Group.objects.create(title='Новая', slug='new')
+        self.assertEqual(Client().get(url).status_code, 200)
+
+    def test_slug_changed_in_admin(self):
+        """Смена slug в админке сбрасывает кэш старого и нового slug."""
+        old_url = reverse('posts:group_list', args=['group'])
+        new_url = reverse('posts:group_list', args=['renamed'])
+        self.assertEqual(Client().get(old_url).status_code, 200)
+        self.assertEqual(Client().get(new_url).status_code, 404)
+        response = self.admin_client.post(
+            reverse('admin:posts_group_change', args=[self.group.pk]),
+            {'title': 'Группа', 'slug': 'renamed', 'description': ''},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Client().get(old_url).status_code, 404)
+        self.assertEqual(Client().get(new_url).status_code, 200)
+
+    def test_cached_author_is_a_fresh_copy(self):
+        """Связи, загруженные на объекте из кэша, не переживают запрос:
+        профиль видит новое число постов.
+        """
+        author = User.objects.create_user(username='Author')
+        url = reverse('posts:profile', args=['Author'])
+        for count in (1, 2):
+            Post.objects.create(text='Текст', author=author)
+            response = self.admin_client.get(url)
+            self.assertEqual(response.context['page_obj'].paginator.count,
+                             count)
+
+    def test_username_change_and_counters(self):
+        """Переименование автора сбрасывает кэш; /metrics видит
+        обращения к кэшу.
+        """
+        author = User.objects.create_user(username='Author')
+        url = reverse('posts:profile', args=['Author'])
+        self.assertEqual(Client().get(url).status_code, 200)
+        author.username = 'Writer'
+        author.save()
+        self.assertIsNone(lookups.author('Author'))
+        self.assertEqual(lookups.author('Writer').pk, author.pk)
+        text = self.admin_client.get(reverse('core:metrics')).content
+        self.assertIn(
+            'lookup_cache_requests_total{kind="author",outcome="miss"}',
+            text.decode(),
+        )
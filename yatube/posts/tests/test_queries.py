@@ -0,0 +1,90 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .. import counters, lookups, stats
+from ..models import Group, Post, User
+
+
+class PostQueryBudgetTests(TestCase):
+    """Число SQL-запросов страниц не зависит от числа постов на них."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.POSTS_COUNT = 15
+        cls.author = User.objects.create_user(
+            username='Author', first_name='Имя', last_name='Фамилия'
+        )
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test-group',
+            description='Test description',
+        )
+        cls.others = [
+            User.objects.create_user(username=f'Other{i}')
+            for i in range(cls.POSTS_COUNT)
+        ]
+        cls.groups = [
+            Group.objects.create(title=f'Group {i}', slug=f'group-{i}')
+            for i in range(cls.POSTS_COUNT)
+        ]
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=other, group=group)
+            for i, (other, group) in enumerate(zip(cls.others, cls.groups))
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Текст автора {i}', author=cls.author, group=cls.group)
+            for i in range(cls.POSTS_COUNT)
+        )
+        cls.post = Post.objects.filter(author=cls.author).first()
+        counters.recount()
+        stats.find_inconsistent(fix=True)
+        # Сессия и пользователь для авторизованного клиента.
+        cls.AUTH_QUERIES = 2
+        # Первый запрос каждой страницы — проверка ETag/Last-Modified.
+        cls.guest_budgets = {
+            reverse('posts:index'): 3,
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}): 4,
+            reverse('posts:profile', kwargs={'username': cls.author}): 3,
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}): 2,
+        }
+        cls.author_budgets = {
+            reverse('posts:post_create'): 1,
+            reverse('posts:post_edit', kwargs={'post_id': cls.post.id}): 2,
+        }
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        lookups.local.clear()
+        # Группы и авторы по slug и имени читаются из кэша поиска.
+        lookups.group(self.group.slug)
+        lookups.author(self.author.username)
+
+    def assertMaxQueries(self, client, url, budget):
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        self.assertLessEqual(
+            len(queries), budget,
+            '\n'.join(query['sql'] for query in queries.captured_queries)
+        )
+
+    def test_guest_pages_query_budget(self):
+        """Страницы для гостя укладываются в бюджет запросов."""
+        for url, budget in self.guest_budgets.items():
+            with self.subTest(url=url):
+                self.assertMaxQueries(self.guest_client, url, budget)
+
+    def test_author_pages_query_budget(self):
+        """Страницы для автора укладываются в бюджет запросов."""
+        budgets = {
+            **{url: budget + self.AUTH_QUERIES
+               for url, budget in self.guest_budgets.items()},
+            **{url: budget + self.AUTH_QUERIES
+               for url, budget in self.author_budgets.items()},
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                self.assertMaxQueries(self.author_client, url, budget)
@@ -0,0 +1,76 @@
+import re
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .. import lookups
+from ..models import Group, Post, User
+
+
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?posts_post\b(?! USING)')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class PostQueryPlanTests(TestCase):
+    """Запросы лент к posts_post идут по индексам, без полного
+    просмотра таблицы и без сортировки во временном B-дереве.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(title='Test', slug='test')
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=cls.author, group=cls.group)
+            for i in range(25)
+        )
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+        self.guest_client = Client()
+
+    def feed_urls(self):
+        feeds = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+        ]
+        urls = [
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+        for feed in feeds:
+            page = self.guest_client.get(feed).context['page_obj']
+            urls += [
+                feed,
+                f'{feed}?page=2',
+                f'{feed}?after={page.next_cursor}',
+            ]
+        return urls
+
+    def posts_query_plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(url)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if 'posts_post' not in query['sql']:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans[query['sql']] = [row[-1] for row in cursor.fetchall()]
+        return plans
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы каждой ленты используют индексы."""
+        for url in self.feed_urls():
+            for sql, plan in self.posts_query_plans(url).items():
+                with self.subTest(url=url, sql=sql):
+                    details = '\n'.join(plan)
+                    self.assertIsNone(FULL_SCAN.search(details), details)
+                    self.assertNotIn(TEMP_SORT, details)
@@ -0,0 +1,137 @@
+from io import StringIO
+
+from django.core.exceptions import FieldError
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .. import search
+from ..models import Group, Post, User
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(
+            text='Лиса прыгает через забор', author=cls.author
+        )
+
+    def found(self, query):
+        return list(search.filter_posts(Post.objects.all(), query))
+
+    def test_index_follows_save_and_delete(self):
+        """Индекс обновляется при создании, изменении и удалении поста."""
+        self.assertEqual(self.found('лиса'), [self.post])
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Волк прыгает через забор'
+        post.save()
+        self.assertEqual(self.found('лиса'), [])
+        self.assertEqual(self.found('волк'), [post])
+        post.delete()
+        self.assertEqual(self.found('волк'), [])
+
+    def test_index_follows_bulk_create(self):
+        """Посты, созданные bulk_create, тоже попадают в индекс."""
+        Post.objects.bulk_create(
+            Post(text=f'Енот номер {i}', author=self.author)
+            for i in range(3)
+        )
+        self.assertEqual(len(self.found('енот')), 3)
+
+    def test_query_operators_are_escaped(self):
+        """Операторы FTS5 в запросе ищутся как обычные слова."""
+        self.assertEqual(self.found('лиса "забор*'), [self.post])
+        # NOT — не исключение слова, а слово, которого в посте нет.
+        self.assertEqual(self.found('лиса NOT забор'), [])
+        self.assertEqual(self.found('***'), [])
+
+    def test_match_lookup_is_not_global(self):
+        """Условие MATCH есть только у столбца индекса, а не у первичных
+        ключей всех моделей.
+        """
+        for model in (User, Group, Post):
+            for lookup in ('pk__fts', 'pk__matches'):
+                with self.assertRaises(FieldError):
+                    model.objects.filter(**{lookup: '"лиса"'})
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс, очищенный вручную."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) "
+                f"VALUES ('delete-all')"
+            )
+        self.assertEqual(self.found('лиса'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.found('лиса'), [self.post])
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.best = Post.objects.create(
+            text='кот кот кот', author=cls.author
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'кот и длинный текст номер {i} о чём-то другом',
+                author=cls.author,
+            )
+            for i in range(12)
+        ]
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_results_are_ranked(self):
+        """Самый релевантный пост идёт первым."""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'кот'}
+        )
+        self.assertTemplateUsed(response, 'posts/search.html')
+        page = response.context['page']
+        self.assertEqual(page.object_list[0], self.best)
+        self.assertEqual(len(page.object_list), 10)
+
+    def test_cursor_pagination(self):
+        """Страницы по курсору не пересекаются и покрывают все посты."""
+        url = reverse('posts:search')
+        first = self.guest_client.get(url, {'q': 'кот'}).context['page']
+        self.assertIsNotNone(first.next_cursor)
+        second = self.guest_client.get(
+            url, {'q': 'кот', 'after': first.next_cursor}
+        ).context['page']
+        self.assertEqual(second.number, 2)
+        self.assertIsNone(second.next_cursor)
+        found = first.object_list + second.object_list
+        self.assertEqual(set(found), {self.best, *self.posts})
+        self.assertEqual(len(found), 13)
+
+    def test_empty_query(self):
+        """Пустой запрос не обращается к индексу."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(reverse('posts:search'))
+        self.assertEqual(response.context['page'].object_list, [])
+        self.assertFalse(
+            any(search.FTS_TABLE in query['sql'] for query in queries)
+        )
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через индекс, а не через LIKE."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.guest_client.force_login(admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'кот кот'}
+            )
+        self.assertEqual(response.context['cl'].result_count, 13)
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertIn(search.FTS_TABLE, sql)
+        self.assertNotIn('LIKE', sql)
@@ -0,0 +1,397 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import counters, lookups, sharding
+from posts.models import (AuthorStats, Group, Post, PostCounter, PostRedirect,
+                          TimelineEntry, User)
+
+
+SHARDS = ['shard0', 'shard1']
+ALL_SHARDS = ['shard0', 'shard1', 'shard2']
+
+
+@override_settings(POST_SHARDS=SHARDS)
+class ShardingTests(TransactionTestCase):
+    """Основная база — тестовая база в памяти, шарды — отдельные
+    файлы SQLite со своей схемой.
+    """
+
+    databases = {'default', *ALL_SHARDS}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        for alias in ALL_SHARDS:
+            connections.databases[alias] = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(cls.directory, f'{alias}.sqlite3'),
+            }
+            connections.ensure_defaults(alias)
+            connections.prepare_test_settings(alias)
+        super().setUpClass()
+        for alias in ALL_SHARDS:
+            call_command('migrate', database=alias, verbosity=0)
+            # Миграции включают проверку внешних ключей обратно.
+            connections[alias].close()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in ALL_SHARDS:
+            connections[alias].close()
+            del connections[alias]
+            connections.databases.pop(alias)
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.authors = {}
+        number = 0
+        while len(self.authors) < len(SHARDS):
+            user = User.objects.create_user(username=f'author{number}')
+            self.authors.setdefault(sharding.shard_for_author(user.pk), user)
+            number += 1
+
+    def create_posts(self, count):
+        authors = list(self.authors.values())
+        return [
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=authors[number % len(authors)],
+                group=self.group if number % 3 else None,
+            )
+            for number in range(count)
+        ]
+
+    def walk(self, url):
+        """Тексты постов всех страниц ленты, пройденных по курсору."""
+        texts = []
+        cursor = None
+        while True:
+            response = Client().get(url, {'after': cursor} if cursor else {})
+            page = response.context['page_obj']
+            texts += [post.text for post in page]
+            cursor = page.next_cursor
+            if cursor is None:
+                return texts, page.paginator.count
+
+    def test_posts_are_placed_on_author_shard(self):
+        """Пост сохраняется на шарде автора, а его id — в корзине автора.
+        """
+        for alias, author in self.authors.items():
+            post = Post.objects.create(text='Текст', author=author)
+            with self.subTest(shard=alias):
+                self.assertEqual(
+                    sharding.bucket_for_post(post.pk),
+                    sharding.bucket_for_author(author.pk),
+                )
+                self.assertEqual(sharding.shard_for_post(post.pk), alias)
+                self.assertTrue(
+                    Post.objects.using(alias).filter(pk=post.pk).exists()
+                )
+        self.assertEqual(Post.objects.using('default').count(), 0)
+        self.assertEqual(
+            sum(Post.objects.using(alias).count() for alias in SHARDS), 2
+        )
+
+    def test_feeds_merge_shards_in_order(self):
+        """Общая лента и лента группы сливают шарды по (pub_date, id)."""
+        posts = self.create_posts(25)
+        posts.sort(key=lambda post: (post.pub_date, post.pk), reverse=True)
+        in_group = [post for post in posts if post.group_id]
+        cases = [
+            (reverse('posts:index'), posts),
+            (reverse('posts:group_list', args=['group']), in_group),
+        ]
+        for url, expected in cases:
+            with self.subTest(url=url):
+                texts, count = self.walk(url)
+                self.assertEqual(texts, [post.text for post in expected])
+                self.assertEqual(count, len(expected))
+        response = Client().get(reverse('posts:index'), {'page': 2})
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            [post.text for post in posts[10:20]],
+        )
+
+    def test_author_pages_read_only_owning_shard(self):
+        """Профиль и страница поста читают только шард автора."""
+        self.create_posts(4)
+        for alias, author in self.authors.items():
+            post = Post.objects.using(alias).filter(author=author).first()
+            (other,) = set(SHARDS) - {alias}
+            urls = [
+                reverse('posts:profile', args=[author.username]),
+                reverse('posts:post_detail', args=[post.pk]),
+            ]
+            for url in urls:
+                with self.subTest(url=url):
+                    cache.clear()
+                    with CaptureQueriesContext(connections[other]) as foreign:
+                        with CaptureQueriesContext(
+                                connections[alias]) as owning:
+                            response = Client().get(url)
+                    self.assertContains(response, post.text)
+                    self.assertEqual(len(foreign), 0)
+                    self.assertGreater(len(owning), 0)
+
+    def test_create_and_edit_through_views(self):
+        """Пост, созданный и изменённый через формы, остаётся на шарде
+        автора и виден в ленте.
+        """
+        alias, author = next(iter(self.authors.items()))
+        client = Client()
+        client.force_login(author)
+        client.post(reverse('posts:post_create'), {'text': 'Новый пост'})
+        post = Post.objects.using(alias).get(text='Новый пост')
+        client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': 'Изменённый пост', 'group': self.group.pk},
+        )
+        post = Post.objects.using(alias).get(pk=post.pk)
+        self.assertEqual(post.text, 'Изменённый пост')
+        self.assertEqual(post.group_id, self.group.pk)
+        self.assertContains(
+            Client().get(reverse('posts:group_list', args=['group'])),
+            'Изменённый пост',
+        )
+
+    def test_deleting_author_and_group_reaches_shards(self):
+        """Удаление автора убирает его посты с шарда вместе со
+        счётчиками, удаление группы обнуляет group_id на шардах.
+        """
+        self.create_posts(4)
+        self.assertEqual(Client().get(reverse('posts:index')).status_code,
+                         200)
+        alias, author = next(iter(self.authors.items()))
+        author.delete()
+        self.assertFalse(
+            Post.objects.using(alias).filter(author_id=author.pk).exists()
+        )
+        texts, count = self.walk(reverse('posts:index'))
+        self.assertEqual(len(texts), 2)
+        self.assertEqual(count, 2)
+        self.group.delete()
+        for alias in SHARDS:
+            with self.subTest(shard=alias):
+                self.assertFalse(
+                    Post.objects.using(alias).filter(
+                        group_id__isnull=False
+                    ).exists()
+                )
+
+    def test_search_reads_every_shard(self):
+        """Поиск сливает результаты индексов всех шардов."""
+        self.create_posts(6)
+        response = Client().get(reverse('posts:search'), {'q': 'пост'})
+        self.assertEqual(len(response.context['page'].object_list), 6)
+        self.assertEqual(
+            {post.author_id for post in response.context['page'].object_list},
+            {author.pk for author in self.authors.values()},
+        )
+
+    def test_default_db_features_work_with_shards(self):
+        """API, выгрузка, админка постов и пересчёт счётчиков читают
+        посты с шардов.
+        """
+        posts = self.create_posts(4)
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(reverse('api:feed'))
+        self.assertEqual(
+            [row['id'] for row in json.loads(
+                b''.join(response.streaming_content)
+            )['results']],
+            [post.pk for post in sorted(
+                posts, key=lambda post: (post.pub_date, post.pk),
+                reverse=True,
+            )],
+        )
+        response = client.get(
+            reverse('api:post_detail', args=[posts[1].pk])
+        )
+        self.assertEqual(response.json()['author'], posts[1].author.username)
+        response = client.get(reverse('posts:export'), {'format': 'ndjson'})
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [row['id'] for row in rows], [post.pk for post in posts]
+        )
+        self.assertEqual(rows[1]['group'], 'group')
+        for alias in SHARDS:
+            with self.subTest(shard=alias):
+                response = client.get(
+                    reverse('admin:posts_post_changelist'), {'shard': alias}
+                )
+                self.assertEqual(
+                    {post.pk for post in response.context['cl'].result_list},
+                    set(Post.objects.using(alias).values_list(
+                        'pk', flat=True
+                    )),
+                )
+        response = client.post(
+            reverse('admin:posts_post_change', args=[posts[1].pk]),
+            {'text': 'Изменён', 'group': self.group.pk},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            sharding.posts(post_id=posts[1].pk).get(pk=posts[1].pk).text,
+            'Изменён',
+        )
+        PostCounter.objects.all().delete()
+        AuthorStats.objects.all().delete()
+        call_command('recount_posts', stdout=StringIO())
+        call_command('check_author_stats', fix=True, stdout=StringIO())
+        self.assertEqual(
+            PostCounter.objects.get(key=counters.GLOBAL_KEY).value, 4
+        )
+        self.assertEqual(
+            PostCounter.objects.get(
+                key=counters.group_key(self.group.pk)
+            ).value,
+            2,
+        )
+        for author in self.authors.values():
+            self.assertEqual(
+                AuthorStats.objects.get(author=author).post_count, 2
+            )
+
+    def test_bulk_inserts_go_to_author_shards(self):
+        """Импорт и генерация набора данных вставляют посты на шарды
+        их авторов с id из общей последовательности.
+        """
+        path = os.path.join(self.directory, 'posts.ndjson')
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.writelines(
+                json.dumps({
+                    'text': f'Импорт {number}',
+                    'pub_date': f'2020-01-01T00:00:{number:02}',
+                    'author': f'imported{number % 4}',
+                }) + '\n'
+                for number in range(12)
+            )
+        call_command('import_posts', path, stdout=StringIO())
+        call_command(
+            'generate_dataset', users=5, groups=2, posts=30,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.using('default').count(), 0)
+        ids = []
+        for alias in SHARDS:
+            for post in Post.objects.using(alias).all():
+                self.assertEqual(sharding.shard_for_post(post.pk), alias)
+                self.assertEqual(
+                    sharding.bucket_for_post(post.pk),
+                    sharding.bucket_for_author(post.author_id),
+                )
+                ids.append(post.pk)
+        self.assertEqual(len(set(ids)), 42)
+        self.assertEqual(
+            PostCounter.objects.get(key=counters.GLOBAL_KEY).value, 42
+        )
+
+    def test_shard_posts_moves_default_posts(self):
+        """shard_posts переносит посты основной базы на шарды под
+        новыми id; старые адреса перенаправляются, ленты и новые id
+        не пересекаются со старыми.
+        """
+        reader = User.objects.create_user(username='reader')
+        with override_settings(POST_SHARDS=[]):
+            legacy = self.create_posts(4)
+            for post in legacy:
+                TimelineEntry.objects.create(
+                    user=reader, post_id=post.pk, author=post.author,
+                    pub_date=post.pub_date,
+                )
+        call_command('shard_posts', batch_size=3, stdout=StringIO())
+        self.assertEqual(Post.objects.using('default').count(), 0)
+        redirects = dict(
+            PostRedirect.objects.values_list('old_id', 'new_id')
+        )
+        self.assertEqual(set(redirects), {post.pk for post in legacy})
+        for post in legacy:
+            new_id = redirects[post.pk]
+            moved = sharding.posts(post_id=new_id).get(pk=new_id)
+            self.assertEqual(
+                (moved.text, moved.author_id, moved.pub_date),
+                (post.text, post.author_id, post.pub_date),
+            )
+            self.assertRedirects(
+                Client().get(reverse('posts:post_detail', args=[post.pk])),
+                reverse('posts:post_detail', args=[new_id]),
+                status_code=301,
+            )
+            self.assertRedirects(
+                Client().get(
+                    reverse('api:post_detail', args=[post.pk]),
+                    {'fields': 'text'},
+                ),
+                reverse('api:post_detail', args=[new_id]) + '?fields=text',
+                status_code=301,
+            )
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('post_id', flat=True)),
+            set(redirects.values()),
+        )
+        fresh = self.create_posts(1)[0]
+        self.assertGreater(fresh.pk, max(redirects.values()))
+        output = StringIO()
+        call_command('shard_posts', stdout=output)
+        self.assertIn('Перенесено постов: 0.', output.getvalue())
+
+    def test_rebalance_to_new_shard(self):
+        """Копирование корзин и очистка переносят посты на новый список
+        шардов без потерь и дублей.
+        """
+        for number in range(3):
+            User.objects.create_user(username=f'extra{number}')
+        authors = list(User.objects.all())
+        for number in range(30):
+            Post.objects.create(
+                text=f'Пост {number}', author=authors[number % len(authors)]
+            )
+        expected = sorted(
+            post.pk
+            for alias in SHARDS
+            for post in Post.objects.using(alias).all()
+        )
+        call_command(
+            'rebalance_shards', to=','.join(ALL_SHARDS), stdout=StringIO()
+        )
+        with override_settings(POST_SHARDS=ALL_SHARDS):
+            call_command('rebalance_shards', cleanup=True, stdout=StringIO())
+            placed = []
+            for alias in ALL_SHARDS:
+                ids = Post.objects.using(alias).values_list('pk', flat=True)
+                for pk in ids:
+                    self.assertEqual(sharding.shard_for_post(pk), alias)
+                placed += ids
+            self.assertEqual(sorted(placed), expected)
+            cache.clear()
+            texts, count = self.walk(reverse('posts:index'))
+            self.assertEqual(len(set(texts)), 30)
+            self.assertEqual(count, 30)
+            for pk in expected:
+                self.assertEqual(
+                    Client().get(
+                        reverse('posts:post_detail', args=[pk])
+                    ).status_code,
+                    200,
+                )
@@ -0,0 +1,101 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import Client, TestCase
+from django.urls import reverse
+from .. import stats
+from ..models import AuthorStats, Post, User
+
+
+class AuthorStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.first = Post.objects.create(text='Первый', author=cls.author)
+        cls.second = Post.objects.create(text='Второй', author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        stats.find_inconsistent(fix=True)
+
+    def get_stats(self):
+        return AuthorStats.objects.get(author=self.author)
+
+    def test_create_and_delete_update_stats(self):
+        """Создание и удаление поста обновляют статистику автора."""
+        post = Post.objects.create(text='Третий', author=self.author)
+        self.assertEqual(self.get_stats().post_count, 3)
+        self.assertEqual(self.get_stats().last_post_date, post.pub_date)
+        post.delete()
+        self.assertEqual(self.get_stats().post_count, 2)
+        self.assertEqual(
+            self.get_stats().last_post_date, self.second.pub_date
+        )
+
+    def test_post_and_stats_share_transaction(self):
+        """Сбой обновления статистики откатывает и сам пост."""
+        failure = mock.patch.object(
+            stats, 'post_created', side_effect=DatabaseError
+        )
+        with failure, self.assertRaises(DatabaseError):
+            Post.objects.create(text='Третий', author=self.author)
+        self.assertFalse(Post.objects.filter(text='Третий').exists())
+        failure = mock.patch.object(
+            stats, 'post_deleted', side_effect=DatabaseError
+        )
+        with failure, self.assertRaises(DatabaseError):
+            Post.objects.get(pk=self.first.pk).delete()
+        self.assertTrue(Post.objects.filter(pk=self.first.pk).exists())
+        self.assertEqual(stats.find_inconsistent(), [])
+
+    def test_post_detail_loads_stats_with_post(self):
+        """Пост и статистика автора загружаются одним запросом."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.first.id})
+        # Первый запрос — проверка ETag/Last-Modified.
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(url)
+        self.assertEqual(response.context['author_stats'].post_count, 2)
+
+    def test_profile_count_from_stats(self):
+        """Профиль показывает число постов из статистики автора."""
+        AuthorStats.objects.filter(author=self.author).update(post_count=42)
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': self.author})
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 42)
+
+    def test_missing_stats_computed_on_read(self):
+        """Отсутствующая статистика считается при первом чтении."""
+        AuthorStats.objects.all().delete()
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.first.id})
+        )
+        self.assertEqual(response.context['author_stats'].post_count, 2)
+        self.assertEqual(self.get_stats().post_count, 2)
+
+    def test_check_command_finds_and_fixes_drift(self):
+        """check_author_stats находит и исправляет расхождения."""
+        AuthorStats.objects.filter(author=self.author).update(post_count=7)
+        out = StringIO()
+        call_command('check_author_stats', stdout=out, stderr=StringIO())
+        self.assertIn(f'Автор {self.author.id}', out.getvalue())
+        self.assertEqual(self.get_stats().post_count, 7)
+        call_command('check_author_stats', '--fix', stdout=StringIO())
+        self.assertEqual(self.get_stats().post_count, 2)
+        self.assertEqual(stats.find_inconsistent(), [])
+
+    def test_authors_without_posts_need_no_stats(self):
+        """Пользователь без постов и без записи статистики не считается
+        расхождением, и --fix не создаёт ему запись.
+        """
+        reader = User.objects.create_user(username='Reader')
+        self.assertEqual(stats.find_inconsistent(), [])
+        call_command('check_author_stats', '--fix', stdout=StringIO())
+        self.assertFalse(AuthorStats.objects.filter(author=reader).exists())
+        AuthorStats.objects.filter(author=self.author).delete()
+        problems = stats.find_inconsistent()
+        self.assertEqual(len(problems), 1)
+        self.assertEqual(problems[0][:2], (self.author.pk, None))
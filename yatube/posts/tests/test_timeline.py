@@ -0,0 +1,189 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import lookups, timeline
+from ..models import (AuthorStats, FanoutTask, Follow, Post, TimelineEntry,
+                      User)
+
+
+class FollowViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_follow_and_unfollow(self):
+        """Подписка и отписка меняют Follow и число подписчиков."""
+        Post.objects.create(text='Старый пост', author=self.author)
+        self.client.get(reverse('posts:profile', args=['Author']))
+        self.client.post(reverse('posts:profile_follow', args=['Author']))
+        self.client.post(reverse('posts:profile_follow', args=['Author']))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).follower_count, 1
+        )
+        response = self.client.get(
+            reverse('posts:profile', args=['Author'])
+        )
+        self.assertTrue(response.context['following'])
+        self.assertContains(
+            self.client.get(reverse('posts:follow_index')), 'Старый пост'
+        )
+        self.client.post(reverse('posts:profile_unfollow', args=['Author']))
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).follower_count, 0
+        )
+
+    def test_cannot_follow_self(self):
+        self.client.post(reverse('posts:profile_follow', args=['Reader']))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_requires_post_with_csrf(self):
+        """GET и POST без CSRF-токена не меняют подписки."""
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=['Author']))
+                self.assertEqual(response.status_code, 405)
+        csrf_client = Client(enforce_csrf_checks=True)
+        csrf_client.force_login(self.reader)
+        response = csrf_client.post(
+            reverse('posts:profile_follow', args=['Author'])
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_guest_is_redirected(self):
+        url = reverse('posts:follow_index')
+        self.assertRedirects(Client().get(url), f'/auth/login/?next={url}')
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.stranger = User.objects.create_user(username='Stranger')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def texts(self, page):
+        return [post.text for post in page.object_list]
+
+    def test_new_posts_are_delivered_off_request(self):
+        """Новый пост попадает в ленты подписчиков после разбора
+        очереди, посты чужих авторов — нет.
+        """
+        Post.objects.create(text='Пост автора', author=self.author)
+        Post.objects.create(text='Чужой пост', author=self.stranger)
+        self.assertEqual(FanoutTask.objects.count(), 2)
+        self.assertEqual(timeline.page(self.reader).object_list, [])
+        self.assertEqual(timeline.process(), (2, 1))
+        self.assertFalse(FanoutTask.objects.exists())
+        self.assertEqual(
+            self.texts(timeline.page(self.reader)), ['Пост автора']
+        )
+
+    def test_fan_out_in_batches(self):
+        """Подписчики получают пост пачками по batch_size."""
+        for number in range(5):
+            follower = User.objects.create_user(username=f'follower{number}')
+            Follow.objects.create(user=follower, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            delivered = timeline.deliver(
+                post.pk, self.author.pk, post.pub_date, batch_size=2
+            )
+        inserts = [query for query in queries
+                   if query['sql'].startswith('INSERT')]
+        self.assertEqual(delivered, 6)
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(
+            TimelineEntry.objects.filter(post_id=post.pk).count(), 6
+        )
+
+    def test_cursor_pagination(self):
+        """Страницы по курсору идут по (pub_date, id) без пропусков."""
+        posts = [
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+            for number in range(23)
+        ]
+        timeline.process()
+        texts = []
+        cursor = None
+        while True:
+            page = timeline.page(self.reader, after=cursor)
+            texts += self.texts(page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(page.number, 3)
+        posts.sort(key=lambda post: (post.pub_date, post.pk), reverse=True)
+        self.assertEqual(texts, [post.text for post in posts])
+
+    def test_deleted_post_leaves_timeline(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        timeline.process()
+        post.delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_author_below_limit_is_refilled(self):
+        """Посты, опубликованные, пока у автора было много подписчиков,
+        не пропадают из лент, когда подписчиков становится меньше.
+        """
+        popular = User.objects.create_user(username='Popular')
+        Follow.objects.create(user=self.reader, author=popular)
+        Follow.objects.create(user=self.stranger, author=popular)
+        Post.objects.create(text='Пост популярного', author=popular)
+        timeline.process()
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=popular).exists()
+        )
+        Follow.objects.get(user=self.stranger, author=popular).delete()
+        timeline.process()
+        self.assertEqual(
+            self.texts(timeline.page(self.reader)), ['Пост популярного']
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, author=popular
+        ).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_popular_authors_are_read_on_open(self):
+        """Посты авторов с множеством подписчиков не раскладываются,
+        а сливаются с готовой лентой при чтении.
+        """
+        popular = User.objects.create_user(username='Popular')
+        Follow.objects.create(user=self.reader, author=popular)
+        Follow.objects.create(user=self.stranger, author=popular)
+        posts = []
+        for number in range(12):
+            author = popular if number % 2 else self.author
+            posts.append(Post.objects.create(
+                text=f'Пост {number}', author=author
+            ))
+        timeline.process()
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=popular).exists()
+        )
+        first = timeline.page(self.reader, per_page=5)
+        second = timeline.page(
+            self.reader, after=first.next_cursor, per_page=5
+        )
+        posts.sort(key=lambda post: (post.pub_date, post.pk), reverse=True)
+        self.assertEqual(
+            self.texts(first) + self.texts(second),
+            [post.text for post in posts[:10]],
+        )
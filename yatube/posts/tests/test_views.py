@@ -1,7 +1,10 @@
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 from django import forms
+from .. import lookups
 from ..models import Group, Post, User
+from ..paginators import encode_cursor
 
 
 class PostPagesTests(TestCase):
@@ -176,3 +179,137 @@ class PaginatorViewsTest(TestCase):
                         response.context['page_obj']
                                 .paginator.page(i + 1)
                                 .object_list.count(), num)
+
+    def test_cursor_pages_contain_correct_records(self):
+        """Переход по курсорам ?after= и ?before= возвращает
+        те же посты, что и постраничная навигация.
+        """
+        first_page = self.authorized_client_author.get(reverse('posts:index'))
+        first = first_page.context['page_obj']
+        second = self.authorized_client_author.get(
+            reverse('posts:index') + f'?after={first.next_cursor}'
+        ).context['page_obj']
+        self.assertEqual(second.number, 2)
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        self.assertEqual(
+            [post.id for post in second],
+            [post.id for post in first.paginator.page(2)]
+        )
+        back = self.authorized_client_author.get(
+            reverse('posts:index') + f'?before={second.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(
+            [post.id for post in back], [post.id for post in first]
+        )
+
+    def test_cursor_past_the_end_returns_last_page(self):
+        """Курсор самого старого поста открывает последнюю страницу,
+        а не пустую.
+        """
+        oldest = Post.objects.order_by('pub_date', 'pk').first()
+        response = self.guest_client.get(
+            reverse('posts:index') + f'?after={encode_cursor(oldest, 2)}'
+        )
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), 3)
+        self.assertEqual(page[-1].pk, oldest.pk)
+        self.assertFalse(page.has_next())
+        self.assertIsNotNone(page.previous_cursor)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Некорректный токен курсора открывает первую страницу."""
+        response = self.authorized_client_author.get(
+            reverse('posts:index') + '?after=broken'
+        )
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(title='Test', slug='test')
+        cls.post = Post.objects.create(
+            text='Текст', author=cls.author, group=cls.group
+        )
+        cls.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.author}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+        self.guest_client = Client()
+
+    def test_unchanged_page_returns_304_with_one_query(self):
+        """Неизменившаяся страница отвечает 304 за один SQL-запрос."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(1):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_edited_post_changes_validators(self):
+        """Правка поста меняет ETag всех страниц, где он виден."""
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_renamed_author_changes_group_validators(self):
+        """Имя автора видно в ленте группы: его смена меняет её ETag."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        etag = self.guest_client.get(url)['ETag']
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Переименованный'
+        author.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Переименованный')
+
+    def test_renamed_group_changes_profile_validators(self):
+        """Slug группы виден в профиле автора её постов."""
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        etag = self.guest_client.get(url)['ETag']
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(
+            response, reverse('posts:group_list', args=['renamed'])
+        )
+
+    def test_validators_depend_on_user(self):
+        """Гость и авторизованный пользователь получают разные ETag."""
+        author_client = Client()
+        author_client.force_login(self.author)
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_missing_page_is_not_found(self):
+        """Проверка состояния не мешает ответу 404."""
+        urls = [
+            reverse('posts:group_list', kwargs={'slug': 'missing'}),
+            reverse('posts:profile', kwargs={'username': 'missing'}),
+            reverse('posts:post_detail', kwargs={'post_id': 10_000}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.guest_client.get(url).status_code, 404)
@@ -0,0 +1,176 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Q
+
+from . import sharding, stats
+from .models import FanoutTask, Follow, TimelineEntry
+from .paginators import LIMIT, decode_cursor, encode_position
+
+
+# Лента подписок хранится готовой: новый пост попадает в очередь
+# FanoutTask, а команда fanout_timelines вне запроса раскладывает его
+# по TimelineEntry подписчиков. Посты авторов, у которых подписчиков
+# TIMELINE_FANOUT_LIMIT и больше, не раскладываются, а читаются при
+# открытии ленты и сливаются с готовой частью.
+TASKS_PER_RUN = 100
+
+TimelinePage = namedtuple('TimelinePage', 'object_list number next_cursor')
+
+
+def fans_out(author_id):
+    """Раскладываются ли посты автора по лентам при записи."""
+    followers = stats.for_author_id(author_id).follower_count
+    return followers < settings.TIMELINE_FANOUT_LIMIT
+
+
+def enqueue(post):
+    FanoutTask.objects.create(
+        post_id=post.pk, author_id=post.author_id, pub_date=post.pub_date
+    )
+
+
+def _entries(user_ids, author_id, posts):
+    return TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post_id,
+                          author_id=author_id, pub_date=pub_date)
+            for user_id in user_ids
+            for post_id, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def deliver(post_id, author_id, pub_date, batch_size=None):
+    """Добавляет пост в ленты подписчиков автора пачками по batch_size
+    по ключу user_id; возвращает число подписчиков.
+    """
+    batch_size = batch_size or settings.TIMELINE_FANOUT_BATCH
+    followers = Follow.objects.filter(author_id=author_id).order_by(
+        'user_id'
+    ).values_list('user_id', flat=True)
+    delivered = 0
+    last = 0
+    while True:
+        batch = list(followers.filter(user_id__gt=last)[:batch_size])
+        if not batch:
+            return delivered
+        _entries(batch, author_id, [(post_id, pub_date)])
+        delivered += len(batch)
+        last = batch[-1]
+
+
+def process(limit=TASKS_PER_RUN, batch_size=None):
+    """Разбирает до limit постов из очереди; возвращает (число постов,
+    число доставок в ленты). Повторная доставка ничего не меняет,
+    поэтому задача удаляется только после неё.
+    """
+    tasks = list(FanoutTask.objects.order_by('pk')[:limit])
+    delivered = 0
+    for task in tasks:
+        if fans_out(task.author_id):
+            delivered += deliver(
+                task.post_id, task.author_id, task.pub_date, batch_size
+            )
+        FanoutTask.objects.filter(pk=task.pk).delete()
+    return len(tasks), delivered
+
+
+def backfill(user_id, author_id):
+    """Последние посты автора в ленту нового подписчика."""
+    if not fans_out(author_id):
+        return
+    posts = sharding.posts(author_id=author_id).filter(
+        author_id=author_id
+    ).order_by('-pub_date', '-pk').values_list('pk', 'pub_date')
+    _entries([user_id], author_id, posts[:settings.TIMELINE_BACKFILL])
+
+
+def refill(author_id):
+    """Ставит в очередь раскладки последние TIMELINE_BACKFILL постов
+    автора: когда он перестал быть популярным и его посты больше не
+    читаются при открытии ленты, и после импорта его постов.
+    """
+    posts = sharding.posts(author_id=author_id).filter(
+        author_id=author_id
+    ).order_by('-pub_date', '-pk').values_list('pk', 'pub_date')
+    FanoutTask.objects.bulk_create(
+        [
+            FanoutTask(post_id=pk, author_id=author_id, pub_date=pub_date)
+            for pk, pub_date in posts[:settings.TIMELINE_BACKFILL]
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def unfollowed(author_id, followers):
+    """Учитывает отписку; followers — число подписчиков после неё."""
+    if followers == settings.TIMELINE_FANOUT_LIMIT - 1:
+        refill(author_id)
+
+
+def forget(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def _pulled_authors(user):
+    return list(Follow.objects.filter(
+        user=user,
+        author__post_stats__follower_count__gte=(
+            settings.TIMELINE_FANOUT_LIMIT
+        ),
+    ).values_list('author_id', flat=True))
+
+
+def _after(rows, cursor, pk_field):
+    if cursor is None:
+        return rows
+    _, pub_date, pk = cursor
+    return rows.filter(
+        Q(pub_date__lt=pub_date)
+        | Q(pub_date=pub_date, **{f'{pk_field}__lt': pk})
+    )
+
+
+def page(user, after=None, per_page=LIMIT):
+    """Страница ленты подписок по ключу (pub_date, id).
+
+    Готовая часть читается по индексу (user, pub_date, post_id),
+    посты авторов с множеством подписчиков — из их лент; обе части
+    ограничены per_page + 1 строками и сливаются в памяти. Следующая
+    страница запрашивается токеном next_cursor в ?after=.
+    """
+    cursor = decode_cursor(after)
+    number = cursor[0] + 1 if cursor is not None else 1
+    entries = _after(TimelineEntry.objects.filter(user=user), cursor,
+                     'post_id')
+    rows = list(entries.order_by('-pub_date', '-post_id').values_list(
+        'pub_date', 'post_id'
+    )[:per_page + 1])
+    loaded = {}
+    pulled = _pulled_authors(user)
+    if pulled:
+        posts = _after(
+            sharding.posts().for_feed().filter(author_id__in=pulled),
+            cursor, 'pk',
+        ).order_by('-pub_date', '-pk')
+        for post in posts[:per_page + 1]:
+            loaded[post.pk] = post
+            rows.append((post.pub_date, post.pk))
+        # Пост мог попасть в ленту и до того, как у автора стало
+        # много подписчиков.
+        rows = sorted(set(rows), reverse=True)
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    loaded.update(sharding.in_bulk(
+        [pk for _, pk in rows if pk not in loaded]
+    ))
+    next_cursor = None
+    if has_next:
+        pub_date, pk = rows[-1]
+        next_cursor = encode_position(pub_date, pk, number)
+    return TimelinePage(
+        [loaded[pk] for _, pk in rows if pk in loaded], number, next_cursor
+    )
@@ -1,40 +1,49 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.shortcuts import render, redirect, get_object_or_404
-from .models import Post, Group, User
+from django.http import (Http404, HttpResponseBadRequest,
+                         StreamingHttpResponse)
+from django.shortcuts import render, redirect
+from django.views.decorators.http import require_POST
+from . import (cache, counters, export, lookups, search, sharding, stats,
+               timeline)
+from .models import Follow
 from .forms import PostForm
+from .cache import cache_anonymous_page
+from .conditional import (author_state, conditional_page, feed_state,
+                          group_state, post_state)
+from .paginators import get_page
 
 
-LIMIT = 10
-
-
+@conditional_page(feed_state)
+@cache_anonymous_page(lambda: [cache.FEED_SCOPE])
 def index(request):
     """Сохраняем в posts объекты модели Post,
     отсортированные по полю pub_date по убыванию.
     """
-    posts_list = Post.objects.all()
-    # Показывать по 10 записей на странице.
-    paginator = Paginator(posts_list, LIMIT)
-    # Из URL извлекаем номер запрошенной страницы - это значение параметра page
-    page_number = request.GET.get('page')
-    # Получаем набор записей для страницы с запрошенным номером
-    page_obj = paginator.get_page(page_number)
+    posts_list = sharding.posts().for_feed()
+    # Показывать по 10 записей на странице: по курсору ?after=/?before=
+    # или по номеру страницы ?page=
+    page_obj = get_page(request, posts_list, counters.GLOBAL_KEY)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(group_state)
+@cache_anonymous_page(lambda slug: [cache.group_scope(slug)])
 def group_posts(request, slug):
     """View-функция для страницы сообщества.
     Страница с информацией о постах отфильтрованных по группам.
     Принимает параметр slug из path()
     """
-    groups_list = get_object_or_404(Group, slug=slug)
-    posts_list = groups_list.posts.all()
-    paginator = Paginator(posts_list, LIMIT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    groups_list = lookups.group(slug)
+    if groups_list is None:
+        raise Http404('Группа не найдена.')
+    posts_list = sharding.posts().for_feed().filter(group=groups_list)
+    page_obj = get_page(
+        request, posts_list, counters.group_key(groups_list.id)
+    )
     context = {
         'group': groups_list,
         'page_obj': page_obj,
@@ -42,29 +51,70 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(author_state)
+@cache_anonymous_page(lambda username: [cache.author_scope(username)])
 def profile(request, username):
     """View-функция для отображения профиля пользователя.
     Принимает параметр username из path()
     """
-    user = get_object_or_404(User, username=username)
-    posts_list = Post.objects.select_related('author').filter(author=user)
-    paginator = Paginator(posts_list, LIMIT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    user = lookups.author(username)
+    if user is None:
+        raise Http404('Автор не найден.')
+    posts_list = sharding.posts(author_id=user.pk).for_feed().filter(
+        author=user
+    )
+    page_obj = get_page(
+        request, posts_list, count=stats.for_author(user).post_count
+    )
+    following = (
+        request.user.is_authenticated and request.user != user
+        and Follow.objects.filter(user=request.user, author=user).exists()
+    )
     context = {
         'author': user,
         'page_obj': page_obj,
+        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def search_posts(request):
+    """View-функция для поиска по тексту постов.
+    Результаты упорядочены по релевантности, следующая страница
+    открывается по курсору ?after=
+    """
+    query = request.GET.get('q', '').strip()
+    page = search.search_posts(query, after=request.GET.get('after'))
+    context = {
+        'query': query,
+        'page': page,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def _moved(view_name, post_id):
+    """Постоянный редирект со старого id поста, перенесённого
+    на шард командой shard_posts; иначе 404.
+    """
+    new_id = sharding.moved_id(post_id)
+    if new_id is None:
+        raise Http404('Пост не найден.')
+    return redirect(view_name, post_id=new_id, permanent=True)
+
+
+@conditional_page(post_state)
 def post_detail(request, post_id):
     """View-функция для отображения отдельного поста пользователя.
     Принимает порядковый номер поста из path()
     """
-    post = get_object_or_404(Post, id=post_id)
+    post = sharding.posts(post_id=post_id).for_detail().filter(
+        id=post_id
+    ).first()
+    if post is None:
+        return _moved('posts:post_detail', post_id)
     context = {
         'post': post,
+        'author_stats': stats.for_author(post.author),
     }
     return render(request, 'posts/post_detail.html', context)
 
@@ -86,8 +136,10 @@ def post_edit(request, post_id):
     """View-функция для редактирования отдельного поста пользователя.
     Принимает порядковый номер поста из path()
     """
-    post = get_object_or_404(Post, id=post_id)
-    if post.author != request.user:
+    post = sharding.posts(post_id=post_id).filter(id=post_id).first()
+    if post is None:
+        return _moved('posts:post_edit', post_id)
+    if post.author_id != request.user.id:
         return redirect("posts:post_detail", post_id=post_id)
     form = PostForm(request.POST or None, instance=post)
     if form.is_valid():
@@ -99,3 +151,64 @@ def post_edit(request, post_id):
         'is_edit': True,
     }
     return render(request, 'posts/create_post.html', context)
+
+
+@login_required
+def follow_index(request):
+    """View-функция для ленты постов авторов, на которых подписан
+    пользователь. Следующая страница открывается по курсору ?after=
+    """
+    page = timeline.page(request.user, after=request.GET.get('after'))
+    return render(request, 'posts/follow.html', {'page': page})
+
+
+@login_required
+@require_POST
+def profile_follow(request, username):
+    """View-функция для подписки на автора. Только POST с CSRF-токеном:
+    подписку не должны оформлять ссылки и их предзагрузка.
+    """
+    author = lookups.author(username)
+    if author is None:
+        raise Http404('Автор не найден.')
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    """View-функция для отписки от автора. Только POST, как подписка."""
+    Follow.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
+    return redirect('posts:profile', username=username)
+
+
+@staff_member_required
+def export_posts(request):
+    """View-функция для выгрузки всех постов в CSV или NDJSON.
+    Ответ отдаётся потоком по мере чтения базы порциями.
+    Принимает параметры format, since и since_id.
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in export.FORMATS:
+        return HttpResponseBadRequest('Формат: csv или ndjson.')
+    since = since_id = None
+    try:
+        if request.GET.get('since'):
+            since = export.parse_since(request.GET['since'])
+            if request.GET.get('since_id'):
+                since_id = int(request.GET['since_id'])
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    rows = export.export_rows(since, since_id)
+    response = StreamingHttpResponse(
+        export.render(rows, export_format),
+        content_type=export.CONTENT_TYPES[export_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="posts.{export_format}"'
+    )
+    return response
@@ -22,9 +22,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryOriginMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -32,6 +37,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -39,7 +45,8 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, время отрисовки которого видно в core.timing.
+        'BACKEND': 'core.timing.TimedTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -64,6 +71,183 @@ DATABASES = {
     }
 }
 
+# Реплика для чтения лент и страниц постов (core.routers). Включается
+# описанием базы REPLICA_ALIAS, например:
+#
+# DATABASES[REPLICA_ALIAS] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+#     'TEST': {'MIRROR': 'default'},
+# }
+#
+# Для SQLite репликацию заменяет python manage.py sync_replica.
+
+DATABASE_ROUTERS = [
+    'posts.routers.PostShardRouter',
+    'core.routers.PrimaryReplicaRouter',
+]
+REPLICA_ALIAS = 'replica'
+REPLICA_VIEWS = [
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:search',
+    'api:feed',
+    'api:group_feed',
+    'api:author_feed',
+    'api:post_detail',
+]
+# Сколько секунд после записи клиент читает основную базу.
+REPLICA_STICKY_SECONDS = 5
+REPLICA_STICKY_COOKIE = 'primary_until'
+
+# Шарды постов (posts.sharding): псевдонимы из DATABASES, по которым
+# посты распределяются по хешу автора. Пустой список — все посты
+# в основной базе. Шарды мигрируются как обычные базы:
+# python manage.py migrate --database=shard0
+# После включения посты, уже лежащие в основной базе, переносятся
+# командой python manage.py shard_posts: они получают новые id, старые
+# адреса перенаправляются (PostRedirect). Смена списка — через
+# python manage.py rebalance_shards.
+#
+# POST_SHARDS = ['shard0', 'shard1']
+# DATABASES.update({
+#     alias: {
+#         'ENGINE': 'django.db.backends.sqlite3',
+#         'NAME': os.path.join(BASE_DIR, f'{alias}.sqlite3'),
+#     }
+#     for alias in POST_SHARDS
+# })
+
+POST_SHARDS = []
+
+# Лента подписок (posts.timeline). Новые посты раскладываются по лентам
+# подписчиков вне запроса: python manage.py fanout_timelines --every 1
+# Посты авторов, у которых подписчиков не меньше TIMELINE_FANOUT_LIMIT,
+# не раскладываются, а читаются при открытии ленты.
+TIMELINE_FANOUT_LIMIT = 10_000
+# Подписчиков в одной вставке при раскладке.
+TIMELINE_FANOUT_BATCH = 1000
+# Сколько последних постов автора попадает в ленту при подписке.
+TIMELINE_BACKFILL = 50
+
+# Прагмы каждого нового соединения с SQLite (core.sqlite): WAL, чтобы
+# запись не блокировала чтение лент, и ожидание блокировки вместо
+# ошибки database is locked. Обслуживание журнала и статистики:
+# python manage.py sqlite_maintenance
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Кэш страниц лент для анонимных посетителей
+
+PAGE_CACHE_ALIAS = 'default'
+PAGE_CACHE_TIMEOUT = 60
+
+# Кэш поиска групп по slug и авторов по имени (posts.lookups): LRU
+# в памяти процесса перед общим кэшем. Изменения сбрасывают оба уровня
+# в своём процессе, в остальных кэш процесса живёт до
+# LOOKUP_LOCAL_TIMEOUT секунд. Ненайденные slug и имена кэшируются
+# на LOOKUP_NEGATIVE_TIMEOUT секунд.
+
+LOOKUP_CACHE_ALIAS = 'default'
+LOOKUP_CACHE_TIMEOUT = 300
+LOOKUP_LOCAL_TIMEOUT = 5
+LOOKUP_LOCAL_SIZE = 1024
+LOOKUP_NEGATIVE_TIMEOUT = 30
+
+# Замеры SQL, шаблонов и времени ответа: заголовок Server-Timing
+# и журнал core.timing. Выключенный middleware не добавляет затрат.
+
+SERVER_TIMING = False
+
+# Эталонные результаты bench_views для проверки регрессий. Файл живёт
+# вне дерева исходников: CI хранит его как артефакт (или в отдельном
+# хранилище), скачивает перед запуском и передаёт путь через
+# --baseline либо эту настройку; обновляется он запуском с --save.
+# Без эталона bench_views завершается ошибкой, а не молча проходит.
+
+BENCHMARK_BASELINE = None
+
+# Журнал медленных запросов: запросы дольше SLOW_QUERY_MS миллисекунд
+# с параметрами и планом пишутся в SLOW_QUERY_LOG. None — выключено.
+# Сводка: python manage.py slow_queries
+
+SLOW_QUERY_MS = None
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'logs', 'slow_queries.log')
+
+# Профилирование по запросу сотрудника (?profile=1 или X-Profile: 1,
+# memory — с tracemalloc): такой запрос профилируется всегда. Кроме
+# того, доля PROFILING_SAMPLE_RATE всех запросов профилируется
+# автоматически. Хранятся PROFILING_KEEP последних снимков.
+# PROFILING = False отключает middleware.
+
+PROFILING = True
+PROFILING_SAMPLE_RATE = 0.01
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILING_KEEP = 200
+
+# Метрики по представлениям на /metrics (формат Prometheus) для
+# сотрудников или по заголовку Authorization: Bearer METRICS_TOKEN.
+# С METRICS_DIR каждый процесс раз в METRICS_FLUSH_INTERVAL секунд
+# пишет туда свой снимок, и /metrics показывает сумму по всем.
+# Живой процесс обновляет снимок фоновым потоком, поэтому снимок,
+# не обновлявшийся METRICS_STALE_AFTER секунд, оставлен завершённым
+# процессом: его счётчики переносятся в archive.json.
+
+METRICS = True
+METRICS_TOKEN = None
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+METRICS_STALE_AFTER = 3 * METRICS_FLUSH_INTERVAL
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {
+            'format': '%(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'core.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'core.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',